@@ -0,0 +1,156 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Runs the benchmark scenarios and summarises them with robust statistics
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Sequence
+
+from benchmarks.scenarios import Scenario, scenarios
+from midisnake.parser import Parser
+
+__all__ = ["median", "mad", "parse_scenario", "run_scenario", "run_all"]
+
+
+def median(values: Sequence[float]) -> float:
+    """Median of the given values
+
+    Args:
+        values (Sequence[float]): Samples, must not be empty
+
+    Returns:
+        float: Median value
+    """
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return float(ordered[middle])
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def mad(values: Sequence[float]) -> float:
+    """Median absolute deviation of the given values
+
+    Args:
+        values (Sequence[float]): Samples, must not be empty
+
+    Returns:
+        float: Median of the absolute deviations from the median
+    """
+    centre = median(values)
+    return median([abs(value - centre) for value in values])
+
+
+def parse_scenario(data: bytes) -> int:
+    """Parses a file held in memory
+
+    Args:
+        data (bytes): Standard MIDI File contents
+
+    Returns:
+        int: Number of events parsed
+    """
+    parser = Parser(data)
+    return sum(len(track.events) for track in parser.tracks)
+
+
+def run_scenario(scenario: Scenario, repeats: int = 7) -> Dict[str, Any]:
+    """Times repeated parses of a scenario, then measures its peak memory use in a separate, traced, parse
+
+    Args:
+        scenario (Scenario): Scenario to run
+        repeats (int): Number of timed parses
+
+    Returns:
+        Dict[str, Any]: Summary, with the median and MAD of the events/s samples and the peak traced memory in bytes
+    """
+    data = scenario.build()
+    event_count = parse_scenario(data)  # warm up
+
+    rates = []  # type: List[float]
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        parse_scenario(data)
+        rates.append(event_count / (time.perf_counter() - start))
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        parse_scenario(data)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "events": event_count,
+        "bytes": len(data),
+        "events_per_s": {
+            "median": median(rates),
+            "mad": mad(rates)
+        },
+        "peak_memory": peak_memory
+    }
+
+
+def run_all(names: Optional[Sequence[str]] = None, repeats: int = 7) -> Dict[str, Any]:
+    """Runs several scenarios
+
+    Args:
+        names (Optional[Sequence[str]]): Scenarios to run, defaults to all of them
+        repeats (int): Number of timed parses per scenario
+
+    Returns:
+        Dict[str, Any]: Results in the format stored in the baseline file
+    """
+    if names is None:
+        names = sorted(scenarios)
+    return {
+        "python": "{0.major}.{0.minor}.{0.micro}".format(sys.version_info),
+        "repeats": repeats,
+        "scenarios": {name: run_scenario(scenarios[name], repeats) for name in names}
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Run the midisnake benchmark scenarios")
+    arg_parser.add_argument("scenario", nargs="*", help="Scenarios to run, defaults to all")
+    arg_parser.add_argument("--repeats", type=int, default=7, help="Timed runs per scenario")
+    args = arg_parser.parse_args(argv)
+    for name in args.scenario:
+        if name not in scenarios:
+            arg_parser.error("unknown scenario {!r}, choose from {}".format(name, ", ".join(sorted(scenarios))))
+
+    print(json.dumps(run_all(args.scenario or None, args.repeats), indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
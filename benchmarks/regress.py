@@ -0,0 +1,158 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Performance regression gate
+
+Runs the benchmark scenarios and compares them against a committed baseline, exiting with a non-zero status when
+throughput or peak memory regress beyond a threshold::
+
+    python -m benchmarks.regress                 # compare against benchmarks/baseline.json
+    python -m benchmarks.regress --update        # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from benchmarks.harness import run_all
+from benchmarks.scenarios import scenarios
+
+__all__ = ["Finding", "compare", "format_report", "main"]
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Number of MADs a median has to move by before it is treated as more than noise
+NOISE_MADS = 3.0
+
+Finding = NamedTuple("Finding", [
+    ('scenario', str),
+    ('metric', str),
+    ('baseline', float),
+    ('current', float),
+    ('change', float),
+    ('regressed', bool)
+])
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+            memory_threshold: float = 0.2) -> List[Finding]:
+    """Compares benchmark results against a baseline
+
+    Throughput counts as regressed when its median falls by more than ``threshold`` of the baseline median, and by
+    more than :data:`NOISE_MADS` times the combined MAD of both runs. Peak memory counts as regressed when it grows by
+    more than ``memory_threshold``.
+
+    Args:
+        baseline (Dict[str, Any]): Baseline results, as produced by :func:`benchmarks.harness.run_all`
+        current (Dict[str, Any]): Results to check
+        threshold (float): Allowed fractional drop in events/s
+        memory_threshold (float): Allowed fractional growth in peak memory
+
+    Returns:
+        List[Finding]: One finding per metric of every scenario present in both results
+    """
+    findings = []  # type: List[Finding]
+    for name, result in sorted(current["scenarios"].items()):
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+
+        base_rate = base["events_per_s"]["median"]
+        rate = result["events_per_s"]["median"]
+        noise = NOISE_MADS * (base["events_per_s"]["mad"] + result["events_per_s"]["mad"])
+        drop = base_rate - rate
+        findings.append(Finding(name, "events/s", base_rate, rate, -drop / base_rate,
+                                drop > threshold * base_rate and drop > noise))
+
+        base_memory = base["peak_memory"]
+        memory = result["peak_memory"]
+        growth = (memory - base_memory) / base_memory
+        findings.append(Finding(name, "peak memory", base_memory, memory, growth, growth > memory_threshold))
+    return findings
+
+
+def format_report(findings: Sequence[Finding]) -> str:
+    """Formats findings as a table
+
+    Args:
+        findings (Sequence[Finding]): Findings from :func:`compare`
+
+    Returns:
+        str: Human readable report
+    """
+    lines = ["{:<16} {:<12} {:>14} {:>14} {:>9}  {}".format("scenario", "metric", "baseline", "current", "change",
+                                                             "status")]
+    for finding in findings:
+        lines.append("{:<16} {:<12} {:>14,.0f} {:>14,.0f} {:>+8.1%}  {}".format(
+            finding.scenario, finding.metric, finding.baseline, finding.current, finding.change,
+            "REGRESSED" if finding.regressed else "ok"
+        ))
+    regressions = [finding for finding in findings if finding.regressed]
+    if regressions:
+        lines.append("")
+        lines.append("{} regression(s): {}".format(
+            len(regressions), ", ".join("{} {}".format(f.scenario, f.metric) for f in regressions)))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Compare midisnake benchmarks against a stored baseline")
+    arg_parser.add_argument("scenario", nargs="*", help="Scenarios to run, defaults to all")
+    arg_parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    arg_parser.add_argument("--repeats", type=int, default=7, help="Timed runs per scenario")
+    arg_parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Allowed fractional drop in events/s (default 0.2)")
+    arg_parser.add_argument("--memory-threshold", type=float, default=0.2,
+                            help="Allowed fractional growth in peak memory (default 0.2)")
+    arg_parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    args = arg_parser.parse_args(argv)
+    for name in args.scenario:
+        if name not in scenarios:
+            arg_parser.error("unknown scenario {!r}, choose from {}".format(name, ", ".join(sorted(scenarios))))
+
+    current = run_all(args.scenario or None, args.repeats)
+
+    if args.update:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(current, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print("Wrote baseline for {} scenario(s) to {}".format(len(current["scenarios"]), args.baseline))
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    missing = sorted(set(current["scenarios"]) - set(baseline["scenarios"]))
+    if missing:
+        print("No baseline for: {}".format(", ".join(missing)))
+
+    findings = compare(baseline, current, args.threshold, args.memory_threshold)
+    print(format_report(findings))
+    return 1 if any(finding.regressed for finding in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Synthetic Standard MIDI Files used as benchmark scenarios
+"""
+
+from typing import Callable, Dict, Iterable, List, NamedTuple
+
+__all__ = ["Scenario", "scenarios"]
+
+Scenario = NamedTuple("Scenario", [
+    ('name', str),
+    ('description', str),
+    ('build', Callable[[], bytes])
+])
+
+
+def _vlv(value: int) -> bytes:
+    out = bytearray([value & 0x7F])
+    value >>= 7
+    while value:
+        out.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(out)
+
+
+def _meta(variant: int, payload: bytes) -> bytes:
+    return bytes((0xFF, variant)) + _vlv(len(payload)) + payload
+
+
+def _track(events: Iterable[bytes]) -> bytes:
+    body = b''.join(events) + b'\x00' + _meta(0x2F, b'')
+    return b'MTrk' + len(body).to_bytes(4, 'big') + body
+
+
+def _file(file_format: int, tracks: List[bytes], tpqn: int = 480) -> bytes:
+    header = b'MThd' + (6).to_bytes(4, 'big') + file_format.to_bytes(2, 'big') + \
+             len(tracks).to_bytes(2, 'big') + tpqn.to_bytes(2, 'big')
+    return header + b''.join(tracks)
+
+
+def _notes(count: int, channel: int = 0, running_status: bool = False) -> Iterable[bytes]:
+    for index in range(count):
+        note = 36 + (index * 7) % 48
+        if running_status and index:
+            yield b'\x00' + bytes((note, 100))
+        else:
+            yield b'\x00' + bytes((0x90 | channel, note, 100))
+        if running_status:
+            # NoteOn with velocity 0 stands in for NoteOff, so the status never changes
+            yield _vlv(120) + bytes((note, 0))
+        else:
+            yield _vlv(120) + bytes((0x80 | channel, note, 64))
+
+
+def dense_notes() -> bytes:
+    """Format 1 file with four tracks of plain note data"""
+    return _file(1, [_track(_notes(5000, channel)) for channel in range(4)])
+
+
+def running_status() -> bytes:
+    """Single track file using running status throughout"""
+    return _file(0, [_track(_notes(20000, running_status=True))])
+
+
+def text_heavy() -> bytes:
+    """Karaoke style file, with a lyric before every note"""
+    def events():
+        for index, note_event in enumerate(_notes(5000)):
+            if index % 2 == 0:
+                yield b'\x00' + _meta(0x05, "syllable{} ".format(index // 2).encode("ASCII"))
+            yield note_event
+    conductor = [b'\x00' + _meta(0x03, b'Karaoke'), b'\x00' + _meta(0x02, b'(c) nobody')]
+    for index in range(200):
+        conductor.append(_vlv(1920) + _meta(0x06, "Bar {}".format(index).encode("ASCII")))
+    return _file(1, [_track(conductor), _track(events())])
+
+
+def meta_mixed() -> bytes:
+    """Conductor track consisting of tempo, time signature and key signature changes"""
+    def events():
+        for index in range(3000):
+            yield _vlv(480) + _meta(0x51, (500000 + index).to_bytes(3, 'big'))
+            yield b'\x00' + _meta(0x58, bytes((4, 2, 24, 8)))
+            yield b'\x00' + _meta(0x59, bytes((index % 15 - 7 & 0xFF, index % 2)))
+    return _file(1, [_track(events()), _track(_notes(1000))])
+
+
+scenarios = {scenario.name: scenario for scenario in [
+    Scenario("dense_notes", dense_notes.__doc__, dense_notes),
+    Scenario("running_status", running_status.__doc__, running_status),
+    Scenario("text_heavy", text_heavy.__doc__, text_heavy),
+    Scenario("meta_mixed", meta_mixed.__doc__, meta_mixed),
+]}  # type: Dict[str, Scenario]
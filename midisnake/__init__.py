@@ -21,6 +21,8 @@
 # SOFTWARE.
 
 from midisnake.parser import Parser
+from midisnake.stats import ParseStats
 from midisnake.structure import Event
+from midisnake.validate import validate_structure
 
-__all__ = ["Parser", "Event"]
\ No newline at end of file
+__all__ = ["Parser", "ParseStats", "Event", "validate_structure"]
\ No newline at end of file
@@ -0,0 +1,397 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from array import array
+from collections import deque
+from typing import Any, BinaryIO, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from midisnake.encode import CHANNEL_DATA_LENGTHS, encode_vlv, write_file
+from midisnake.meta_events import MetaTextEvent
+from midisnake.structure import Event, Track
+from midisnake.sysex import VendorEvent
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ["ColumnarTrack", "ColumnarFile", "COLUMNS"]
+
+# Name and array typecode of each column, in storage order
+COLUMNS = (
+    ("tick", "q"),
+    ("status", "B"),
+    ("data1", "B"),
+    ("data2", "B"),
+    ("payload_offset", "I"),
+    ("payload_length", "I")
+)  # type: Tuple[Tuple[str, str], ...]
+
+Column = Union[array, memoryview]
+
+
+class ColumnarTrack:
+    """
+    A track held as parallel arrays, one entry per event, rather than as event objects
+
+    Channel events store their status byte and two data bytes, with data2 0 for events that only have one. Meta
+    events store a status of 0xFF, their type in data1, and their payload as a slice of :attr:`heap`. System Exclusive
+    events store their status, 0xF0 or 0xF7, and their payload in the same way, with data1 0. Columns are
+    either :class:`array.array` objects or memoryviews, e.g. into shared memory, and are indexed the same way.
+
+    Attributes:
+        track_number (int): Track index
+        tick (Column): Absolute time of each event, in ticks
+        status (Column): Status byte of each event
+        data1 (Column): First data byte of channel events, or the type of meta events
+        data2 (Column): Second data byte of channel events
+        payload_offset (Column): Offset of each meta event's payload in :attr:`heap`
+        payload_length (Column): Length of each meta event's payload, 0 for channel events
+        heap (Union[bytes, bytearray, memoryview]): Meta event payloads, concatenated
+    """
+    track_number = None  # type: int
+    tick = None  # type: Column
+    status = None  # type: Column
+    data1 = None  # type: Column
+    data2 = None  # type: Column
+    payload_offset = None  # type: Column
+    payload_length = None  # type: Column
+    heap = None  # type: Union[bytes, bytearray, memoryview]
+
+    def __init__(self, track_number: int = 0, columns: Dict[str, Column] = None,
+                 heap: Union[bytes, bytearray, memoryview] = b'') -> None:
+        """
+        Args:
+            track_number (int): Track index
+            columns (Dict[str, Column]): Column for each name in :data:`COLUMNS`, all of the same length. Empty
+                columns are created when this is None
+            heap (Union[bytes, bytearray, memoryview]): Meta event payloads
+
+        Raises:
+            ValueError: If a column is missing, or the columns differ in length
+        """
+        if columns is None:
+            columns = {name: array(typecode) for name, typecode in COLUMNS}
+        lengths = set()
+        for name, _ in COLUMNS:
+            if name not in columns:
+                raise ValueError("Missing column {}".format(name))
+            lengths.add(len(columns[name]))
+            setattr(self, name, columns[name])
+        if len(lengths) > 1:
+            raise ValueError("Columns have differing lengths")
+        self.track_number = track_number
+        self.heap = heap
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    def __repr__(self) -> str:
+        return "<ColumnarTrack {}: {} events>".format(self.track_number, len(self))
+
+    @classmethod
+    def from_track(cls, track: Track) -> 'ColumnarTrack':
+        """Converts a parsed track. Events other than channel, meta and undecoded vendor events, e.g. System Exclusive
+        handler results, are left out, though the time they carry is kept
+
+        Args:
+            track (Track): Parsed track
+
+        Returns:
+            ColumnarTrack: Converted track
+        """
+        tick_column = array("q")
+        status_column = array("B")
+        data1_column = array("B")
+        data2_column = array("B")
+        offset_column = array("I")
+        length_column = array("I")
+        heap = bytearray()
+
+        tick = 0
+        for delta_time, event in zip(track.delta_times, track.events):
+            tick += delta_time
+            if isinstance(event, Event):
+                raw_data = event.raw_data
+                status, data1, data2 = raw_data >> 16, (raw_data >> 8) & 0xFF, raw_data & 0xFF
+                offset = length = 0
+            elif isinstance(event, VendorEvent):
+                status = event.status
+                data1 = 0x7F if status == 0xFF else 0
+                data2, offset, length = 0, len(heap), len(event.payload)
+                heap += event.payload
+            else:
+                data1 = getattr(event, "variant_number", None)
+                if data1 is None:
+                    continue
+                if isinstance(event, MetaTextEvent):
+                    payload = event.raw_text
+                else:
+                    payload = getattr(event, "raw_content", None) or b''
+                status, data2, offset, length = 0xFF, 0, len(heap), len(payload)
+                heap += payload
+            tick_column.append(tick)
+            status_column.append(status)
+            data1_column.append(data1)
+            data2_column.append(data2)
+            offset_column.append(offset)
+            length_column.append(length)
+
+        return cls(track.track_number, {
+            "tick": tick_column,
+            "status": status_column,
+            "data1": data1_column,
+            "data2": data2_column,
+            "payload_offset": offset_column,
+            "payload_length": length_column
+        }, bytes(heap))
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Track]) -> List['ColumnarTrack']:
+        """Converts several parsed tracks, see :func:`from_track`
+
+        Args:
+            tracks (Iterable[Track]): Parsed tracks, e.g. :attr:`midisnake.parser.Parser.tracks`
+
+        Returns:
+            List[ColumnarTrack]: Converted tracks, in the same order
+        """
+        return [cls.from_track(track) for track in tracks]
+
+    def columns(self) -> Dict[str, Column]:
+        """Returns the columns by name, in :data:`COLUMNS` order
+
+        Returns:
+            Dict[str, Column]: Columns
+        """
+        return {name: getattr(self, name) for name, _ in COLUMNS}
+
+    def payload(self, index: int) -> memoryview:
+        """Returns the payload of a meta or System Exclusive event, without copying it
+
+        Args:
+            index (int): Event index
+
+        Returns:
+            memoryview: Payload, empty for channel events
+        """
+        offset = self.payload_offset[index]
+        return memoryview(self.heap)[offset:offset + self.payload_length[index]]
+
+    def take(self, indices: Iterable[int]) -> 'ColumnarTrack':
+        """Returns a new track holding a subset of the events. The heap is shared rather than copied
+
+        Args:
+            indices (Iterable[int]): Indices of the events to keep, in the order they should appear
+
+        Returns:
+            ColumnarTrack: New track
+        """
+        indices = list(indices)
+        return ColumnarTrack(self.track_number, {
+            name: array(typecode, [getattr(self, name)[index] for index in indices]) for name, typecode in COLUMNS
+        }, self.heap)
+
+    def encode(self, running_status: bool = True) -> bytes:
+        """Encodes the events as track chunk data, with delta times derived from :attr:`tick`
+
+        Args:
+            running_status (bool): Whether to omit status bytes repeated by consecutive channel events
+
+        Returns:
+            bytes: Encoded events, see :func:`midisnake.encode.encode_track_chunk`
+
+        Raises:
+            ValueError: If the ticks decrease, or the gap between events is too long to encode
+        """
+        output = bytearray()
+        heap = memoryview(self.heap)
+        current_status = None
+        previous_tick = 0
+        for tick, status, data1, data2, offset, length in zip(self.tick, self.status, self.data1, self.data2,
+                                                              self.payload_offset, self.payload_length):
+            output += encode_vlv(tick - previous_tick)
+            previous_tick = tick
+            if status == 0xFF:
+                output += bytes((0xFF, data1))
+                output += encode_vlv(length)
+                output += heap[offset:offset + length]
+                current_status = None
+                continue
+            if status >= 0xF0:
+                output.append(status)
+                output += encode_vlv(length)
+                output += heap[offset:offset + length]
+                current_status = None
+                continue
+            if not running_status or status != current_status:
+                output.append(status)
+                current_status = status
+            output.append(data1)
+            if CHANNEL_DATA_LENGTHS[status >> 4] == 2:
+                output.append(data2)
+        return bytes(output)
+
+    def note_pairs(self) -> Tuple[array, array]:
+        """Pairs each note with the event ending it. A Note Off or a Note On with a velocity of 0 ends the earliest
+        held note of the same pitch on the same channel
+
+        Returns:
+            Tuple[array.array, array.array]: Index of each Note On with a velocity above 0, in order, and index of the
+            event ending each, or -1 for notes that are never released
+        """
+        if numpy is not None:
+            pairs = self._note_pairs_numpy()
+            if pairs is not None:
+                return pairs
+        on_indices = array("q")
+        off_indices = array("q")
+        held = {}  # type: Dict[int, Deque[int]]
+        for index, (status, note, velocity) in enumerate(zip(self.status, self.data1, self.data2)):
+            status_class = status & 0xF0
+            if status_class == 0x90 and velocity:
+                held.setdefault((status & 0x0F) << 7 | note, deque()).append(len(on_indices))
+                on_indices.append(index)
+                off_indices.append(-1)
+            elif status_class == 0x80 or status_class == 0x90:
+                waiting = held.get((status & 0x0F) << 7 | note)
+                if waiting:
+                    off_indices[waiting.popleft()] = index
+        return on_indices, off_indices
+
+    def _note_pairs_numpy(self) -> Optional[Tuple[array, array]]:
+        # Pairs the nth start of each channel and pitch with its nth end. This is what pairing in order does as long
+        # as no note ends before it starts, so None is returned for the loop to handle stray ends when one does
+        status = numpy.frombuffer(self.status, dtype="B")
+        status_class = status & 0xF0
+        starts = (status_class == 0x90) & (numpy.frombuffer(self.data2, dtype="B") > 0)
+        ends = ((status_class == 0x90) | (status_class == 0x80)) & ~starts
+        keys = (status & 0x0F).astype("q") << 7 | numpy.frombuffer(self.data1, dtype="B")
+        on_indices = numpy.flatnonzero(starts)
+        off_indices = numpy.flatnonzero(ends)
+        off_for_on = numpy.full(len(on_indices), -1, dtype="q")
+        if len(on_indices) and len(off_indices):
+            # Orders the starts and ends by key then position, and numbers them within each key
+            on_order = numpy.argsort(keys[on_indices], kind="stable")
+            off_order = numpy.argsort(keys[off_indices], kind="stable")
+            on_keys = keys[on_indices[on_order]]
+            off_keys = keys[off_indices[off_order]]
+            on_ranks = on_keys * len(self) + numpy.arange(len(on_keys)) - numpy.searchsorted(on_keys, on_keys)
+            off_ranks = off_keys * len(self) + numpy.arange(len(off_keys)) - numpy.searchsorted(off_keys, off_keys)
+            matches = numpy.minimum(numpy.searchsorted(off_ranks, on_ranks), len(off_ranks) - 1)
+            found = off_ranks[matches] == on_ranks
+            matched = numpy.where(found, off_indices[off_order][matches], -1)
+            if numpy.any(found & (matched < on_indices[on_order])):
+                return None
+            off_for_on[on_order] = matched
+        return array("q", on_indices.astype("q").tobytes()), array("q", off_for_on.tobytes())
+
+    def lookup(self, table: Sequence[Any], column: str = "data1", use_numpy: bool = False) -> Any:
+        """Maps every event's value in a column through a 128 entry table, such as
+        :data:`midisnake.events.note_names_octave` or :data:`midisnake.events.controller_names`. Every event is mapped,
+        so use :attr:`status` to select the events the table applies to
+
+        Args:
+            table (Sequence[Any]): Table, indexed by value
+            column (str): Column to map, "data1" or "data2"
+            use_numpy (bool): Map with :func:`numpy.take`, returning a NumPy array
+
+        Returns:
+            Union[List[Any], numpy.ndarray]: Mapped value of each event
+
+        Raises:
+            ImportError: If use_numpy is True but NumPy isn't installed
+        """
+        values = getattr(self, column)
+        if use_numpy:
+            if numpy is None:
+                raise ImportError("NumPy is required when use_numpy is True")
+            return numpy.take(numpy.asarray(table), numpy.frombuffer(values, dtype="B"))
+        return [table[value] for value in values]
+
+    def as_numpy(self) -> Dict[str, Any]:
+        """Returns the columns as NumPy arrays sharing memory with this track
+
+        Returns:
+            Dict[str, numpy.ndarray]: Columns by name
+
+        Raises:
+            ImportError: If NumPy isn't installed
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required for as_numpy")
+        return {name: numpy.frombuffer(getattr(self, name), dtype=typecode) for name, typecode in COLUMNS}
+
+
+class ColumnarFile:
+    """
+    A file held as columnar tracks, with the header fields needed to write it back
+
+    Attributes:
+        format (int): File format, 0, 1 or 2
+        tpqn (int): Ticks per quarter note
+        tracks (List[ColumnarTrack]): Tracks, in file order
+    """
+    format = None  # type: int
+    tpqn = None  # type: int
+    tracks = None  # type: List[ColumnarTrack]
+
+    def __init__(self, format: int = 1, tpqn: int = 96, tracks: Iterable[ColumnarTrack] = ()) -> None:
+        """
+        Args:
+            format (int): File format, 0, 1 or 2
+            tpqn (int): Ticks per quarter note
+            tracks (Iterable[ColumnarTrack]): Tracks, in file order
+        """
+        self.format = format
+        self.tpqn = tpqn
+        self.tracks = list(tracks)
+
+    def __repr__(self) -> str:
+        return "<ColumnarFile format {}, {} tracks, {} tpqn>".format(self.format, len(self.tracks), self.tpqn)
+
+    @classmethod
+    def from_parser(cls, parser: Any) -> 'ColumnarFile':
+        """Converts a parsed file, see :meth:`ColumnarTrack.from_track`
+
+        Args:
+            parser (midisnake.parser.Parser): Parsed file
+
+        Returns:
+            ColumnarFile: Converted file
+        """
+        return cls(parser.header.format, parser.header.tpqn, ColumnarTrack.from_tracks(parser.tracks))
+
+    def write(self, stream: BinaryIO, running_status: bool = True) -> int:
+        """Writes the file as a Standard MIDI File
+
+        Args:
+            stream (BinaryIO): Binary file object to write to
+            running_status (bool): Whether to omit status bytes repeated by consecutive channel events
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            ValueError: If the ticks of a track decrease, or the gap between events is too long to encode
+        """
+        return write_file(stream, self.format, self.tpqn, [track.encode(running_status) for track in self.tracks])
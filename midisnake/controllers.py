@@ -0,0 +1,193 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Combines Control Change events that span several messages: 14 bit controllers sent as most and least significant byte
+pairs, and registered (RPN) and non-registered (NRPN) parameters set through data entry
+"""
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from midisnake.events import ControlChange
+
+__all__ = ["ControllerValue", "ParameterValue", "ControllerState", "resolve_controllers", "RPN_NULL"]
+
+ControllerValue = NamedTuple("ControllerValue", [
+    ('channel', int),
+    ('controller', int),
+    ('value', int),
+    ('high_resolution', bool)
+])  # type: Union[Callable, NamedTuple]
+ControllerValue.__doc__ = """Value of a controller after a Control Change event
+
+Attributes:
+    channel (int): MIDI channel
+    controller (int): Controller number. For 14 bit controllers this is the most significant byte's controller,
+        between 0x00 and 0x1F, whichever half of the pair was received
+    value (int): Value, between 0 and 16383 when high_resolution is True, otherwise between 0 and 127
+    high_resolution (bool): Whether the value is 14 bit, which it is once the controller's least significant byte
+        has been received on the channel
+"""
+
+ParameterValue = NamedTuple("ParameterValue", [
+    ('channel', int),
+    ('registered', bool),
+    ('parameter', int),
+    ('value', int)
+])  # type: Union[Callable, NamedTuple]
+ParameterValue.__doc__ = """Value of a registered or non-registered parameter after a data entry event
+
+Attributes:
+    channel (int): MIDI channel
+    registered (bool): Whether the parameter is a registered parameter (RPN), rather than a non-registered one (NRPN)
+    parameter (int): 14 bit parameter number, e.g. 0 for the pitch bend range RPN
+    value (int): 14 bit value
+"""
+
+# Parameter number that deselects registered and non-registered parameters
+RPN_NULL = 0x3FFF
+
+_DATA_ENTRY_MSB = 0x06
+_DATA_ENTRY_LSB = 0x26
+_DATA_INCREMENT = 0x60
+_DATA_DECREMENT = 0x61
+_NRPN_LSB = 0x62
+_NRPN_MSB = 0x63
+_RPN_LSB = 0x64
+_RPN_MSB = 0x65
+_RESET_ALL_CONTROLLERS = 0x79
+
+
+class _ChannelState:
+    # Most significant byte of each 14 bit controller, whether its least significant byte has been received, the
+    # selected parameter and its data entry value
+    def __init__(self) -> None:
+        self.msb = [0] * 0x20
+        self.fine = [False] * 0x20
+        self.registered = True
+        self.parameter_msb = 0x7F
+        self.parameter_lsb = 0x7F
+        self.data = 0
+
+
+class ControllerState:
+    """
+    Per channel state machine that combines Control Change events into controller and parameter values
+
+    Controllers 0x00 to 0x1F are 14 bit, with 0x20 to 0x3F carrying their least significant bytes. Most senders
+    only use the most significant byte, so a controller's values are 7 bit until its least significant byte is
+    received on the channel, and 14 bit from then on. As in the MIDI specification, receiving the most significant
+    byte of a 14 bit controller resets the least significant byte to 0. Selecting a parameter
+    with the RPN or NRPN controllers produces no value. Data entry, increment and decrement then produce a
+    :class:`ParameterValue` for the selected parameter. Reset All Controllers deselects the parameter.
+
+    Attributes:
+        channels (List[_ChannelState]): State of each of the 16 channels
+    """
+    channels = None  # type: List[_ChannelState]
+
+    def __init__(self) -> None:
+        self.channels = [_ChannelState() for _ in range(16)]
+
+    def reset(self, channel: int = None) -> None:
+        """Resets the state of a channel, or of every channel
+
+        Args:
+            channel (Optional[int]): Channel to reset, or None for every channel
+        """
+        if channel is None:
+            self.channels = [_ChannelState() for _ in range(16)]
+        else:
+            self.channels[channel] = _ChannelState()
+
+    def update(self, event: ControlChange) -> Optional[Union[ControllerValue, ParameterValue]]:
+        """Applies a Control Change event
+
+        Args:
+            event (ControlChange): Event to apply
+
+        Returns:
+            Optional[Union[ControllerValue, ParameterValue]]: The value the event sets, or None for events that only
+            select a parameter, and for data entry while no parameter is selected
+        """
+        channel = event.channel_number
+        controller = event.controller_number
+        value = event.controller_value
+        state = self.channels[channel]
+
+        if controller < 0x20:
+            if controller == _DATA_ENTRY_MSB:
+                return self._set_data(channel, state, value << 7)
+            state.msb[controller] = value
+            if state.fine[controller]:
+                return ControllerValue(channel, controller, value << 7, True)
+            return ControllerValue(channel, controller, value, False)
+        if controller < 0x40:
+            if controller == _DATA_ENTRY_LSB:
+                return self._set_data(channel, state, (state.data & 0x3F80) | value)
+            controller -= 0x20
+            state.fine[controller] = True
+            return ControllerValue(channel, controller, (state.msb[controller] << 7) | value, True)
+
+        if _DATA_INCREMENT <= controller <= _RPN_MSB:
+            if controller == _DATA_INCREMENT:
+                return self._set_data(channel, state, min(state.data + 1, 0x3FFF))
+            if controller == _DATA_DECREMENT:
+                return self._set_data(channel, state, max(state.data - 1, 0))
+            # Selecting a parameter
+            state.registered = controller >= _RPN_LSB
+            if controller & 1:
+                state.parameter_msb = value
+            else:
+                state.parameter_lsb = value
+            return None
+
+        if controller == _RESET_ALL_CONTROLLERS:
+            state.parameter_msb = state.parameter_lsb = 0x7F
+        return ControllerValue(channel, controller, value, False)
+
+    @staticmethod
+    def _set_data(channel: int, state: _ChannelState, data: int) -> Optional[ParameterValue]:
+        parameter = (state.parameter_msb << 7) | state.parameter_lsb
+        if parameter == RPN_NULL:
+            return None
+        state.data = data
+        return ParameterValue(channel, state.registered, parameter, data)
+
+
+def resolve_controllers(events: Iterable[Any],
+                        state: ControllerState = None) -> Iterator[Tuple[int, Union[ControllerValue, ParameterValue]]]:
+    """Runs the Control Change events of a track through a :class:`ControllerState`
+
+    Args:
+        events (Iterable[Any]): Events, e.g. :attr:`midisnake.structure.Track.events`. Other event types are ignored
+        state (Optional[ControllerState]): State to start from, or None to start from a new one
+
+    Yields:
+        Tuple[int, Union[ControllerValue, ParameterValue]]: Index of each event that sets a value, and the value
+    """
+    if state is None:
+        state = ControllerState()
+    for index, event in enumerate(events):
+        if isinstance(event, ControlChange):
+            value = state.update(event)
+            if value is not None:
+                yield index, value
@@ -0,0 +1,174 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Converts files between formats 0 and 1, streaming the result to an output
+"""
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from midisnake.encode import encode_header, encode_vlv
+from midisnake.scan import merge_tracks, scan_track, track_chunks
+from midisnake.source import ByteSource, read_all
+from midisnake.structure import CHUNK_HEADER_STRUCT, Header
+
+__all__ = ["to_format_0", "to_format_1"]
+
+_END_OF_TRACK = b'\xFF\x2F\x00'
+
+# Output is collected into blocks of about this size before being written
+_BLOCK_SIZE = 1 << 16
+
+
+def _open(source: Any) -> Tuple[Any, Header, List[Tuple[int, int]]]:
+    buffer = read_all(source)
+    header = Header(ByteSource(buffer))
+    if header.format == 2:
+        raise ValueError("Format 2 files hold independent sequences, which can't be converted")
+    return buffer, header, track_chunks(buffer)
+
+
+def _encode_track(buffer: Any, chunks: Sequence[Tuple[int, int]],
+                  select: Optional[Callable[[int], bool]] = None) -> Iterator[bytes]:
+    # Merges tracks in time order, encoding the events whose status is selected with new delta times and running
+    # status. Data after the End of Track of each track is skipped, and the merged track ends with the last of them
+    ended = [False] * len(chunks)
+    last_tick = end_tick = 0
+    current_status = None
+    for tick, track_index, event in merge_tracks(buffer, chunks):
+        if ended[track_index]:
+            continue
+        status = event.status
+        if status == 0xFF and event.data1 == 0x2F:
+            ended[track_index] = True
+            end_tick = max(end_tick, tick)
+            continue
+        if select is not None and not select(status):
+            continue
+        prefix = encode_vlv(tick - last_tick)
+        body = event.body
+        if status < 0xF0:
+            if buffer[body] >= 0x80:
+                body += 1
+            if status != current_status:
+                prefix += bytes((status,))
+                current_status = status
+        else:
+            # System Exclusive and meta events cancel running status
+            current_status = None
+        last_tick = tick
+        yield prefix + bytes(buffer[body:event.end])
+    yield encode_vlv(max(end_tick, last_tick) - last_tick) + _END_OF_TRACK
+
+
+def _write_blocks(stream: BinaryIO, pieces: Iterator[bytes]) -> int:
+    block = bytearray()
+    written = 0
+    for piece in pieces:
+        block += piece
+        if len(block) >= _BLOCK_SIZE:
+            written += stream.write(block)
+            block = bytearray()
+    if block:
+        written += stream.write(block)
+    return written
+
+
+def _write_chunk(stream: BinaryIO, pieces: Callable[[], Iterator[bytes]]) -> int:
+    # The chunk length comes first, so it is patched in afterwards on seekable outputs, and measured with an extra
+    # pass over the input otherwise
+    if getattr(stream, "seekable", lambda: False)():
+        start = stream.tell()
+        stream.write(CHUNK_HEADER_STRUCT.pack(b'MTrk', 0))
+        length = _write_blocks(stream, pieces())
+        end = stream.tell()
+        stream.seek(start)
+        stream.write(CHUNK_HEADER_STRUCT.pack(b'MTrk', length))
+        stream.seek(end)
+    else:
+        length = sum(len(piece) for piece in pieces())
+        stream.write(CHUNK_HEADER_STRUCT.pack(b'MTrk', length))
+        _write_blocks(stream, pieces())
+    return CHUNK_HEADER_STRUCT.size + length
+
+
+def to_format_0(source: Any, stream: BinaryIO) -> int:
+    """Converts a file to format 0, merging its tracks into one
+
+    Events are merged in time order, with events at the same tick ordered by track. Delta times are re-encoded,
+    running status is applied across the merged track, and it ends with the last End of Track. Event data is copied
+    without being decoded.
+
+    The tracks are merged one event ahead at a time, and output is written in blocks, so memory use beyond the input
+    is bounded. An mmap can be given to keep the input out of memory as well.
+
+    Args:
+        source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+        stream (BinaryIO): Binary file object to write to. Unseekable streams are supported, at the cost of a second
+            pass over the input to measure the track
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        ValueError: If the file is invalid, or has format 2
+    """
+    buffer, header, chunks = _open(source)
+    written = stream.write(encode_header(0, 1, header.tpqn))
+    return written + _write_chunk(stream, lambda: _encode_track(buffer, chunks))
+
+
+def to_format_1(source: Any, stream: BinaryIO) -> int:
+    """Converts a file to format 1, with a track for each channel
+
+    The first track holds the meta and System Exclusive events, and is followed by a track for each channel used, in
+    channel order. Events keep their order and absolute times, and every track ends with the End of Track of the
+    original. Format 1 files are regrouped by channel the same way.
+
+    Each track is written in one pass over the input, so memory use beyond the input is bounded.
+
+    Args:
+        source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+        stream (BinaryIO): Binary file object to write to. Unseekable streams are supported, at the cost of a second
+            pass over the input to measure each track
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        ValueError: If the file is invalid, or has format 2
+    """
+    buffer, header, chunks = _open(source)
+    channels = set()  # type: Set[int]
+    for start, end in chunks:
+        for event in scan_track(buffer, start, end):
+            if event.status < 0xF0:
+                channels.add(event.status & 0x0F)
+            elif event.status == 0xFF and event.data1 == 0x2F:
+                break
+
+    selectors = [lambda status: status >= 0xF0]  # type: List[Callable[[int], bool]]
+    for channel in sorted(channels):
+        selectors.append(lambda status, channel=channel: status < 0xF0 and status & 0x0F == channel)
+    written = stream.write(encode_header(1, len(selectors), header.tpqn))
+    for select in selectors:
+        written += _write_chunk(stream, lambda: _encode_track(buffer, chunks, select))
+    return written
@@ -0,0 +1,333 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Collects statistics over whole corpora of files in parallel, as partial aggregates that merge in any order
+"""
+import json
+import os
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from midisnake.meta_events import meta_events
+from midisnake.scan import read_event, track_chunks
+from midisnake.source import ByteSource, read_all
+from midisnake.structure import Header
+
+__all__ = ["CorpusStats", "PERCUSSION", "DURATION_STEPS", "file_stats", "corpus_stats"]
+
+# Key of notes on the General MIDI percussion channel in CorpusStats.programs, where programs select drum kits
+PERCUSSION = 128
+
+# Duration histogram resolution, in steps per quarter note, the resolution of MIDI clock
+DURATION_STEPS = 24
+
+_COUNTERS = ("pitches", "velocities", "durations", "programs", "tempos", "time_signatures", "meta_types", "errors")
+# Counters keyed by numbers, whose keys become strings in JSON
+_NUMBER_KEYS = ("pitches", "velocities", "durations", "programs", "tempos", "meta_types")
+
+
+class CorpusStats:
+    """
+    Statistics over a set of files. Statistics of disjoint sets of files are combined with :meth:`merge`, in any
+    order and grouping, so they can be collected in parts and saved as they go
+
+    Attributes:
+        files (int): Number of files read
+        failed (int): Number of files that couldn't be read, which contribute nothing but their error
+        pitches (Counter): Number of notes of each pitch
+        velocities (Counter): Number of notes of each velocity
+        durations (Counter): Number of notes of each duration, in 24ths of a quarter note. Files timed in SMPTE
+            frames are left out
+        programs (Counter): Number of notes played with each program, or with :data:`PERCUSSION` on channel 10.
+            Channels use program 0 until they receive a Program Change
+        tempos (Counter): Number of Set Tempo events for each tempo, in beats per minute rounded to an integer
+        time_signatures (Counter): Number of Time Signature events for each signature, as strings like "6/8"
+        meta_types (Counter): Number of meta events of each type that :data:`midisnake.meta_events.meta_events`
+            decodes
+        unknown_meta (int): Number of meta events of other types
+        errors (Counter): Number of files failing with each exception type name
+    """
+    files = None  # type: int
+    failed = None  # type: int
+    pitches = None  # type: Counter
+    velocities = None  # type: Counter
+    durations = None  # type: Counter
+    programs = None  # type: Counter
+    tempos = None  # type: Counter
+    time_signatures = None  # type: Counter
+    meta_types = None  # type: Counter
+    unknown_meta = None  # type: int
+    errors = None  # type: Counter
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.failed = 0
+        self.unknown_meta = 0
+        for name in _COUNTERS:
+            setattr(self, name, Counter())
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, CorpusStats) and self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return "<CorpusStats {} files, {} failed>".format(self.files, self.failed)
+
+    def merge(self, other: 'CorpusStats') -> 'CorpusStats':
+        """Adds the statistics of other files to these
+
+        Args:
+            other (CorpusStats): Statistics of files not counted here
+
+        Returns:
+            CorpusStats: This object
+        """
+        self.files += other.files
+        self.failed += other.failed
+        self.unknown_meta += other.unknown_meta
+        for name in _COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Converts the statistics to a JSON serialisable dict
+
+        Returns:
+            Dict[str, Any]: Statistics, with the keys of each counter sorted
+        """
+        data = {"files": self.files, "failed": self.failed, "unknown_meta": self.unknown_meta}  # type: Dict[str, Any]
+        for name in _COUNTERS:
+            counter = getattr(self, name)
+            data[name] = {str(key): counter[key] for key in sorted(counter)}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CorpusStats':
+        """Restores statistics converted with :meth:`as_dict`
+
+        Args:
+            data (Dict[str, Any]): Converted statistics
+
+        Returns:
+            CorpusStats: Statistics
+        """
+        stats = cls()
+        stats.files = data["files"]
+        stats.failed = data["failed"]
+        stats.unknown_meta = data["unknown_meta"]
+        for name in _COUNTERS:
+            setattr(stats, name, Counter({int(key) if name in _NUMBER_KEYS else key: count
+                                          for key, count in data[name].items()}))
+        return stats
+
+
+def _add_file(stats: CorpusStats, buffer: Any) -> None:
+    # Tracks are scanned one at a time. Notes are attributed to programs afterwards, by the last Program Change on
+    # their channel in the order of merged playback, i.e. by tick, then track, then position in the track. Notes and
+    # changes are keyed by (group, tick, track, position)
+    header = Header(ByteSource(buffer))
+    tpqn = header.tpqn if header.tpqn < 0x8000 else None
+    pitches, velocities, durations = stats.pitches, stats.velocities, stats.durations
+    notes = [[] for _ in range(16)]  # type: List[List[Tuple[int, int, int, int]]]
+    changes = [[] for _ in range(16)]  # type: List[List[Tuple[Tuple[int, int, int, int], int]]]
+    for track_index, (position, end) in enumerate(track_chunks(buffer)):
+        # Tracks of format 2 files are separate sequences, so each is a group of its own
+        group = track_index if header.format == 2 else 0
+        running_status = None
+        tick = 0
+        held = {}  # type: Dict[int, Deque[int]]
+        while position < end:
+            event = read_event(buffer, position, running_status)
+            position = event.end
+            tick += event.delta
+            status = event.status
+            # System Exclusive and meta events cancel running status
+            running_status = status if status < 0xF0 else None
+            if status < 0xF0:
+                status_class = status & 0xF0
+                channel = status & 0x0F
+                if status_class == 0x90 and event.data2:
+                    pitches[event.data1] += 1
+                    velocities[event.data2] += 1
+                    notes[channel].append((group, tick, track_index, position))
+                    held.setdefault(channel << 7 | event.data1, deque()).append(tick)
+                elif status_class == 0x80 or status_class == 0x90:
+                    starts = held.get(channel << 7 | event.data1)
+                    if starts and tpqn is not None:
+                        duration = tick - starts.popleft()
+                        durations[(2 * duration * DURATION_STEPS + tpqn) // (2 * tpqn)] += 1
+                elif status_class == 0xC0:
+                    changes[channel].append(((group, tick, track_index, position), event.data1))
+            elif status == 0xFF:
+                meta_type = event.data1
+                if meta_type == 0x2F:
+                    stats.meta_types[meta_type] += 1
+                    break
+                if meta_type >= len(meta_events) or meta_events[meta_type] is None:
+                    stats.unknown_meta += 1
+                    continue
+                stats.meta_types[meta_type] += 1
+                payload = buffer[event.payload_offset:event.payload_offset + event.payload_length]
+                if meta_type == 0x51 and len(payload) == 3 and any(payload):
+                    stats.tempos[round(60000000 / int.from_bytes(payload, "big"))] += 1
+                elif meta_type == 0x58 and len(payload) == 4:
+                    stats.time_signatures["{}/{}".format(payload[0], 1 << payload[1])] += 1
+
+    for channel, channel_notes in enumerate(notes):
+        if channel == 9:
+            stats.programs[PERCUSSION] += len(channel_notes)
+        elif not changes[channel]:
+            stats.programs[0] += len(channel_notes)
+        else:
+            changes[channel].sort()
+            keys = [key for key, _ in changes[channel]]
+            for note in channel_notes:
+                index = bisect_right(keys, note) - 1
+                # Notes come before any change in their group when the change found is from an earlier group
+                if index < 0 or keys[index][0] != note[0]:
+                    stats.programs[0] += 1
+                else:
+                    stats.programs[changes[channel][index][1]] += 1
+
+
+def file_stats(source: Any) -> CorpusStats:
+    """Collects the statistics of one file. Events are read in place rather than decoded into objects
+
+    Args:
+        source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+
+    Returns:
+        CorpusStats: Statistics of the file. Files that can't be read are counted as failed, with the name of the
+        exception raised, and nothing else
+    """
+    stats = CorpusStats()
+    try:
+        _add_file(stats, read_all(source))
+    except Exception as exc:
+        failed = CorpusStats()
+        failed.files = failed.failed = 1
+        failed.errors[type(exc).__name__] += 1
+        return failed
+    stats.files = 1
+    return stats
+
+
+def _batch_stats(paths: List[Any]) -> CorpusStats:
+    stats = CorpusStats()
+    for path in paths:
+        stats.merge(file_stats(path))
+    return stats
+
+
+def _save_checkpoint(checkpoint: str, batch_size: int, stats: CorpusStats, prefix: int, done: Set[int]) -> None:
+    # Writes to a temporary file first, so an interruption never leaves a partial checkpoint
+    temporary = checkpoint + ".tmp"
+    with open(temporary, "w") as checkpoint_file:
+        json.dump({"batch_size": batch_size, "prefix": prefix, "done": sorted(done), "stats": stats.as_dict()},
+                  checkpoint_file)
+    os.replace(temporary, checkpoint)
+
+
+def corpus_stats(paths: Iterable[Any], workers: Optional[int] = 1, batch_size: int = 64, checkpoint: str = None,
+                 checkpoint_every: int = 16) -> CorpusStats:
+    """Collects statistics over many files, in parallel worker processes
+
+    Paths are read in batches, each batch giving partial statistics that are merged as they arrive. Only a few
+    batches per worker are in flight at once, so memory use stays flat however many paths there are, and paths can
+    be given by a generator.
+
+    With a checkpoint file, progress is saved every few batches and at the end. A run given an existing checkpoint
+    skips the batches it records and continues from its statistics, so the paths must be given in the same order.
+
+    Args:
+        paths (Iterable[Any]): Files, as any input accepted by :class:`midisnake.parser.Parser` that can be sent to
+            other processes, usually paths
+        workers (Optional[int]): Number of worker processes, None for one per CPU, or 1 to work in this process
+        batch_size (int): Files per batch
+        checkpoint (str): Path of a JSON checkpoint file to resume from and save to, or None
+        checkpoint_every (int): Batches between checkpoints
+
+    Returns:
+        CorpusStats: Statistics of every file
+
+    Raises:
+        ValueError: If a checkpoint was saved with a different batch size
+    """
+    stats = CorpusStats()
+    # Batches below the prefix are all done, as are the batches listed after it
+    prefix = 0
+    done = set()  # type: Set[int]
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as checkpoint_file:
+            saved = json.load(checkpoint_file)
+        if saved["batch_size"] != batch_size:
+            raise ValueError("Checkpoint was saved with a batch size of {}".format(saved["batch_size"]))
+        stats = CorpusStats.from_dict(saved["stats"])
+        prefix = saved["prefix"]
+        done = set(saved["done"])
+
+    def batches() -> Iterable[Any]:
+        iterator = iter(paths)
+        number = 0
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            if number >= prefix and number not in done:
+                yield number, batch
+            number += 1
+
+    completed = 0
+
+    def finish(number: int, partial: CorpusStats) -> None:
+        nonlocal prefix, completed
+        stats.merge(partial)
+        done.add(number)
+        while prefix in done:
+            done.remove(prefix)
+            prefix += 1
+        completed += 1
+        if checkpoint is not None and completed % checkpoint_every == 0:
+            _save_checkpoint(checkpoint, batch_size, stats, prefix, done)
+
+    if workers == 1:
+        for number, batch in batches():
+            finish(number, _batch_stats(batch))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as executor:
+            limit = 2 * workers
+            pending = {}  # type: Dict[Future, int]
+            for number, batch in batches():
+                pending[executor.submit(_batch_stats, batch)] = number
+                while len(pending) >= limit:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        finish(pending.pop(future), future.result())
+            for future in list(pending):
+                finish(pending.pop(future), future.result())
+    if checkpoint is not None:
+        _save_checkpoint(checkpoint, batch_size, stats, prefix, done)
+    return stats
@@ -0,0 +1,175 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Extracts controller curves from columnar tracks, and thins them by removing events that change little or nothing
+"""
+from array import array
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from midisnake.columnar import ColumnarTrack
+
+__all__ = ["Curve", "PITCH_BEND", "CHANNEL_PRESSURE", "extract_curves", "thin_redundant", "thin_rdp", "thin_track"]
+
+# Controller numbers used for curves that aren't Control Change controllers
+PITCH_BEND = 0x80
+CHANNEL_PRESSURE = 0x81
+
+Curve = NamedTuple("Curve", [
+    ('channel', int),
+    ('controller', int),
+    ('ticks', array),
+    ('values', array),
+    ('indices', array)
+])
+Curve.__doc__ = """Values of one controller on one channel over time
+
+Attributes:
+    channel (int): MIDI channel
+    controller (int): Control Change controller number, or :data:`PITCH_BEND` or :data:`CHANNEL_PRESSURE`
+    ticks (array.array): Absolute time of each value, in ticks
+    values (array.array): Each value. Pitch bend values are 14 bit, with 0x2000 being no bend
+    indices (array.array): Index of the event setting each value in its :class:`midisnake.columnar.ColumnarTrack`
+"""
+
+
+def extract_curves(track: ColumnarTrack) -> Dict[Tuple[int, int], Curve]:
+    """Extracts every Control Change, Pitch Bend and Channel Pressure curve of a track
+
+    Args:
+        track (ColumnarTrack): Track to extract from
+
+    Returns:
+        Dict[Tuple[int, int], Curve]: Curves by channel and controller
+    """
+    columns = {}  # type: Dict[Tuple[int, int], Tuple[array, array, array]]
+    for index, (tick, status, data1, data2) in enumerate(zip(track.tick, track.status, track.data1, track.data2)):
+        status_class = status & 0xF0
+        if status_class == 0xB0:
+            key = (status & 0x0F, data1)
+            value = data2
+        elif status_class == 0xE0:
+            key = (status & 0x0F, PITCH_BEND)
+            value = (data2 << 7) | data1
+        elif status_class == 0xD0:
+            key = (status & 0x0F, CHANNEL_PRESSURE)
+            value = data1
+        else:
+            continue
+        curve = columns.get(key)
+        if curve is None:
+            curve = columns[key] = (array("q"), array("i"), array("q"))
+        curve[0].append(tick)
+        curve[1].append(value)
+        curve[2].append(index)
+    return {key: Curve(key[0], key[1], *curve) for key, curve in columns.items()}
+
+
+def _subset(curve: Curve, keep: Iterable[int]) -> Curve:
+    keep = list(keep)
+    return curve._replace(ticks=array("q", [curve.ticks[index] for index in keep]),
+                          values=array("i", [curve.values[index] for index in keep]),
+                          indices=array("q", [curve.indices[index] for index in keep]))
+
+
+def thin_redundant(curve: Curve) -> Curve:
+    """Removes values equal to the value before them, which don't change the controller
+
+    Args:
+        curve (Curve): Curve to thin
+
+    Returns:
+        Curve: Thinned curve
+    """
+    values = curve.values
+    return _subset(curve, [index for index in range(len(values)) if index == 0 or values[index] != values[index - 1]])
+
+
+def thin_rdp(curve: Curve, tolerance: float) -> Curve:
+    """Simplifies a curve in one pass. Controllers hold each value until the next event, so a value is kept only when
+    it differs from the last value kept by more than ``tolerance``, and removed values are always within
+    ``tolerance`` of the value held in their place. The first and last values are always kept
+
+    Args:
+        curve (Curve): Curve to thin
+        tolerance (float): Largest difference in value allowed, in the curve's units
+
+    Returns:
+        Curve: Thinned curve, which played back differs from the original by at most ``tolerance``
+    """
+    values = curve.values
+    count = len(values)
+    if count < 3:
+        return curve
+    keep = [0]
+    held = values[0]
+    for index in range(1, count - 1):
+        value = values[index]
+        if abs(value - held) > tolerance:
+            keep.append(index)
+            held = value
+    keep.append(count - 1)
+    return _subset(curve, keep)
+
+
+def _thinnable(key: Tuple[int, int], curves: Dict[Tuple[int, int], Curve]) -> bool:
+    # Controllers whose events only set a value. Pairs in use as 14 bit controllers, data entry, parameter selection,
+    # bank select and channel mode messages are left alone, as removing them changes the meaning of other events
+    channel, controller = key
+    # High Resolution Velocity Prefix (0x58) changes the velocity of the next note, so is left alone too
+    if controller in (PITCH_BEND, CHANNEL_PRESSURE) or (0x40 <= controller < 0x60 and controller != 0x58) \
+            or 0x66 <= controller < 0x78:
+        return True
+    return 0x01 <= controller < 0x20 and controller != 0x06 and (channel, controller + 0x20) not in curves
+
+
+def thin_track(track: ColumnarTrack, tolerance: float = 0,
+               controllers: Iterable[Tuple[int, int]] = None) -> ColumnarTrack:
+    """Removes controller events that don't change their controller, or that only change it within a tolerance
+
+    Args:
+        track (ColumnarTrack): Track to thin
+        tolerance (float): 0 to only remove repeated values, otherwise the tolerance given to :func:`thin_rdp` after
+            removing them
+        controllers (Iterable[Tuple[int, int]]): Channel and controller of each curve to thin. By default, every
+            curve is thinned except those whose events affect other events: 14 bit controllers that have their least
+            significant byte in use, data entry and parameter selection, bank select, the high resolution velocity
+            prefix and channel mode messages
+
+    Returns:
+        ColumnarTrack: New track without the removed events. Write it out with :func:`ColumnarTrack.encode`
+    """
+    curves = extract_curves(track)
+    if controllers is None:
+        controllers = [key for key in curves if _thinnable(key, curves)]
+    removed = set()
+    for key in controllers:
+        curve = curves.get(key)
+        if curve is None:
+            continue
+        thinned = thin_redundant(curve)
+        if tolerance > 0:
+            thinned = thin_rdp(thinned, tolerance)
+        removed.update(set(curve.indices) - set(thinned.indices))
+    if not removed:
+        return track
+    return track.take(index for index in range(len(track)) if index not in removed)
@@ -0,0 +1,154 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Edits files at the byte level, copying the events that are kept rather than decoding and re-encoding them
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from midisnake.encode import encode_header, encode_track_chunk, encode_vlv
+from midisnake.playback import DEFAULT_TEMPO, PlaybackState, SeekIndex, _Playback
+from midisnake.scan import read_event, track_chunks
+from midisnake.source import ByteSource, read_all
+from midisnake.structure import Header
+
+__all__ = ["crop"]
+
+_END_OF_TRACK = b'\xFF\x2F\x00'
+
+
+def _state_at(buffer: Any, chunks: List[Tuple[int, int]], tpqn: int, tick: int,
+              index: Optional[SeekIndex]) -> Tuple[PlaybackState, Dict[int, int]]:
+    # Plays up to the tick, noting which track played the last event on each channel
+    start = index.checkpoint(tick) if index is not None else SeekIndex._initial_state(tpqn, chunks)
+    playback = _Playback(buffer, chunks, tpqn, start)
+    owners = {}
+    while True:
+        next_tick = playback.peek_tick()
+        if next_tick is None or next_tick >= tick:
+            break
+        _, track_index, event = playback.step()
+        if event.status < 0xF0:
+            owners[event.status & 0x0F] = track_index
+    return playback.snapshot(tick), owners
+
+
+def _slice(buffer: Any, start: int, end: int, state: PlaybackState, track_index: int,
+           chunk_end: int) -> Tuple[bytearray, Set[int]]:
+    # Copies the events of a track between two ticks, re-encoding the first delta time and giving the first channel
+    # event a status byte if it relied on running status from before the cut. Notes still held at the end are
+    # released, and the track ends at the end tick
+    position, tick, running_status = state.tracks[track_index]
+    output = bytearray()
+    copy_from = None
+    channels = set()
+    held = set()  # type: Set[Tuple[int, int]]
+    last_tick = start
+    while position < chunk_end:
+        event = read_event(buffer, position, running_status)
+        event_tick = tick + event.delta
+        if event_tick >= end or (event.status == 0xFF and event.data1 == 0x2F):
+            break
+        if copy_from is None:
+            output += encode_vlv(event_tick - start)
+            copy_from = event.body
+        status = event.status
+        # System Exclusive and meta events cancel running status
+        running_status = status if status < 0xF0 else None
+        if status < 0xF0:
+            if not channels and buffer[event.body] < 0x80:
+                output += buffer[copy_from:event.body]
+                output.append(status)
+                copy_from = event.body
+            channels.add(status & 0x0F)
+            status_class = status & 0xF0
+            if status_class == 0x90 and event.data2:
+                held.add((status & 0x0F, event.data1))
+            elif status_class in (0x80, 0x90):
+                held.discard((status & 0x0F, event.data1))
+        position = event.end
+        tick = last_tick = event_tick
+    if copy_from is not None:
+        output += buffer[copy_from:position]
+
+    delta = end - last_tick
+    for channel, note in sorted(held):
+        output += encode_vlv(delta) + bytes((0x80 | channel, note, 0))
+        delta = 0
+    output += encode_vlv(delta) + _END_OF_TRACK
+    return output, channels
+
+
+def crop(source: Any, start_tick: int, end_tick: int, index: SeekIndex = None) -> bytes:
+    """Cuts out the part of a file between two ticks
+
+    Events in the range are copied byte for byte. Only the first delta time of each track is changed, and a status byte
+    is added where the first channel event relied on running status. The state at the start is recreated with
+    events at the start of the tracks: tempo and time signature in the first track, and the program, controllers,
+    parameters, pressure and pitch bend of each channel in the track that last used the channel. Notes held across
+    the start are not restarted, and notes held at the end are released there. Every track ends at the end tick.
+
+    Events before the start are read in place to find the state, without being decoded into event objects. Given an
+    index, only those after the nearest checkpoint are read.
+
+    Args:
+        source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+        start_tick (int): First tick kept
+        end_tick (int): Tick after the last one kept
+        index (Optional[SeekIndex]): Index of the file, to start from a checkpoint
+
+    Returns:
+        bytes: Cropped file, with the same format, tracks and timing as the original
+
+    Raises:
+        ValueError: If the range is empty or negative, or the file is invalid
+    """
+    if start_tick < 0 or end_tick <= start_tick:
+        raise ValueError("Invalid range {}-{}".format(start_tick, end_tick))
+    buffer = read_all(source)
+    header = Header(ByteSource(buffer))
+    chunks = track_chunks(buffer)
+    state, owners = _state_at(buffer, chunks, header.tpqn, start_tick, index)
+
+    slices = []
+    for track_index, (_, chunk_end) in enumerate(chunks):
+        slices.append(_slice(buffer, start_tick, end_tick, state, track_index, chunk_end))
+
+    prefixes = [bytearray() for _ in chunks]  # type: List[bytearray]
+    if prefixes:
+        if state.tempo != DEFAULT_TEMPO:
+            prefixes[0] += b'\x00\xFF\x51\x03' + state.tempo.to_bytes(3, "big")
+        if state.time_signature is not None:
+            prefixes[0] += b'\x00\xFF\x58\x04' + bytes(state.time_signature)
+        for channel, channel_state in enumerate(state.channels):
+            owner = owners.get(channel)
+            if owner is None:
+                # The last event was before the checkpoint, so use the first track with the channel in the range
+                owner = next((track_index for track_index, (_, channels) in enumerate(slices)
+                              if channel in channels), 0)
+            for message in channel_state.messages(channel, notes=False):
+                prefixes[owner] += b'\x00' + message
+
+    output = bytearray(encode_header(header.format, len(chunks), header.tpqn))
+    for prefix, (data, _) in zip(prefixes, slices):
+        output += encode_track_chunk(prefix + data)
+    return bytes(output)
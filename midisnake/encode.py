@@ -0,0 +1,184 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from typing import Any, BinaryIO, Iterable, Sequence, Union
+
+from midisnake.structure import CHUNK_HEADER_STRUCT, HEADER_STRUCT, Event
+from midisnake.sysex import VendorEvent
+
+__all__ = ["encode_vlv", "encode_event", "encode_events", "encode_header", "encode_track_chunk", "meta_payload",
+           "write_file"]
+
+# Largest value a variable length value can hold, in 4 bytes
+MAX_VLV = 0x0FFFFFFF
+
+# Number of data bytes following each channel status class, indexed by status >> 4
+CHANNEL_DATA_LENGTHS = (0, 0, 0, 0, 0, 0, 0, 0, 2, 2, 2, 2, 1, 1, 2, 0)
+
+# Encodings of single byte variable length values
+_short_vlvs = tuple(bytes((value,)) for value in range(0x80))
+
+
+def encode_vlv(value: int) -> bytes:
+    """Encodes a variable length value
+
+    Args:
+        value (int): Value, between 0 and 0x0FFFFFFF
+
+    Returns:
+        bytes: Encoded value, 1 to 4 bytes long
+
+    Raises:
+        ValueError: If the value is out of range
+    """
+    if 0 <= value < 0x80:
+        return _short_vlvs[value]
+    if not 0 <= value <= MAX_VLV:
+        raise ValueError("Variable length value {} out of range 0-{}".format(value, MAX_VLV))
+    output = bytearray((value & 0x7F,))
+    value >>= 7
+    while value:
+        output.append(0x80 | (value & 0x7F))
+        value >>= 7
+    output.reverse()
+    return bytes(output)
+
+
+def meta_payload(event: Any) -> Union[bytes, bytearray, memoryview]:
+    """Returns the undecoded data of a meta event, as stored in the file after its length
+
+    Args:
+        event (Any): Meta event
+
+    Returns:
+        Union[bytes, bytearray, memoryview]: Data, empty for events without any, e.g. :class:`EndOfTrack`
+    """
+    payload = getattr(event, "raw_text", None)
+    if payload is None:
+        payload = getattr(event, "raw_content", None)
+    return b'' if payload is None else payload
+
+
+def encode_event(event: Any) -> bytes:
+    """Encodes a channel or meta event, without its delta time
+
+    Args:
+        event (Any): Channel event, meta event with a ``variant_number``, or
+            :class:`midisnake.sysex.VendorEvent`
+
+    Returns:
+        bytes: Status byte and data
+
+    Raises:
+        ValueError: If the event has no encoding, e.g. a System Exclusive handler result
+    """
+    if isinstance(event, Event):
+        raw_data = event.raw_data
+        status = raw_data >> 16
+        if CHANNEL_DATA_LENGTHS[status >> 4] == 1:
+            return bytes((status, (raw_data >> 8) & 0xFF))
+        return raw_data.to_bytes(3, "big")
+    if isinstance(event, VendorEvent):
+        prefix = b'\xFF\x7F' if event.status == 0xFF else bytes((event.status,))
+        return prefix + encode_vlv(len(event.payload)) + event.payload
+    variant = getattr(event, "variant_number", None)
+    if variant is None:
+        raise ValueError("{} has no encoding".format(type(event).__name__))
+    payload = meta_payload(event)
+    return bytes((0xFF, variant)) + encode_vlv(len(payload)) + payload
+
+
+def encode_events(delta_times: Iterable[int], events: Iterable[Any], running_status: bool = True) -> bytes:
+    """Encodes a sequence of events as track chunk data
+
+    Args:
+        delta_times (Iterable[int]): Delta time preceding each event
+        events (Iterable[Any]): Events, see :func:`encode_event`
+        running_status (bool): Whether to omit status bytes repeated by consecutive channel events
+
+    Returns:
+        bytes: Encoded events
+
+    Raises:
+        ValueError: If an event has no encoding, or a delta time is out of range
+    """
+    output = bytearray()
+    current_status = None
+    for delta_time, event in zip(delta_times, events):
+        output += encode_vlv(delta_time)
+        encoded = encode_event(event)
+        status = encoded[0]
+        if status >= 0xF0:
+            current_status = None
+        elif running_status and status == current_status:
+            encoded = encoded[1:]
+        else:
+            current_status = status
+        output += encoded
+    return bytes(output)
+
+
+def encode_header(format: int, ntrks: int, tpqn: int) -> bytes:
+    """Encodes a header chunk
+
+    Args:
+        format (int): File format, 0, 1 or 2
+        ntrks (int): Number of tracks
+        tpqn (int): Ticks per quarter note
+
+    Returns:
+        bytes: Header chunk
+    """
+    return HEADER_STRUCT.pack(b'MThd', 6, format, ntrks, tpqn)
+
+
+def encode_track_chunk(data: Union[bytes, bytearray, memoryview]) -> bytes:
+    """Wraps encoded events in a track chunk
+
+    Args:
+        data (Union[bytes, bytearray, memoryview]): Encoded events, see :func:`encode_events`
+
+    Returns:
+        bytes: Track chunk
+    """
+    return CHUNK_HEADER_STRUCT.pack(b'MTrk', len(data)) + data
+
+
+def write_file(stream: BinaryIO, format: int, tpqn: int, tracks: Sequence[Union[bytes, bytearray, memoryview]]) -> int:
+    """Writes a Standard MIDI File
+
+    Args:
+        stream (BinaryIO): Binary file object to write to
+        format (int): File format, 0, 1 or 2
+        tpqn (int): Ticks per quarter note
+        tracks (Sequence[Union[bytes, bytearray, memoryview]]): Encoded events of each track, see
+            :func:`encode_events`
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = stream.write(encode_header(format, len(tracks), tpqn))
+    for data in tracks:
+        written += stream.write(CHUNK_HEADER_STRUCT.pack(b'MTrk', len(data)))
+        written += stream.write(data)
+    return written
+
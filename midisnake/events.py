@@ -19,12 +19,16 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from midisnake.meta_events import *
 from midisnake.structure import Event
+from midisnake.sysex import read_vendor_payload, sequencer_handlers
 
-__all__ = ["NoteOn", "NoteOff", "PolyphonicAftertouch", "PitchBend", "events"]
+__all__ = ["NoteOn", "NoteOff", "PolyphonicAftertouch", "PitchBend", "ControlChange", "ProgramChange",
+           "ChannelPressure", "events", "event_types", "InternTable",
+           "get_note_name", "note_names", "note_names_octave", "controller_names", "controller_decoders",
+           "controller_values", "leftright_values", "switch_values"]
 
 note_values = {
     0: "C",
@@ -42,117 +46,82 @@ note_values = {
 }
 
 
+# Names of each note number, without and with their octave. Note 60 is middle C, C4
+note_names = tuple(note_values[note % 12] for note in range(128))  # type: Tuple[str, ...]
+note_names_octave = tuple("{}{}".format(note_values[note % 12], note // 12 - 1)
+                          for note in range(128))  # type: Tuple[str, ...]
+
+# Decoded values of balance and pan controllers, and of on/off switch controllers
+leftright_values = ("left",) * 64 + ("center",) + ("right",) * 63  # type: Tuple[str, ...]
+switch_values = ("off",) * 64 + ("on",) * 64  # type: Tuple[str, ...]
+
+
 def _decode_leftright(data: int) -> str:
-    if data > 127:
+    if not 0 <= data <= 127:
         raise ValueError("Balance value {} was outside of valid range of 0-127".format(data))
-    if data < 0:
-        raise ValueError("Balance value {} was outside of valid range of 0-127".format(data))
-    if data > 64:
-        return "right"
-    elif data < 64:
-        return "left"
-    elif data == 64:
-        return "center"
-    else:
-        raise ValueError("Unable to decode left-right value")
-
-
-midi_controls = {
-    0x00: {
-        "name": "Bank Select",
-        "byteorder": "big"
-    },
-    0x01: {
-        "name": "Modulation Wheel",
-        "byteorder": "big"
-    },
-    0x02: {
-        "name": "Breath Control",
-        "byteorder": "big"
-    },
-    0x03: {
-        "name": "undefined",
-        "byteorder": "big"
-    },
-    0x04: {
-        "name": "Foot Controller",
-        "byteorder": "big"
-    },
-    0x05: {
-        "name": "Portamento Time",
-        "byteorder": "big"
-    },
-    0x06: {
-        "name": "Data Entry",
-        "byteorder": "big"
-    },
-    0x07: {
-        "name": "Channel Volume",
-        "byteorder": "big"
-    },
-    0x08: {
-        "name": "Balance",
-        "byteorder": "big",
-        "decoder": _decode_leftright
-    },
-    0x09: {
-        "name": "undefined",
-        "byteorder": "big"
-    },
-    0x0A: {
-        "name": "Pan",
-        "byteorder": "big",
-        "decoder": _decode_leftright
-    },
-    0x0B: {
-        "name": "Expression",
-        "byteorder": "big"
-    },
-    0x0C: {
-        "name": "Effect Controller 1",
-        "byteorder": "big"
-    },
-    0x0D: {
-        "name": "Effect Controller 2",
-        "byteorder": "big"
-    },
-    0x0E: {
-        "name": "General Purpose",
-        "byteorder": "big"
-    },
-    0x0F: {
-        "name": "General Purpose",
-        "byteorder": "big"
-    },
-    0x10: {
-        "name": "General Purpose",
-        "byteorder": "big"
-    },
-    0x11: {
-        "name": "General Purpose",
-        "byteorder": "big"
-    },
-    0x12: {
-        "name": "General Purpose",
-        "byteorder": "big"
-    },
-    0x13: {
-        "name": "General Purpose",
+    return leftright_values[data]
+
+
+def _decode_switch(data: int) -> str:
+    if not 0 <= data <= 127:
+        raise ValueError("Switch value {} was outside of valid range of 0-127".format(data))
+    return switch_values[data]
+
+
+def _controller_names() -> List[str]:
+    names = ["undefined"] * 128
+    names[0x00:0x14] = ["Bank Select", "Modulation Wheel", "Breath Control", "undefined", "Foot Controller",
+                        "Portamento Time", "Data Entry", "Channel Volume", "Balance", "undefined", "Pan", "Expression",
+                        "Effect Controller 1", "Effect Controller 2", "undefined", "undefined", "General Purpose",
+                        "General Purpose", "General Purpose", "General Purpose"]
+    # 0x20 to 0x3F are the least significant bytes of 0x00 to 0x1F
+    for controller in range(0x20):
+        if names[controller] != "undefined":
+            names[controller + 0x20] = names[controller] + " LSB"
+    names[0x40:0x55] = ["Sustain Pedal", "Portamento", "Sostenuto", "Soft Pedal", "Legato Footswitch", "Hold 2"] + \
+        ["Sound Controller {}".format(number) for number in range(1, 11)] + ["General Purpose"] * 4 + \
+        ["Portamento Control"]
+    names[0x58] = "High Resolution Velocity Prefix"
+    names[0x5B:0x66] = ["Effects 1 Depth", "Effects 2 Depth", "Effects 3 Depth", "Effects 4 Depth", "Effects 5 Depth",
+                        "Data Increment", "Data Decrement", "Non-Registered Parameter Number LSB",
+                        "Non-Registered Parameter Number MSB", "Registered Parameter Number LSB",
+                        "Registered Parameter Number MSB"]
+    names[0x78:0x80] = ["All Sound Off", "Reset All Controllers", "Local Control", "All Notes Off", "Omni Mode Off",
+                        "Omni Mode On", "Mono Mode On", "Poly Mode On"]
+    return names
+
+
+# Name of each controller number
+controller_names = tuple(_controller_names())  # type: Tuple[str, ...]
+
+# Decoder of each controller's value, or None for controllers whose value is used as is
+controller_decoders = tuple(
+    _decode_leftright if controller in (0x08, 0x0A) else
+    _decode_switch if 0x40 <= controller <= 0x45 or controller == 0x7A else None
+    for controller in range(128))  # type: Tuple[Optional[Callable[[int], Any]], ...]
+
+# Decoded value of each controller value, as a 128 entry table, or None for controllers without a decoder
+controller_values = tuple(
+    leftright_values if decoder is _decode_leftright else switch_values if decoder is _decode_switch else None
+    for decoder in controller_decoders)  # type: Tuple[Optional[Tuple[Any, ...]], ...]
+
+midi_controls = {}  # type: Dict[int, Dict[str, Any]]
+for _controller in range(128):
+    midi_controls[_controller] = {
+        "name": controller_names[_controller],
         "byteorder": "big"
     }
-}
-
-meta_events = {
-    0: sequence_number,
-    1: text_event
-}  # type: Dict[int, Callable[[Union[BufferedReader, FileIO]], Tuple[Any, Any, Any]]]
+    if controller_decoders[_controller] is not None:
+        midi_controls[_controller]["decoder"] = controller_decoders[_controller]
+del _controller
 
 
-def get_note_name(data: int) -> str:
+def get_note_name(data: int, octave: bool = False) -> str:
     """Converts a MIDI note value to a note name.
 
     Arguments:
         data (int): Note value
+        octave (bool): Whether to include the octave, e.g. "C4" rather than "C" for note 60
 
     Returns:
         str: Note name
@@ -166,10 +135,9 @@ def get_note_name(data: int) -> str:
         raise ValueError("Note values cannot be larger than 127 (0x7F). Given value was {0} ({0:x})".format(data))
     if data < 0:
         raise ValueError("Note values cannot be smaller than 0 (0x00). Given value was {0} ({0:x})".format(data))
-    if data in range(0, 12):
-        return note_values[data]
-    else:
-        return note_values[data % 12]
+    if octave:
+        return note_names_octave[data]
+    return note_names[data]
 
 
 class NoteOn(Event):
@@ -200,11 +168,10 @@ class NoteOn(Event):
     raw_data = None  # type: int
 
     def _process(self, data: int):
-        data_array = bytearray.fromhex(hex(data)[2:])
-        self.channel_number = data_array[0] & 0x0F
-        self.note_number = data_array[1]
-        self.note_name = get_note_name(data_array[1])
-        self.note_velocity = data_array[2]
+        self.channel_number = (data >> 16) & 0x0F
+        self.note_number = note_number = (data >> 8) & 0xFF
+        self.note_name = note_names[note_number] if note_number < 128 else get_note_name(note_number)
+        self.note_velocity = data & 0xFF
         self.raw_data = data
 
 
@@ -236,11 +203,10 @@ class NoteOff(Event):
     raw_data = None  # type: int
 
     def _process(self, data: int):
-        data_array = bytearray.fromhex(hex(data)[2:])
-        self.channel_number = data_array[0] & 0x0F
-        self.note_number = data_array[1]
-        self.note_name = get_note_name(data_array[1])
-        self.note_velocity = data_array[2]
+        self.channel_number = (data >> 16) & 0x0F
+        self.note_number = note_number = (data >> 8) & 0xFF
+        self.note_name = note_names[note_number] if note_number < 128 else get_note_name(note_number)
+        self.note_velocity = data & 0xFF
         self.raw_data = data
 
 
@@ -269,11 +235,10 @@ class PolyphonicAftertouch(Event):
     raw_data = None  # type: int
 
     def _process(self, data: int):
-        data_array = bytearray.fromhex(hex(data)[2:])
-        self.channel_number = data_array[0] & 0x0F
-        self.note_number = data_array[1]
-        self.note_name = get_note_name(data_array[1])
-        self.pressure = data_array[2]
+        self.channel_number = (data >> 16) & 0x0F
+        self.note_number = note_number = (data >> 8) & 0xFF
+        self.note_name = note_names[note_number] if note_number < 128 else get_note_name(note_number)
+        self.pressure = data & 0xFF
         self.raw_data = data
 
 
@@ -300,40 +265,224 @@ class PitchBend(Event):
     raw_data = None  # type: int
 
     def _process(self, data: int):
-        data_array = bytearray.fromhex(hex(data)[2:])
-        self.channel_number = data_array[0] & 0x0F
-        self.bend_amount = (data_array[2] << 7) + data_array[1]
+        self.channel_number = (data >> 16) & 0x0F
+        self.bend_amount = ((data & 0xFF) << 7) + ((data >> 8) & 0xFF)
+        self.raw_data = data
+
+
+class ControlChange(Event):
+    """MIDI Control Change
+
+    Notes:
+        Subclasses the :class:`midisnake.structure.Event` metaclass. Controllers that are sent as most and least
+        significant byte pairs, and registered and non-registered parameters, span several events. Use
+        :class:`midisnake.controllers.ControllerState` to combine them
+
+    Attributes:
+        event_name (str): Name of Event
+        indicator_byte (int): Byte that indicates the MIDI Event type
+        controller_number (int): Controller, between 0 and 127
+        controller_name (str): Controller name, from :data:`controller_names`
+        controller_value (int): Value, between 0 and 127
+        channel_number (int): MIDI Channel number
+        raw_data (int): Initial data from MIDI file
+    """
+    event_name = "Control Change"
+    indicator_byte = 0xB0
+
+    controller_number = None  # type: int
+    controller_name = None  # type: str
+    controller_value = None  # type: int
+
+    channel_number = None  # type: int
+
+    raw_data = None  # type: int
+
+    def _process(self, data: int):
+        self.channel_number = (data >> 16) & 0x0F
+        self.controller_number = controller_number = (data >> 8) & 0xFF
+        if controller_number > 127:
+            raise ValueError("Controller numbers cannot be larger than 127 (0x7F). Given value was {}".format(
+                controller_number))
+        self.controller_name = controller_names[controller_number]
+        self.controller_value = data & 0xFF
+        self.raw_data = data
+
+    @property
+    def decoded_value(self) -> Any:
+        """Any: Value decoded by the controller's entry in :data:`controller_values`, e.g. "left" for pan, or the
+        value unchanged for controllers without a decoder"""
+        table = controller_values[self.controller_number]
+        if table is None or self.controller_value > 127:
+            return self.controller_value
+        return table[self.controller_value]
+
+
+class ProgramChange(Event):
+    """MIDI Program Change
+
+    Notes:
+        Subclasses the :class:`midisnake.structure.Event` metaclass. The event has a single data byte, so the last
+        byte of :attr:`raw_data` is 0
+
+    Attributes:
+        event_name (str): Name of Event
+        indicator_byte (int): Byte that indicates the MIDI Event type
+        program_number (int): Program, between 0 and 127
+        channel_number (int): MIDI Channel number
+        raw_data (int): Initial data from MIDI file
+    """
+    event_name = "Program Change"
+    indicator_byte = 0xC0
+
+    program_number = None  # type: int
+
+    channel_number = None  # type: int
+
+    raw_data = None  # type: int
+
+    def _process(self, data: int):
+        self.channel_number = (data >> 16) & 0x0F
+        self.program_number = (data >> 8) & 0xFF
+        self.raw_data = data
+
+
+class ChannelPressure(Event):
+    """MIDI Channel Pressure, or channel aftertouch
+
+    Notes:
+        Subclasses the :class:`midisnake.structure.Event` metaclass. The event has a single data byte, so the last
+        byte of :attr:`raw_data` is 0
+
+    Attributes:
+        event_name (str): Name of Event
+        indicator_byte (int): Byte that indicates the MIDI Event type
+        pressure (int): Pressure, between 0 and 127
+        channel_number (int): MIDI Channel number
+        raw_data (int): Initial data from MIDI file
+    """
+    event_name = "Channel Pressure"
+    indicator_byte = 0xD0
+
+    pressure = None  # type: int
+
+    channel_number = None  # type: int
+
+    raw_data = None  # type: int
+
+    def _process(self, data: int):
+        self.channel_number = (data >> 16) & 0x0F
+        self.pressure = (data >> 8) & 0xFF
         self.raw_data = data
 
 
 class MetaFactory:
-    def __new__(cls, midi_file: Union[FileIO, BufferedReader]) -> Union[MetaEventType, None]:
-        # If the event is a Sequencer Specific one, ignore it and consume the associated bytes
-        meta_variant_bytes = midi_file.read(1)
-        meta_variant = int.from_bytes(meta_variant_bytes, 'big')
+    """Decodes a meta event using the decoder registered for its type in :data:`midisnake.meta_events.meta_events`
+
+    Sequencer specific events are passed to :func:`midisnake.sysex.read_vendor_payload`, and None is returned when
+    their handler drops them.
+
+    Raises:
+        KeyError: If no decoder is registered for the meta type
+    """
+    def __new__(cls, midi_file: Union[FileIO, BufferedReader], meta_variant: int = None) -> Union[MetaEventType, None]:
+        if meta_variant is None:
+            meta_variant_bytes = midi_file.read(1)
+            meta_variant = int.from_bytes(meta_variant_bytes, 'big')
+        # Sequencer Specific events go to their manufacturer's handler, or are kept undecoded
         if meta_variant == 0x7F:
-            length_of_event = VariableLengthValue(midi_file)
-            _ = midi_file.read(length_of_event)
-            return None
+            return read_vendor_payload(midi_file, sequencer_handlers, 0xFF)
+
+        try:
+            variant = meta_events[meta_variant]
+        except IndexError:
+            variant = None
+        if variant is None:
+            raise KeyError("Unsupported meta event type 0x{:02X}".format(meta_variant))
+        variant_output = variant[0](midi_file)
+        variant_obj_type = variant[1]
+
+        if variant_obj_type is MetaTextEvent:
+            return MetaTextEvent(meta_event_prefixes[meta_variant], meta_variant, variant_output)
+        return variant_obj_type(variant_output)
+
 
-        variant_function = meta_events[meta_variant].function
-        variant_output = variant_function(midi_file)
-        variant_obj_type = meta_events[meta_variant].object_type
+events = [NoteOn, NoteOff, PitchBend, PolyphonicAftertouch, ControlChange, ProgramChange, ChannelPressure]
 
-        return variant_obj_type.__new__(variant_obj_type, variant_output)
+# Event classes indexed by the high nibble of their status byte, used by :class:`midisnake.structure.Track`
+event_types = [None] * 16  # type: List[Any]
+for _event in events:
+    event_types[_event.indicator_byte >> 4] = _event
+del _event
 
 
+def _read_only(event_type: Any) -> Any:
+    """Creates the read only subclass of a channel event class that interned events are changed to once decoded"""
+    def refuse(self, *args: Any) -> None:
+        raise AttributeError("Interned {} events are read only".format(event_type.__name__))
 
+    def reduce(self):
+        return event_type, (self.raw_data,)
 
-# event_info = data.read(16)  # type: bytes
-# event_array = bytearray(event_info)
-# self.variant_number = event_array[1]
-# # Attempt to call matching entry in meta_events
-# try:
-#     meta_data = meta_events[self.variant_number](data)
-# except KeyError:
-#     raise ValueError("Invalid or unsupported MIDI meta event. Event code was {0:x}".format(self.variant_number))
+    return type(event_type.__name__, (event_type,), {"__slots__": (), "__setattr__": refuse, "__delattr__": refuse,
+                                                      "__reduce__": reduce})
 
 
+_read_only_types = {_event: _read_only(_event) for _event in events}
 
-events = [NoteOn, NoteOff, PitchBend, PolyphonicAftertouch]
+
+class InternTable:
+    """
+    Bounded table of channel events by their packed raw data. When given to :class:`midisnake.parser.Parser`, events
+    with the same status and data bytes are decoded once and shared, rather than being decoded into a new object each
+    time they occur. Delta times are held by the track, so are unaffected.
+
+    Changing a shared event would change every occurrence, so interned events are read only and setting or deleting
+    their attributes raises :class:`AttributeError`. They are instances of a subclass of their event class, so should
+    be checked with :func:`isinstance`. Once the table holds :attr:`max_size` events, further events are decoded as
+    normal without being added, and stay writable.
+
+    Attributes:
+        events (Dict[int, Event]): Interned events, by raw data
+        max_size (int): Maximum number of events held
+    """
+    events = None  # type: Dict[int, Event]
+    max_size = None  # type: int
+
+    def __init__(self, max_size: int = 1 << 14) -> None:
+        """
+        Args:
+            max_size (int): Maximum number of events held
+        """
+        self.events = {}
+        self.max_size = max_size
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def get(self, data: int) -> Event:
+        """Returns the event for the given raw data, decoding and interning it if it isn't held yet
+
+        Args:
+            data (int): Packed status and data bytes
+
+        Returns:
+            Event: Interned event, or a new one if the table is full
+
+        Raises:
+            ValueError: If the status byte isn't that of a supported channel event
+        """
+        event = self.events.get(data)
+        if event is None:
+            event_type = event_types[(data >> 20) & 0x0F]
+            if event_type is None:
+                raise ValueError("Unsupported event with status byte 0x{:X}".format(data >> 16))
+            event = event_type(data)
+            if len(self.events) < self.max_size:
+                event.__class__ = _read_only_types[event_type]
+                self.events[data] = event
+        return event
+
+    def clear(self) -> None:
+        """Removes every interned event"""
+        self.events.clear()
@@ -20,16 +20,29 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import sys
+from array import array
+from typing import SupportsInt, SupportsAbs, Union, Any
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ["IntBuilder", "LengthException", "build_array"]
 
-from typing import SupportsInt, SupportsAbs
 
 class LengthException(Exception):
     pass
 
 
+# C type names by byte length, for lengths of 1 to 8 bytes
+_c_types = (None, "uint8", "uint16", "uint32", "uint32", "uint64", "uint64", "uint64", "uint64")
+
+
 class IntBuilder(SupportsInt, SupportsAbs):
     """
-    Builds and contains integer data from a variable length byte-encoded number
+    Builds and contains integer data from a variable length byte-encoded number. Each decoding is computed the first
+    time it's used
     
     Attributes:
         original_data (bytearray): the original data to the class
@@ -38,33 +51,34 @@ class IntBuilder(SupportsInt, SupportsAbs):
         little_endian (int): little endian decoded number
         big_endian (int): big endian decoded number
     """
-    original_data = None  # type: bytearray
-    c_type = None  # type: str
-    byte_length = None  # type: int
-    little_endian = 0  # type: int
-    big_endian = 0  # type: int
+    __slots__ = ("original_data", "byte_length", "_little_endian", "_big_endian")
 
     def __init__(self, input_bytes: bytearray) -> None:
         # Set byte_length
         self.byte_length = len(input_bytes)
-        # Set the c_type field based on size of bytearray
-        self.original_data = input_bytes
-        if 32 < self.byte_length * 8 <= 64:
-            self.c_type = "uint64"
-        elif 16 < self.byte_length * 8 <= 32:
-            self.c_type = "uint32"
-        elif 8 < self.byte_length * 8 <= 16:
-            self.c_type = "uint16"
-        elif 4 < self.byte_length * 8 <= 8:
-            self.c_type = "uint8"
-        elif self.byte_length == 0:
+        if self.byte_length == 0:
             raise LengthException("Can't build Int with bytearray of size 0")
-        else:
-            self.c_type = None
+        self.original_data = input_bytes
+        self._little_endian = None
+        self._big_endian = None
+
+    @property
+    def c_type(self) -> str:
+        if self.byte_length < len(_c_types):
+            return _c_types[self.byte_length]
+        return None
+
+    @property
+    def big_endian(self) -> int:
+        if self._big_endian is None:
+            self._big_endian = int.from_bytes(self.original_data, "big")
+        return self._big_endian
 
-        # Write ints
-        self.big_endian = int.from_bytes(input_bytes, "big")
-        self.little_endian = int.from_bytes(input_bytes, "little")
+    @property
+    def little_endian(self) -> int:
+        if self._little_endian is None:
+            self._little_endian = int.from_bytes(self.original_data, "little")
+        return self._little_endian
 
     def __repr__(self) -> str:
         return "<midisnake.integers.IntBuilder at 0x{id_hex:x}, raw: 0x{raw_val}, little endian: {little_endian}, " \
@@ -82,25 +96,81 @@ class IntBuilder(SupportsInt, SupportsAbs):
                                                    raw=str(''.join([hex(x)[2:] for x in self.original_data])))
 
     def __int__(self):
-        switch = {
-            "big": self.big_endian,
-            "little": self.little_endian
-        }
-        return switch[sys.byteorder]
+        if sys.byteorder == "big":
+            return self.big_endian
+        return self.little_endian
 
     def __add__(self, other: SupportsInt) -> [int, float]:
-        switch = {
-            "big": self.big_endian + int(other),
-            "little": self.little_endian + int(other)
-        }
-        return switch[sys.byteorder]
+        return self.__int__() + int(other)
 
     def __sub__(self, other: SupportsInt) -> [int, float]:
-        switch = {
-            "big": self.big_endian - int(other),
-            "little": self.little_endian - int(other)
-        }
-        return switch[sys.byteorder]
+        return self.__int__() - int(other)
 
     def __abs__(self):  # pragma: no cover
         return abs(self.__int__())
+
+
+# array typecodes by item size, for the widths build_array produces
+_typecodes = {}
+for _typecode in "QLIHB":
+    _typecodes[array(_typecode).itemsize] = _typecode
+del _typecode
+
+
+def build_array(data: Union[bytes, bytearray, memoryview], width: int, byteorder: str = "big",
+                use_numpy: bool = False) -> Any:
+    """Decodes a buffer of packed unsigned integers in one call, rather than building an :class:`IntBuilder` for each
+
+    Args:
+        data (Union[bytes, bytearray, memoryview]): Packed integers
+        width (int): Width of each integer in bytes, one of 1, 2, 3 or 4
+        byteorder (str): Byte order of the integers, "big" or "little"
+        use_numpy (bool): Return a NumPy array rather than an :class:`array.array`
+
+    Returns:
+        Union[array.array, numpy.ndarray]: Decoded integers. 3 byte integers are widened to 4 byte items
+
+    Raises:
+        LengthException: If the buffer's length isn't a multiple of the width
+        ValueError: If the width or byte order isn't supported
+        ImportError: If use_numpy is True but NumPy isn't installed
+    """
+    if width not in (1, 2, 3, 4):
+        raise ValueError("Unsupported integer width {}, must be 1, 2, 3 or 4".format(width))
+    if byteorder not in ("big", "little"):
+        raise ValueError("Byte order must be 'big' or 'little', given value was {!r}".format(byteorder))
+    data = memoryview(data).cast('B')
+    if len(data) % width:
+        raise LengthException("Buffer of {} bytes doesn't hold a whole number of {} byte integers".format(
+            len(data), width))
+    if use_numpy:
+        if numpy is None:
+            raise ImportError("NumPy is required for use_numpy=True")
+        return _build_numpy_array(data, width, byteorder)
+
+    if width == 3:
+        # Spread each value into 4 bytes, so it can be read as a 32 bit integer
+        count = len(data) // 3
+        widened = bytearray(count * 4)
+        offset = 1 if byteorder == "big" else 0
+        for index in range(3):
+            widened[index + offset::4] = data[index::3]
+        data = widened
+        width = 4
+
+    result = array(_typecodes[width])
+    result.frombytes(data)
+    if width > 1 and byteorder != sys.byteorder:
+        result.byteswap()
+    return result
+
+
+def _build_numpy_array(data: memoryview, width: int, byteorder: str) -> Any:
+    prefix = ">" if byteorder == "big" else "<"
+    if width != 3:
+        # astype converts to native byte order
+        return numpy.frombuffer(data, dtype="{}u{}".format(prefix, width)).astype("u{}".format(width))
+    packed = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 3).astype(numpy.uint32)
+    if byteorder == "big":
+        return (packed[:, 0] << 16) | (packed[:, 1] << 8) | packed[:, 2]
+    return (packed[:, 2] << 16) | (packed[:, 1] << 8) | packed[:, 0]
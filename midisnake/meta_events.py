@@ -25,10 +25,12 @@ Provides functions for parsing of MIDI meta events
 """
 
 from io import BufferedReader, FileIO
-from typing import Union, Tuple, NamedTuple, Callable, Any
+from typing import Union, Tuple, NamedTuple, Callable, Any, Sequence, List
 
+from midisnake.encode import encode_vlv, meta_payload
+from midisnake.source import ByteSource
 from midisnake.structure import VariableLengthValue
-from midisnake.errors import EventLengthError, EventNullLengthError, EventTextError
+from midisnake.errors import EventLengthError, EventTextError
 
 SMPTE_Format = NamedTuple("SMPTE_Format",
                           [
@@ -41,28 +43,98 @@ SMPTE_Format = NamedTuple("SMPTE_Format",
                           )  # type: Union[Callable, NamedTuple]
 
 
-class MetaTextEvent:
+class MetaEvent:
+    """Base of the meta event types. Meta events pickle as their type and undecoded data, and are decoded again by the
+    registered decoder when unpickled
+
+    Attributes:
+        variant_number (int): Meta event type
+    """
+    variant_number = None  # type: int
+
+    def __reduce__(self):
+        return _restore_meta, (self.variant_number, bytes(meta_payload(self)))
+
+
+def _restore_meta(variant: int, payload: bytes) -> 'MetaEvent':
+    # Imported here as midisnake.events depends on this module
+    from midisnake.events import MetaFactory
+    return MetaFactory(ByteSource(encode_vlv(len(payload)) + payload), variant)
+
+
+class MetaTextEvent(MetaEvent):
+    """Text meta event, covering types 0x01 to 0x09
+
+    The payload is kept undecoded, and :attr:`text` decodes it on first access by trying each of :attr:`encodings` in
+    turn. Set :attr:`encodings` on the class to change the default for every event, or on an instance to change it for
+    one event.
+
+    By default UTF-8 is tried, then Latin-1, which decodes any bytes so must be last. Shift-JIS text, common in
+    karaoke files, decodes as Latin-1 mojibake unless code page 932 is added before Latin-1, e.g.
+    ``("utf-8", "cp932", "latin-1")``. It isn't tried by default, as it also decodes most Latin-1 text, turning
+    bytes 0xA1 to 0xDF such as "©" into half-width katakana.
+
+    Attributes:
+        variant_number (int): Meta event type
+        length (int): Length of the event, including the event marker and type
+        raw_text (memoryview): Undecoded text
+        encodings (Tuple[str, ...]): Encodings tried, in order, when decoding :attr:`text`
+    """
     variant_number = None  # type: int
     variant_name = None  # type: str
 
     length = None  # type: int
 
-    text = None  # type: str
+    encodings = ("utf-8", "latin-1")  # type: Tuple[str, ...]
 
     event_info = None  # type: bytearray
-    raw_content = None  # type: bytearray
+    raw_text = None  # type: memoryview
 
-    def __init__(self, event_info: bytes, variant: int, data: Tuple[int, str, bytearray]) -> None:
+    def __init__(self, event_info: bytes, variant: int, data: Tuple[int, Any, memoryview]) -> None:
         self.event_info = bytearray(event_info)
         self.variant_number = variant
 
         self.length = data[0] + len(event_info)
-        self.raw_content = self.event_info + bytes(data[2])
+        self.raw_text = data[2]
+        self._text = None  # type: str
+
+    @property
+    def text(self) -> str:
+        """str: Decoded text, see :func:`decode`"""
+        if self._text is None:
+            self._text = self.decode()
+        return self._text
+
+    @property
+    def raw_content(self) -> bytearray:
+        """bytearray: Event marker, type and undecoded text"""
+        return self.event_info + self.raw_text
+
+    def decode(self, encodings: Sequence[str] = None) -> str:
+        """Decodes the text using the first encoding that succeeds
+
+        Args:
+            encodings (Sequence[str]): Encodings to try, defaults to :attr:`encodings`
+
+        Returns:
+            str: Decoded text
 
-        self.text = data[1]
+        Raises:
+            EventTextError: When the text is invalid in every encoding
+        """
+        if encodings is None:
+            encodings = self.encodings
+        for encoding in encodings:
+            try:
+                return str(self.raw_text, encoding)
+            except UnicodeDecodeError:
+                pass
+        raise EventTextError("Unparsable text in text event, tried encodings {}".format(", ".join(encodings)))
 
 
-class MetaSequenceNumber:
+class MetaSequenceNumber(MetaEvent):
+    variant_number = 0x00  # type: int
+
     sequence_number = None  # type: int
 
     length = None  # type: int
@@ -72,7 +144,9 @@ class MetaSequenceNumber:
         self.length, self.sequence_number, self.raw_content = data
 
 
-class MetaKeySignature:
+class MetaKeySignature(MetaEvent):
+    variant_number = 0x59  # type: int
+
     signature_index = None  # type: int
     signature_name = None  # type: str
 
@@ -93,7 +167,9 @@ class MetaKeySignature:
         self.signature_name = signature_names[self.signature_index + 7]
 
 
-class MetaTimeSignature:
+class MetaTimeSignature(MetaEvent):
+    variant_number = 0x58  # type: int
+
     numerator = None  # type: int
     denominator = None  # type: int
 
@@ -119,7 +195,9 @@ class MetaTimeSignature:
         return "{}/{}".format(self.numerator, actual_denominator)
 
 
-class MetaSMPTEOffset:
+class MetaSMPTEOffset(MetaEvent):
+    variant_number = 0x54  # type: int
+
     hours = None  # type: int
     minutes = None  # type: int
     seconds = None  # type: int
@@ -133,10 +211,12 @@ class MetaSMPTEOffset:
         self.hours, self.minutes, self.seconds, self.fps, self.ff = data[1]
 
         self.length = data[0]
-        self.raw_content = data[1]
+        self.raw_content = data[2]
 
 
-class MetaSetTempo:
+class MetaSetTempo(MetaEvent):
+    variant_number = 0x51  # type: int
+
     tpqm = None  # type: int
 
     length = None  # type: int
@@ -149,7 +229,9 @@ class MetaSetTempo:
         return self.tpqm / 60000000.0
 
 
-class MetaChannelPrefix:
+class MetaChannelPrefix(MetaEvent):
+    variant_number = 0x20  # type: int
+
     prefix = None  # type: int
 
     length = None  # type: int
@@ -159,7 +241,21 @@ class MetaChannelPrefix:
         self.length, self.prefix, self.raw_content = data
 
 
-class EndOfTrack:
+class MetaMIDIPort(MetaEvent):
+    variant_number = 0x21  # type: int
+
+    port = None  # type: int
+
+    length = None  # type: int
+    raw_content = None  # type: bytearray
+
+    def __init__(self, data: Tuple[int, int, bytearray]):
+        self.length, self.port, self.raw_content = data
+
+
+class EndOfTrack(MetaEvent):
+    variant_number = 0x2F  # type: int
+
     length = None  # type: int
 
     def __init__(self, data: Tuple[int, None, None]):
@@ -167,8 +263,7 @@ class EndOfTrack:
 
 
 def sequence_number(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytearray]:
-    length_bytes = bytearray(data.read(4))
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
     if length != 2:
         raise EventLengthError("Sequence Number length was incorrect. It should be 2, but it was {}".format(length))
     sequence_num_raw = bytearray(data.read(2))
@@ -176,86 +271,55 @@ def sequence_number(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, byte
     return length, sequence_num, sequence_num_raw
 
 
-def text_event(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
+def _text(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    # Text is decoded lazily by MetaTextEvent, so only the payload is read here
     length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparsable text in text event") from exc
+    view = getattr(data, "view", None)
+    raw_data = view(length) if view is not None else memoryview(data.read(length))
+    if len(raw_data) != length:
+        raise EventLengthError("Text event is truncated. Its length is {}, but only {} bytes remain".format(
+            length, len(raw_data)))
+    return length, None, raw_data
 
-    return length, text, raw_data
 
+def text_event(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-def copyright_notice(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparsable text in copyright notice") from exc
 
-    return length, text, raw_data
+def copyright_notice(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
 
-def chunk_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparsable text in track/sequence name") from exc
+def chunk_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-    return length, text, raw_data
 
+def instrument_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-def instrument_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparsable text in instrument name") from exc
 
-    return length, text, raw_data
+def lyric(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
 
-def lyric(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparseable text in lyric text") from exc
+def marker(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-    return length, text, raw_data
 
+def cue_point(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-def marker(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparseable text in marker text") from exc
-
-    return length, text, raw_data
 
+def program_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
-def cue_point(data: Union[FileIO, BufferedReader]) -> Tuple[int, str, bytearray]:
-    length = VariableLengthValue(data).value
-    raw_data = bytearray(data.read(length))
-    try:
-        text = raw_data.decode("ASCII")
-    except UnicodeDecodeError as exc:
-        raise EventTextError("Unparseable text in Cue Point text") from exc
 
-    return length, text, raw_data
+def device_name(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, memoryview]:
+    return _text(data)
 
 
 def channel_prefix(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytearray]:
-    length_bytes = data.read(4)
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
     if length != 0x01:
         raise EventLengthError("Channel Prefix length invalid. It should be 1, but it's {}".format(length))
     prefix_raw = bytearray(data.read(1))
@@ -264,17 +328,25 @@ def channel_prefix(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytea
     return length, prefix, prefix_raw
 
 
+def midi_port(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytearray]:
+    length = VariableLengthValue(data).value
+    if length != 0x01:
+        raise EventLengthError("MIDI Port length invalid. It should be 1, but it's {}".format(length))
+    port_raw = bytearray(data.read(1))
+    port = int.from_bytes(port_raw, "big")
+
+    return length, port, port_raw
+
+
 def end_of_track(data: Union[FileIO, BufferedReader]) -> Tuple[int, None, None]:
-    length_bytes = data.read(4)
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
     if length != 0:
         raise EventLengthError("End of Track event with non-zero length")
     return length, None, None
 
 
 def set_tempo(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytearray]:
-    length_bytes = data.read(4)
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
     if length != 3:
         raise EventLengthError("Set Tempo event with length other than 3. Given length was {}".format(length))
     raw_data = bytearray(data.read(3))
@@ -284,35 +356,34 @@ def set_tempo(data: Union[FileIO, BufferedReader]) -> Tuple[int, int, bytearray]
 
 
 def smpte_offset(data: Union[FileIO, BufferedReader]) -> Tuple[int, Tuple[int, int, int, int, int], bytearray]:
-    length_bytes = data.read(4)
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
     if length != 0x05:
         raise EventLengthError("SMPTE Offset length is not 5. Given value was {}".format(length))
 
     # Process Hours
-    hour_data = bytearray(data.read(8))
+    hour_data = bytearray(data.read(1))
     hour_bits = int.from_bytes(hour_data, 'big')
     null_bit = hour_bits & 0b10000000
 
     frame_crumb = (hour_bits & 0b01100000) >> 5
     hours = hour_bits & 0b00011111
 
-    minute_data = bytearray(data.read(8))
+    minute_data = bytearray(data.read(1))
     minute_bits = int.from_bytes(minute_data, "big")
     null_bit |= minute_bits & 0b11000000
     minutes = minute_bits & 0b00111111
 
-    second_data = bytearray(data.read(8))
+    second_data = bytearray(data.read(1))
     second_bits = int.from_bytes(second_data, "big")
     null_bit |= second_bits & 0b11000000
     seconds = second_bits & 0b00111111
 
-    frame_count_data = bytearray(data.read(8))
+    frame_count_data = bytearray(data.read(1))
     frame_count_bits = int.from_bytes(frame_count_data, "big")
     null_bit = frame_count_bits & 0b11100000
     frame_count = frame_count_bits & 0b00011111
 
-    fraction_data = bytearray(data.read(8))
+    fraction_data = bytearray(data.read(1))
     fraction = int.from_bytes(fraction_data, "big")
 
     raw_data = bytearray()
@@ -333,8 +404,7 @@ def smpte_offset(data: Union[FileIO, BufferedReader]) -> Tuple[int, Tuple[int, i
 
 
 def time_signature(data: Union[FileIO, BufferedReader]) -> Tuple[int, Tuple[int, int, int, int], bytearray]:
-    length_bytes = bytearray(data.read(1))
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
 
     if length != 0x04:
         raise EventLengthError("Time Signature event has invalid length. Should be 4, value was {}".format(length))
@@ -349,73 +419,80 @@ def time_signature(data: Union[FileIO, BufferedReader]) -> Tuple[int, Tuple[int,
 
 
 def key_signature(data: Union[FileIO, BufferedReader]) -> Tuple[int, Tuple[int, int], bytearray]:
-    length_bytes = bytearray(data.read(1))
-    length = int.from_bytes(length_bytes, "big")
+    length = VariableLengthValue(data).value
 
     if length != 0x02:
         raise EventLengthError("Key Signature event has invalid length. Should be 2, value was {}".format(length))
 
     data_bytes = bytearray(data.read(2))
-    signature_index = data_bytes[0]
+    # Number of sharps or flats, flats being negative
+    signature_index = int.from_bytes(data_bytes[0:1], "big", signed=True)
     minor_major = data_bytes[1]
 
     return length, (signature_index, minor_major), data_bytes
 
 
-meta_events = {
-    0x00: {
-        "function": sequence_number,
-        "object_type": MetaSequenceNumber
-    },
-    0x01: {
-        "function": text_event,
-        "object_type": MetaTextEvent
-    },
-    0x02: {
-        "function": copyright_notice,
-        "object_type": MetaTextEvent,
-    },
-    0x03: {
-        "function": chunk_name,
-        "object_type": MetaTextEvent
-    },
-    0x04: {
-        "function": instrument_name,
-        "object_type": MetaTextEvent
-    },
-    0x05: {
-        "function": lyric,
-        "object_type": MetaTextEvent
-    },
-    0x06: {
-        "function": marker,
-        "object_type": MetaTextEvent
-    },
-    0x07: {
-        "function": cue_point,
-        "object_type": MetaTextEvent
-    },
-    0x2F: {
-        "function": channel_prefix,
-        "object_type": MetaChannelPrefix
-    },
-    0x51: {
-        "function": set_tempo,
-        "object_type": MetaSetTempo
-    },
-    0x54: {
-        "function": smpte_offset,
-        "object_type": MetaSMPTEOffset
-    },
-    0x58: {
-        "function": time_signature,
-        "object_type": MetaTimeSignature
-    },
-    0x59: {
-        "function": key_signature,
-        "object_type": MetaKeySignature
-    }
-}
+MetaEventSpec = NamedTuple("MetaEventSpec", [
+    ('function', Callable[[Union[FileIO, BufferedReader]], Tuple[Any, Any, Any]]),
+    ('object_type', Callable[..., Any])
+])  # type: Union[Callable, NamedTuple]
+MetaEventSpec.__doc__ = """Entry of :data:`meta_events`
+
+Attributes:
+    function (Callable): Decoder, reads the event's length and data and returns a (length, value, raw data) tuple
+    object_type (Callable): Result type, called with the decoder's output. :class:`MetaTextEvent` is instead called
+        with the event marker and type, the type number and the decoder's output
+"""
+
+# Meta event decoders indexed by meta type. Slots are None for types that aren't supported
+meta_events = [None] * 128  # type: List[MetaEventSpec]
+
+# Event marker and type prefix of each meta type, as passed to MetaTextEvent
+meta_event_prefixes = tuple(bytes((0xFF, variant)) for variant in range(128))  # type: Tuple[bytes, ...]
+
+
+def register_meta_event(variant: int, function: Callable[[Union[FileIO, BufferedReader]], Tuple[Any, Any, Any]],
+                        object_type: Callable[..., Any], replace: bool = False) -> None:
+    """Registers a decoder for a meta event type, making it available to :class:`midisnake.events.MetaFactory`
+
+    Args:
+        variant (int): Meta event type, between 0 and 127
+        function (Callable): Decoder, given the file positioned after the type byte. Must consume the length and
+            data of the event and return a (length, value, raw data) tuple
+        object_type (Callable): Result type, called with the decoder's output
+        replace (bool): Whether to replace an existing decoder for the type
+
+    Raises:
+        ValueError: If the type is out of range, or already registered and replace is False
+    """
+    if not 0 <= variant < 128:
+        raise ValueError("Meta event type must be between 0 and 127, given value was {}".format(variant))
+    if meta_events[variant] is not None and not replace:
+        raise ValueError("Meta event type 0x{:02X} is already registered".format(variant))
+    meta_events[variant] = MetaEventSpec(function, object_type)
+
+
+for _variant, _function, _object_type in [
+    (0x00, sequence_number, MetaSequenceNumber),
+    (0x01, text_event, MetaTextEvent),
+    (0x02, copyright_notice, MetaTextEvent),
+    (0x03, chunk_name, MetaTextEvent),
+    (0x04, instrument_name, MetaTextEvent),
+    (0x05, lyric, MetaTextEvent),
+    (0x06, marker, MetaTextEvent),
+    (0x07, cue_point, MetaTextEvent),
+    (0x08, program_name, MetaTextEvent),
+    (0x09, device_name, MetaTextEvent),
+    (0x20, channel_prefix, MetaChannelPrefix),
+    (0x21, midi_port, MetaMIDIPort),
+    (0x2F, end_of_track, EndOfTrack),
+    (0x51, set_tempo, MetaSetTempo),
+    (0x54, smpte_offset, MetaSMPTEOffset),
+    (0x58, time_signature, MetaTimeSignature),
+    (0x59, key_signature, MetaKeySignature)
+]:
+    register_meta_event(_variant, _function, _object_type)
+del _variant, _function, _object_type
 
 MetaEventType = Union[MetaTextEvent, MetaSequenceNumber, MetaTimeSignature, MetaKeySignature, MetaSMPTEOffset,
-                      MetaSetTempo, MetaChannelPrefix]
+                      MetaSetTempo, MetaChannelPrefix, MetaMIDIPort, EndOfTrack]
@@ -0,0 +1,442 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Indexes the melodies of many files by their interval and rhythm n-grams, for searching a corpus by melody
+"""
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from math import log2
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from midisnake.scan import scan_track, track_chunks
+from midisnake.source import read_all
+
+__all__ = ["Melody", "Hit", "INTERVAL", "RHYTHM", "RHYTHM_STEPS", "extract_melodies", "interval_ngrams",
+           "rhythm_ngrams", "NgramIndex"]
+
+# Kinds of n-gram, kept in the top byte of their keys
+INTERVAL = 0
+RHYTHM = 1
+
+# Rhythm ratio resolution, in steps per doubling of the time between notes
+RHYTHM_STEPS = 4
+
+# Segment header: magic, version, n, number of postings, number of keys
+SEGMENT_HEADER = struct.Struct("<4sHHQQ")
+SEGMENT_MAGIC = b'MSNG'
+
+# Bits of a posting holding the track and note offset, below the file number
+TRACK_BITS = 12
+OFFSET_BITS = 20
+
+Melody = NamedTuple("Melody", [
+    ('track', int),
+    ('ticks', List[int]),
+    ('pitches', List[int])
+])  # type: Union[Callable, NamedTuple]
+Melody.__doc__ = """Notes of a track, reduced to a single line
+
+Attributes:
+    track (int): Track index
+    ticks (List[int]): Start of each note, in ticks, increasing
+    pitches (List[int]): Pitch of each note
+"""
+
+Hit = NamedTuple("Hit", [
+    ('file', str),
+    ('track', int),
+    ('offset', int),
+    ('score', int)
+])  # type: Union[Callable, NamedTuple]
+Hit.__doc__ = """Candidate match of a query
+
+Attributes:
+    file (str): Name the file was added with
+    track (int): Track index
+    offset (int): Index in the track's :class:`Melody` of the note matching the start of the query
+    score (int): Number of the query's n-grams found at this position
+"""
+
+
+def extract_melodies(source: Any) -> List[Melody]:
+    """Extracts the melody of each track of a file. Notes on channel 10, General MIDI percussion, are left out, and
+    only the highest of the notes starting together is kept. Events are read in place rather than decoded
+
+    Args:
+        source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+
+    Returns:
+        List[Melody]: Melody of each track, in file order, empty for tracks without notes
+
+    Raises:
+        ValueError: If the file is invalid
+    """
+    buffer = read_all(source)
+    melodies = []
+    for track_index, (start, end) in enumerate(track_chunks(buffer)):
+        ticks = []  # type: List[int]
+        pitches = []  # type: List[int]
+        tick = 0
+        for event in scan_track(buffer, start, end):
+            tick += event.delta
+            status = event.status
+            if status & 0xF0 == 0x90 and status != 0x99 and event.data2:
+                if ticks and ticks[-1] == tick:
+                    pitches[-1] = max(pitches[-1], event.data1)
+                else:
+                    ticks.append(tick)
+                    pitches.append(event.data1)
+            elif status == 0xFF and event.data1 == 0x2F:
+                break
+        melodies.append(Melody(track_index, ticks, pitches))
+    return melodies
+
+
+def _pack(kind: int, values: Sequence[int]) -> int:
+    key = kind
+    for value in values:
+        key = key << 8 | (value & 0xFF)
+    return key
+
+
+def interval_ngrams(pitches: Sequence[int], n: int) -> List[int]:
+    """Returns the keys of the interval n-grams of a melody, which are the same for every transposition of it
+
+    Args:
+        pitches (Sequence[int]): Pitch of each note
+        n (int): Intervals in each n-gram, from 1 to 7
+
+    Returns:
+        List[int]: Key of the n-gram starting at each note, for every note followed by n others
+    """
+    intervals = [following - pitch for pitch, following in zip(pitches, pitches[1:])]
+    return [_pack(INTERVAL, intervals[index:index + n]) for index in range(len(intervals) - n + 1)]
+
+
+def rhythm_ngrams(ticks: Sequence[int], n: int) -> List[int]:
+    """Returns the keys of the rhythm n-grams of a melody, which are the same at every tempo and tick resolution.
+    Each value is the ratio of the times between consecutive notes, on a log scale of :data:`RHYTHM_STEPS` steps per
+    doubling
+
+    Args:
+        ticks (Sequence[int]): Start of each note, strictly increasing
+        n (int): Ratios in each n-gram, from 1 to 7
+
+    Returns:
+        List[int]: Key of the n-gram starting at each note, for every note followed by n + 1 others
+
+    Raises:
+        ValueError: If a tick isn't after the one before it
+    """
+    gaps = [following - tick for tick, following in zip(ticks, ticks[1:])]
+    for index, gap in enumerate(gaps):
+        if gap <= 0:
+            raise ValueError("Tick {} at index {} isn't after the previous tick {}".format(
+                ticks[index + 1], index + 1, ticks[index]))
+    ratios = [max(min(round(log2(following / gap) * RHYTHM_STEPS), 127), -127)
+              for gap, following in zip(gaps, gaps[1:])]
+    return [_pack(RHYTHM, ratios[index:index + n]) for index in range(len(ratios) - n + 1)]
+
+
+class _Segment:
+    # Memory mapped segment file: postings grouped by key, then the sorted keys, then where each key's postings start
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as segment_file:
+            self.map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.n, posting_count, key_count = SEGMENT_HEADER.unpack_from(self.map)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError("{} isn't an index segment".format(path))
+        view = memoryview(self.map)
+        start = SEGMENT_HEADER.size
+        self.postings = view[start:start + 8 * posting_count].cast("Q")
+        start += 8 * posting_count
+        self.keys = view[start:start + 8 * key_count].cast("Q")
+        start += 8 * key_count
+        self.starts = view[start:start + 8 * (key_count + 1)].cast("Q")
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    # Postings are copied out, as the map can't be closed while views of it remain
+    def lookup(self, key: int) -> List[int]:
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.postings[self.starts[index]:self.starts[index + 1]].tolist()
+        return []
+
+    def items(self, order: int = 0) -> Iterator[Tuple[int, int, List[int]]]:
+        for index, key in enumerate(self.keys):
+            yield key, order, self.postings[self.starts[index]:self.starts[index + 1]].tolist()
+
+    def close(self) -> None:
+        for view in (self.postings, self.keys, self.starts):
+            view.release()
+        self.map.close()
+
+
+def _write_segment(path: str, n: int, posting_count: int, items: Iterator[Tuple[int, Sequence[int]]]) -> None:
+    # Postings are streamed out, while the keys and where their postings start are collected to write after them
+    keys = array("Q")
+    starts = array("Q", [0])
+    with open(path + ".tmp", "wb") as segment_file:
+        segment_file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, 1, n, posting_count, 0))
+        for key, postings in items:
+            segment_file.write(array("Q", postings).tobytes())
+            keys.append(key)
+            starts.append(starts[-1] + len(postings))
+        keys.tofile(segment_file)
+        starts.tofile(segment_file)
+        segment_file.seek(0)
+        segment_file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, 1, n, posting_count, len(keys)))
+    os.replace(path + ".tmp", path)
+
+
+class NgramIndex:
+    """
+    An inverted index from melodic n-grams to where they occur, stored in a directory
+
+    Each track's melody, see :func:`extract_melodies`, is indexed by its interval n-grams and its rhythm n-grams.
+    Added files are held in memory until :meth:`flush`, which writes them as a new segment file of postings sorted by
+    n-gram. Segments are memory mapped and searched by bisection, so queries read only the postings of their
+    n-grams, and :meth:`compact` merges them into one. A JSON manifest lists the files and segments, and is only
+    replaced once a segment is complete. An index has a single writer at a time.
+
+    Postings hold the file number in their top 32 bits, then the track in 12 bits and the note offset in 20. Tracks
+    and offsets beyond these aren't indexed.
+
+    Attributes:
+        directory (str): Directory holding the index
+        n (int): Intervals and ratios in each n-gram
+        files (List[str]): Name of each added file, by file number
+        flush_size (int): Postings held in memory before they are flushed automatically
+    """
+    directory = None  # type: str
+    n = None  # type: int
+    files = None  # type: List[str]
+    flush_size = None  # type: int
+
+    def __init__(self, directory: str, n: int = 4, flush_size: int = 1 << 22) -> None:
+        """
+        Args:
+            directory (str): Directory holding the index, created if it doesn't exist
+            n (int): Intervals and ratios in each n-gram, from 1 to 7. Ignored for existing indexes, which keep theirs
+            flush_size (int): Postings held in memory before they are flushed automatically
+
+        Raises:
+            ValueError: If n is out of range
+        """
+        if not 1 <= n <= 7:
+            raise ValueError("Invalid n-gram length {}".format(n))
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_size = flush_size
+        self._manifest = os.path.join(directory, "manifest.json")
+        self._buffer = {}  # type: Dict[int, array]
+        self._buffered = 0
+        self._segments = []  # type: List[_Segment]
+        if os.path.exists(self._manifest):
+            with open(self._manifest) as manifest_file:
+                manifest = json.load(manifest_file)
+            self.n = manifest["n"]
+            self.files = manifest["files"]
+            self._next_segment = manifest["next_segment"]
+            self._segments = [_Segment(os.path.join(directory, name)) for name in manifest["segments"]]
+        else:
+            self.n = n
+            self.files = []
+            self._next_segment = 0
+            self._save_manifest()
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __repr__(self) -> str:
+        return "<NgramIndex {}: {} files, {} segments>".format(self.directory, len(self.files), len(self._segments))
+
+    def __enter__(self) -> 'NgramIndex':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _save_manifest(self) -> None:
+        with open(self._manifest + ".tmp", "w") as manifest_file:
+            json.dump({"version": 1, "n": self.n, "files": self.files, "next_segment": self._next_segment,
+                       "segments": [os.path.basename(segment.path) for segment in self._segments]}, manifest_file)
+        os.replace(self._manifest + ".tmp", self._manifest)
+
+    def _ngrams(self, melody: Melody) -> Iterator[Tuple[int, int]]:
+        # Offset and key of every n-gram of a melody
+        yield from enumerate(interval_ngrams(melody.pitches, self.n))
+        yield from enumerate(rhythm_ngrams(melody.ticks, self.n))
+
+    def add(self, source: Any, name: str = None) -> int:
+        """Adds a file to the index. It can be searched straight away, and is written out by the next flush
+
+        Args:
+            source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+            name (str): Name returned in hits, by default the path given as source
+
+        Returns:
+            int: File number
+
+        Raises:
+            ValueError: If the file is invalid, or has no name and isn't given by path
+        """
+        if name is None:
+            if not isinstance(source, (str, os.PathLike)):
+                raise ValueError("Files not given by path need a name")
+            name = os.fspath(source)
+        melodies = extract_melodies(source)
+        file_number = len(self.files)
+        if file_number >> 32:
+            raise ValueError("Index is full")
+        for melody in melodies:
+            if melody.track >> TRACK_BITS:
+                break
+            base = file_number << 32 | melody.track << OFFSET_BITS
+            for offset, key in self._ngrams(melody):
+                if offset >> OFFSET_BITS:
+                    continue
+                postings = self._buffer.get(key)
+                if postings is None:
+                    postings = self._buffer[key] = array("Q")
+                postings.append(base | offset)
+                self._buffered += 1
+        self.files.append(name)
+        if self._buffered >= self.flush_size:
+            self.flush()
+        return file_number
+
+    def flush(self) -> None:
+        """Writes the files added since the last flush as a new segment, and records them in the manifest"""
+        if self._buffered:
+            path = os.path.join(self.directory, "segment-{:06d}.bin".format(self._next_segment))
+            _write_segment(path, self.n, self._buffered, ((key, self._buffer[key]) for key in sorted(self._buffer)))
+            self._segments.append(_Segment(path))
+            self._next_segment += 1
+            self._buffer = {}
+            self._buffered = 0
+        self._save_manifest()
+
+    def compact(self) -> None:
+        """Flushes, then merges every segment into one"""
+        self.flush()
+        if len(self._segments) < 2:
+            return
+        path = os.path.join(self.directory, "segment-{:06d}.bin".format(self._next_segment))
+
+        def merged() -> Iterator[Tuple[int, Sequence[int]]]:
+            # Segments hold increasing file numbers, so their postings are concatenated in segment order
+            streams = [segment.items(order) for order, segment in enumerate(self._segments)]
+            current = None  # type: Optional[int]
+            postings = array("Q")
+            for key, _, segment_postings in heapq.merge(*streams):
+                if key != current:
+                    if current is not None:
+                        yield current, postings
+                    current = key
+                    postings = array("Q")
+                postings.extend(segment_postings)
+            if current is not None:
+                yield current, postings
+
+        _write_segment(path, self.n, sum(len(segment) for segment in self._segments), merged())
+        old = self._segments
+        self._segments = [_Segment(path)]
+        self._next_segment += 1
+        self._save_manifest()
+        for segment in old:
+            segment.close()
+            os.remove(segment.path)
+
+    def postings(self, key: int) -> List[int]:
+        """Returns every posting of an n-gram, from the segments and from files not yet flushed
+
+        Args:
+            key (int): Key, see :func:`interval_ngrams` and :func:`rhythm_ngrams`
+
+        Returns:
+            List[int]: Postings, in file order
+        """
+        postings = []  # type: List[int]
+        for segment in self._segments:
+            postings.extend(segment.lookup(key))
+        postings.extend(self._buffer.get(key, ()))
+        return postings
+
+    def query(self, pitches: Sequence[int] = None, ticks: Sequence[int] = None, limit: int = 10,
+              max_postings: int = 100000) -> List[Hit]:
+        """Finds where a melody occurs, by its intervals, its rhythm or both
+
+        Every n-gram of the query votes for the positions its postings put the start of the query at, and the
+        positions with the most votes are returned, ties in file, track and offset order. N-grams with more postings
+        than max_postings, e.g. repeated notes, are too common to tell files apart, and are skipped.
+
+        Args:
+            pitches (Sequence[int]): Pitch of each note of the melody, in any key
+            ticks (Sequence[int]): Start of each note, at any tempo or resolution
+            limit (int): Maximum number of hits
+            max_postings (int): Most postings an n-gram may have to be counted
+
+        Returns:
+            List[Hit]: Hits, best first
+
+        Raises:
+            ValueError: If neither pitches nor ticks are given, there are too few notes for an n-gram, or the ticks
+                don't strictly increase
+        """
+        ngrams = []  # type: List[Tuple[int, int]]
+        if pitches is not None:
+            ngrams += enumerate(interval_ngrams(pitches, self.n))
+        if ticks is not None:
+            ngrams += enumerate(rhythm_ngrams(ticks, self.n))
+        if not ngrams:
+            raise ValueError("Queries need at least {} pitches or {} ticks".format(self.n + 1, self.n + 2))
+        votes = Counter()  # type: Counter
+        offset_mask = (1 << OFFSET_BITS) - 1
+        for query_offset, key in ngrams:
+            postings = self.postings(key)
+            if len(postings) > max_postings:
+                continue
+            for posting in postings:
+                start = (posting & offset_mask) - query_offset
+                if start >= 0:
+                    votes[posting - (posting & offset_mask) | start] += 1
+        return [Hit(self.files[posting >> 32], posting >> OFFSET_BITS & ((1 << TRACK_BITS) - 1),
+                    posting & offset_mask, score)
+                for posting, score in heapq.nsmallest(limit, votes.items(), key=lambda item: (-item[1], item[0]))]
+
+    def close(self) -> None:
+        """Flushes, and unmaps the segments"""
+        self.flush()
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
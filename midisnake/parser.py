@@ -19,29 +19,184 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from io import BufferedReader, FileIO
-from typing import Union, Dict, List
+from os import PathLike
+from typing import Union, List, BinaryIO
 
-from midisnake.structure import Track, Header, VariableLengthValue
+from midisnake.events import InternTable
+from midisnake.source import ByteSource
+
+from midisnake.stats import ParseStats
+from midisnake.structure import Track, Header, Diagnostic
 
 __all__ = ["Parser"]
 
+# Bytes read at a time when searching for a track chunk in tolerant mode
+_SEARCH_WINDOW = 1 << 16
+
 
 class Parser:
-    midi_file = None  # type: Union[BufferedReader, FileIO]
+    """
+    Parses a Standard MIDI File
+
+    Attributes:
+        midi_file (ByteSource): Source the file is read from
+        chunk_positions (List[int]): Offset of each track chunk in the file
+        header (Header): File header
+        tracks (List[Track]): Tracks in the file, in order
+        stats (ParseStats): Statistics being collected, or None when collection is disabled
+        strict (bool): Whether errors abort parsing
+        diagnostics (List[Diagnostic]): Problems recovered from when not parsing strictly
+        intern_table (InternTable): Table channel events are shared through, or None when they aren't interned
+
+    All parse state is held on the instance, and the modules keep no state of their own while parsing, so separate
+    parsers can run concurrently, e.g. in a :class:`concurrent.futures.ThreadPoolExecutor`. Each parser must be given
+    its own input; a file object shared between threads has a single position. Handlers and meta event decoders
+    should be registered before parsing starts, and a :class:`ParseStats` should not be shared between parsers
+    running at the same time. Parsing is pure Python, so threads mainly help when reading the input blocks.
+
+    Parsers can be pickled once parsing has finished. The header, chunk positions, diagnostics and tracks are kept,
+    each track as its encoded events, but the source, statistics and intern table are not, so :attr:`midi_file` and
+    :attr:`stats` are None on the restored parser.
+    """
+    midi_file = None  # type: ByteSource
 
     current_position = None  # type: int
     current_chunk = None  # type: int
-    chunk_positions = []  # type: List[int]
+    chunk_positions = None  # type: List[int]
 
     header = None  # type: Header
-    tracks = []  # type: List[Track]
+    tracks = None  # type: List[Track]
+    stats = None  # type: ParseStats
+    strict = True  # type: bool
+    diagnostics = None  # type: List[Diagnostic]
+    intern_table = None  # type: InternTable
 
-    def __init__(self, midi_file: BufferedReader) -> None:
-        self.midi_file = midi_file
+    def __init__(self, midi_file: Union[bytes, bytearray, memoryview, PathLike, BinaryIO], stats: ParseStats = None,
+                 strict: bool = True, intern: Union[bool, InternTable] = False) -> None:
+        """
+        Args:
+            midi_file (Union[bytes, bytearray, memoryview, PathLike, BinaryIO]): Data to parse. Either the file's
+                contents, a path, or a binary file object positioned at the start of the file
+            stats (Optional[ParseStats]): Statistics to record into. Collection is disabled when this is None
+            strict (bool): If True, the first error aborts parsing. If False, errors in tracks and chunk headers are
+                recorded in :attr:`diagnostics` and parsing resumes at the next plausible event or track chunk. The
+                file header must still be valid
+            intern (Union[bool, InternTable]): Whether to share channel events with the same status and data bytes,
+                see :class:`midisnake.events.InternTable`. True uses a new table, or a table can be given to share
+                events between parsers
+        """
+        self.midi_file = ByteSource.open(midi_file)
+        self.chunk_positions = []
+        self.tracks = []
+        self.stats = stats
+        self.strict = strict
+        self.diagnostics = []
+        if intern is True:
+            self.intern_table = InternTable()
+        elif intern is not False:
+            self.intern_table = intern
+        if stats is None:
+            self._parse()
+            return
+
+        try:
+            self._parse()
+        except Exception as exc:
+            stats.record_exception(exc)
+            raise
+        finally:
+            stats.emit()
+
+    def __reduce__(self):
+        return _restore_parser, (self.header, self.tracks, self.chunk_positions, self.strict, self.diagnostics)
+
+    def _parse(self):
         self.header = Header(self.midi_file)
+        for _ in range(self.header.ntrks):
+            if not self.strict and not self._find_track():
+                break
+            self._read_track()
 
     def _read_track(self):
-        self.chunk_positions.append(self.midi_file.tell())
+        start = self.midi_file.tell()
+        self.chunk_positions.append(start)
+
+        new_track = Track(self.midi_file, len(self.tracks), self.stats, self.strict, self.intern_table)
+        self.tracks.append(new_track)
+        if self.stats is not None:
+            self.stats.track_bytes.append(self.midi_file.tell() - start)
+
+        if not self.strict:
+            self.diagnostics.extend(new_track.diagnostics)
+            # Prefer the declared chunk boundary, but fall back to searching from the end of the track's data when
+            # the declared length is wrong
+            boundary = start + 8 + new_track.length
+            end_of_data = self.midi_file.tell()
+            self.midi_file.seek(boundary)
+            if self.midi_file.read(4) == b'MTrk':
+                self.midi_file.seek(boundary)
+            else:
+                if end_of_data != boundary:
+                    self.diagnostics.append(Diagnostic(start, new_track.track_number, "ValueError",
+                                                       "Track length {} does not match its data".format(
+                                                           new_track.length), end_of_data))
+                self.midi_file.seek(end_of_data)
+
+    def _find_track(self) -> bool:
+        """Moves to the next track chunk, recording a diagnostic if it isn't at the current position
+
+        Returns:
+            bool: Whether a track chunk was found
+        """
+        position = self.midi_file.tell()
+        if self.midi_file.read(4) == b'MTrk':
+            return self._chunk_header_complete(position)
+
+        self.midi_file.seek(position)
+        found = None
+        window_start = position
+        while found is None:
+            # Overlap windows by 3 bytes so a chunk type split across two reads is still found
+            window = self.midi_file.read(_SEARCH_WINDOW)
+            index = window.find(b'MTrk')
+            if index >= 0:
+                found = window_start + index
+            elif len(window) < _SEARCH_WINDOW:
+                break
+            else:
+                window_start += len(window) - 3
+                self.midi_file.seek(window_start)
+
+        if found is None:
+            self.diagnostics.append(Diagnostic(position, None, "ValueError", "Expected {} tracks, found {}".format(
+                self.header.ntrks, len(self.tracks)), None))
+            return False
+        self.diagnostics.append(Diagnostic(position, None, "ValueError", "Track Chunk header invalid", found))
+        return self._chunk_header_complete(found)
+
+    def _chunk_header_complete(self, position: int) -> bool:
+        """Moves to a track chunk, recording a diagnostic if the file ends within its header
+
+        Args:
+            position (int): Offset of the chunk
+
+        Returns:
+            bool: Whether the whole chunk header is present
+        """
+        self.midi_file.seek(position)
+        if len(self.midi_file.read(8)) < 8:
+            self.diagnostics.append(Diagnostic(position, None, "ValueError", "Track Chunk header truncated", None))
+            return False
+        self.midi_file.seek(position)
+        return True
+
 
-        new_track = Track(self.midi_file)
+def _restore_parser(header: Header, tracks: List[Track], chunk_positions: List[int], strict: bool,
+                    diagnostics: List[Diagnostic]) -> Parser:
+    parser = Parser.__new__(Parser)
+    parser.header = header
+    parser.tracks = tracks
+    parser.chunk_positions = chunk_positions
+    parser.strict = strict
+    parser.diagnostics = diagnostics
+    return parser
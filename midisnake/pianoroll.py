@@ -0,0 +1,203 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Renders columnar files to piano rolls, arrays of pitch against time, for feature extraction
+"""
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from midisnake.columnar import ColumnarFile
+from midisnake.playback import DEFAULT_TEMPO
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import scipy.sparse
+except ImportError:  # pragma: no cover
+    scipy = None
+
+__all__ = ["to_piano_roll", "iter_piano_roll"]
+
+
+def _tick_seconds(parsed: ColumnarFile, ticks: Any) -> Any:
+    # Converts ticks to seconds through the tempo map, merged from the Set Tempo events of every track
+    if parsed.tpqn >= 0x8000:
+        # SMPTE timing, with a negative frame rate in the top byte, 29 standing for 29.97, and ticks per frame below
+        frame_rate = 0x100 - (parsed.tpqn >> 8)
+        return ticks / ((30000 / 1001 if frame_rate == 29 else frame_rate) * (parsed.tpqn & 0xFF))
+    changes = [(0, -1, DEFAULT_TEMPO)]
+    for track_index, track in enumerate(parsed.tracks):
+        for index in numpy.flatnonzero((numpy.frombuffer(track.status, dtype="B") == 0xFF) &
+                                       (numpy.frombuffer(track.data1, dtype="B") == 0x51) &
+                                       (numpy.frombuffer(track.payload_length, dtype="I") == 3)):
+            changes.append((track.tick[index], track_index, int.from_bytes(track.payload(index), "big")))
+    changes.sort()
+    change_ticks = numpy.array([change[0] for change in changes], dtype="q")
+    tempos = numpy.array([change[2] for change in changes], dtype="d") / (parsed.tpqn * 1000000)
+    change_seconds = numpy.concatenate(([0.0], numpy.cumsum(numpy.diff(change_ticks) * tempos[:-1])))
+    segments = numpy.searchsorted(change_ticks, ticks, side="right") - 1
+    return change_seconds[segments] + (ticks - change_ticks[segments]) * tempos[segments]
+
+
+def _to_steps(parsed: ColumnarFile, ticks_per_step: Optional[int], fs: Optional[float], ticks: Any) -> Any:
+    if fs is not None:
+        return numpy.floor(_tick_seconds(parsed, ticks) * fs).astype("q")
+    return ticks // ticks_per_step
+
+
+def _notes(parsed: ColumnarFile, ticks_per_step: Optional[int], fs: Optional[float],
+           channels: Iterable[int] = None) -> Tuple[Any, Any, Any, Any, int]:
+    # Returns the pitch, first step, step after the last and velocity of every note, and the number of steps in the
+    # file. Notes that are never released last until the end of the file, and every note lasts at least one step
+    if numpy is None:
+        raise ImportError("NumPy is required for piano rolls")
+    if (ticks_per_step is None) == (fs is None):
+        raise ValueError("Give exactly one of ticks_per_step and fs")
+    if ticks_per_step is not None and not (isinstance(ticks_per_step, int) and ticks_per_step > 0):
+        raise ValueError("Invalid ticks per step {}".format(ticks_per_step))
+    if fs is not None and not fs > 0:
+        raise ValueError("Invalid frame rate {}".format(fs))
+    end_tick = max((track.tick[-1] for track in parsed.tracks if len(track)), default=0)
+    wanted = numpy.zeros(16, dtype=bool)
+    wanted[list(range(16)) if channels is None else list(channels)] = True
+
+    start_ticks, end_ticks, pitches, velocities = [], [], [], []
+    for track in parsed.tracks:
+        on_indices, off_indices = track.note_pairs()
+        on_indices = numpy.frombuffer(on_indices, dtype="q")
+        off_indices = numpy.frombuffer(off_indices, dtype="q")
+        ticks = numpy.frombuffer(track.tick, dtype="q")
+        status = numpy.frombuffer(track.status, dtype="B")[on_indices]
+        selected = wanted[status & 0x0F]
+        on_indices, off_indices = on_indices[selected], off_indices[selected]
+        start_ticks.append(ticks[on_indices])
+        end_ticks.append(numpy.where(off_indices >= 0, ticks[off_indices], end_tick))
+        pitches.append(numpy.frombuffer(track.data1, dtype="B")[on_indices])
+        velocities.append(numpy.frombuffer(track.data2, dtype="B")[on_indices])
+
+    def join(parts: list, dtype: str) -> Any:
+        return numpy.concatenate(parts).astype(dtype) if parts else numpy.zeros(0, dtype=dtype)
+
+    starts = _to_steps(parsed, ticks_per_step, fs, join(start_ticks, "q"))
+    ends = numpy.maximum(_to_steps(parsed, ticks_per_step, fs, join(end_ticks, "q")), starts + 1)
+    length = int(max(_to_steps(parsed, ticks_per_step, fs, numpy.array([end_tick], dtype="q"))[0],
+                     ends.max() if len(ends) else 0))
+    return join(pitches, "q"), starts, ends, join(velocities, "q"), length
+
+
+def _render(pitches: Any, starts: Any, ends: Any, values: Any, limit: int, offset: int, width: int) -> Any:
+    # Adds each note's value at its start and subtracts it after its end, then sums along time up to a limit,
+    # clipping notes to a window of steps
+    row = width + 1
+    starts = numpy.clip(starts - offset, 0, width)
+    ends = numpy.clip(ends - offset, 0, width)
+    changes = numpy.zeros((128, row), dtype="i")
+    numpy.add.at(changes, (pitches, starts), values)
+    numpy.subtract.at(changes, (pitches, ends), values)
+    roll = numpy.cumsum(changes[:, :width], axis=1, dtype="i")
+    return numpy.minimum(roll, limit, out=roll).astype("B")
+
+
+def to_piano_roll(parsed: ColumnarFile, ticks_per_step: int = None, fs: float = None, channels: Iterable[int] = None,
+                  velocity: bool = True, sparse: bool = False) -> Any:
+    """Renders a file to a piano roll, with a row for each pitch and a column for each step of time
+
+    Notes are paired with :meth:`midisnake.columnar.ColumnarTrack.note_pairs` and drawn all at once from the
+    differences at their ends, rather than step by step. Notes last at least one step, and those that are never
+    released last until the end of the file. The velocities of overlapping notes of the same pitch add up, to at most
+    127.
+
+    Args:
+        parsed (ColumnarFile): File to render
+        ticks_per_step (int): Ticks in each step. Give either this or fs
+        fs (float): Steps per second, following the tempo map of the file. Give either this or ticks_per_step
+        channels (Iterable[int]): Channels to render, or None for all of them
+        velocity (bool): Whether cells hold the velocity of the note sounding, rather than 1 for any note
+        sparse (bool): Whether to return a :class:`scipy.sparse.csr_matrix` instead of a dense array
+
+    Returns:
+        Union[numpy.ndarray, scipy.sparse.csr_matrix]: Piano roll of shape (128, steps), of unsigned bytes
+
+    Raises:
+        ImportError: If NumPy isn't installed, or SciPy when sparse is True
+        ValueError: If both or neither of ticks_per_step and fs are given, or the one given isn't positive
+    """
+    if sparse and scipy is None:
+        raise ImportError("SciPy is required for sparse piano rolls")
+    pitches, starts, ends, velocities, length = _notes(parsed, ticks_per_step, fs, channels)
+    values = velocities if velocity else numpy.ones(len(pitches), dtype="q")
+    limit = 127 if velocity else 1
+    if not sparse:
+        return _render(pitches, starts, ends, values, limit, 0, length)
+
+    # Lists every cell each note covers, counting from each note's start
+    durations = ends - starts
+    total = int(durations.sum())
+    firsts = numpy.repeat(numpy.cumsum(durations) - durations, durations)
+    columns = numpy.repeat(starts, durations) + numpy.arange(total) - firsts
+    roll = scipy.sparse.csr_matrix((numpy.repeat(values, durations), (numpy.repeat(pitches, durations), columns)),
+                                   shape=(128, length), dtype="q")
+    roll.sum_duplicates()
+    roll.data = numpy.minimum(roll.data, limit)
+    return roll.astype("B")
+
+
+def iter_piano_roll(parsed: ColumnarFile, width: int, ticks_per_step: int = None, fs: float = None,
+                    channels: Iterable[int] = None, velocity: bool = True) -> Iterator[Any]:
+    """Renders a file to a piano roll a window at a time, for files too long to hold whole. Windows joined together
+    are the same as :func:`to_piano_roll`, except that the last is padded with silence
+
+    Only the notes sounding in each window are drawn. Notes are sorted by start, and notes that end before a window
+    are skipped through the running maximum of their ends.
+
+    Args:
+        parsed (ColumnarFile): File to render
+        width (int): Steps in each window
+        ticks_per_step (int): Ticks in each step. Give either this or fs
+        fs (float): Steps per second, following the tempo map of the file. Give either this or ticks_per_step
+        channels (Iterable[int]): Channels to render, or None for all of them
+        velocity (bool): Whether cells hold the velocity of the note sounding, rather than 1 for any note
+
+    Yields:
+        numpy.ndarray: Each window, of shape (128, width)
+
+    Raises:
+        ImportError: If NumPy isn't installed
+        ValueError: If the width isn't positive, or both or neither of ticks_per_step and fs are given, or the one
+            given isn't positive
+    """
+    if width < 1:
+        raise ValueError("Invalid width {}".format(width))
+    pitches, starts, ends, velocities, length = _notes(parsed, ticks_per_step, fs, channels)
+    values = velocities if velocity else numpy.ones(len(pitches), dtype="q")
+    order = numpy.argsort(starts, kind="stable")
+    pitches, starts, ends, values = pitches[order], starts[order], ends[order], values[order]
+    latest_ends = numpy.maximum.accumulate(ends) if len(ends) else ends
+    for offset in range(0, length, width):
+        first = numpy.searchsorted(latest_ends, offset, side="right")
+        last = numpy.searchsorted(starts, offset + width)
+        window = slice(first, last)
+        yield _render(pitches[window], starts[window], ends[window], values[window], 127 if velocity else 1, offset,
+                      width)
@@ -0,0 +1,469 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Checkpoints playback state through a file, so playback can start from any tick without replaying the whole file
+"""
+import heapq
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from midisnake.scan import RawEvent, read_event, track_chunks
+from midisnake.source import ByteSource, read_all
+from midisnake.structure import Header
+
+__all__ = ["ChannelState", "TrackPosition", "PlaybackState", "SeekIndex", "DEFAULT_TEMPO"]
+
+# Microseconds per quarter note until the first Set Tempo event, 120 beats per minute
+DEFAULT_TEMPO = 500000
+
+# Controllers that select or set registered and non-registered parameters, held in ChannelState.parameters
+_PARAMETER_CONTROLLERS = frozenset((0x06, 0x26, 0x60, 0x61, 0x62, 0x63, 0x64, 0x65))
+
+# Controllers kept by Reset All Controllers
+_RESET_KEEPS = frozenset((0x00, 0x07, 0x0A, 0x20, 0x27, 0x2A))
+
+
+class ChannelState:
+    """
+    State of a MIDI channel during playback
+
+    Attributes:
+        program (Optional[int]): Current program, or None if no Program Change has been played
+        controllers (Dict[int, int]): Last value of each controller, apart from channel mode messages and the
+            controllers that set parameters
+        registered (bool): Whether the selected parameter is a registered parameter (RPN), rather than a
+            non-registered one (NRPN)
+        parameter (int): 14 bit number of the selected parameter, 0x3FFF when none is selected
+        parameters (Dict[Tuple[bool, int], int]): 14 bit value of each parameter set, by whether it's registered and
+            its number
+        pitch_bend (int): Current pitch bend, 0x2000 being no bend
+        pressure (Optional[int]): Current channel pressure, or None if none has been played
+        notes (Dict[int, int]): Velocity of each held note
+    """
+    program = None  # type: Optional[int]
+    controllers = None  # type: Dict[int, int]
+    registered = True  # type: bool
+    parameter = 0x3FFF  # type: int
+    parameters = None  # type: Dict[Tuple[bool, int], int]
+    pitch_bend = 0x2000  # type: int
+    pressure = None  # type: Optional[int]
+    notes = None  # type: Dict[int, int]
+
+    def __init__(self) -> None:
+        self.controllers = {}
+        self.parameters = {}
+        self.notes = {}
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ChannelState) and self.as_dict() == other.as_dict()
+
+    def apply(self, status: int, data1: int, data2: int) -> None:
+        """Applies a channel event
+
+        Args:
+            status (int): Status byte
+            data1 (int): First data byte
+            data2 (int): Second data byte, ignored for events with one
+        """
+        status_class = status & 0xF0
+        if status_class == 0x90 and data2:
+            self.notes[data1] = data2
+        elif status_class == 0x80 or status_class == 0x90:
+            self.notes.pop(data1, None)
+        elif status_class == 0xB0:
+            self._control_change(data1, data2)
+        elif status_class == 0xC0:
+            self.program = data1
+        elif status_class == 0xD0:
+            self.pressure = data1
+        elif status_class == 0xE0:
+            self.pitch_bend = (data2 << 7) | data1
+
+    def _control_change(self, controller: int, value: int) -> None:
+        if controller >= 0x78:
+            # Channel mode messages, only the note and controller resetting ones affect state
+            if controller == 0x79:
+                self.controllers = {key: kept for key, kept in self.controllers.items() if key in _RESET_KEEPS}
+                self.parameter = 0x3FFF
+                self.pitch_bend = 0x2000
+                self.pressure = None
+            elif controller != 0x7A:
+                self.notes.clear()
+        elif controller not in _PARAMETER_CONTROLLERS:
+            self.controllers[controller] = value
+        elif controller >= 0x62:
+            # Parameter selection, odd controllers set the most significant byte
+            self.registered = controller >= 0x64
+            if controller & 1:
+                self.parameter = (value << 7) | (self.parameter & 0x7F)
+            else:
+                self.parameter = (self.parameter & 0x3F80) | value
+        elif self.parameter != 0x3FFF:
+            key = (self.registered, self.parameter)
+            current = self.parameters.get(key, 0)
+            if controller == 0x06:
+                self.parameters[key] = value << 7
+            elif controller == 0x26:
+                self.parameters[key] = (current & 0x3F80) | value
+            elif controller == 0x60:
+                self.parameters[key] = min(current + 1, 0x3FFF)
+            else:
+                self.parameters[key] = max(current - 1, 0)
+
+    def copy(self) -> 'ChannelState':
+        """Returns an independent copy
+
+        Returns:
+            ChannelState: Copy
+        """
+        return ChannelState.from_dict(self.as_dict())
+
+    def messages(self, channel: int, notes: bool = True) -> List[bytes]:
+        """Returns the channel events that bring a channel from its initial state to this one. Bank select is sent
+        before the program, and held notes last
+
+        Args:
+            channel (int): Channel to address the events to
+            notes (bool): Whether to include Note On events for held notes
+
+        Returns:
+            List[bytes]: Encoded events, without delta times
+        """
+        control = 0xB0 | channel
+        messages = []
+        for controller in (0x00, 0x20):
+            if controller in self.controllers:
+                messages.append(bytes((control, controller, self.controllers[controller])))
+        if self.program is not None:
+            messages.append(bytes((0xC0 | channel, self.program)))
+        for controller, value in sorted(self.controllers.items()):
+            if controller not in (0x00, 0x20):
+                messages.append(bytes((control, controller, value)))
+        for (registered, parameter), value in sorted(self.parameters.items()):
+            select = 0x64 if registered else 0x62
+            messages += [bytes((control, select + 1, parameter >> 7)), bytes((control, select, parameter & 0x7F)),
+                         bytes((control, 0x06, value >> 7)), bytes((control, 0x26, value & 0x7F))]
+        if self.parameters or self.parameter != 0x3FFF:
+            select = 0x64 if self.registered else 0x62
+            messages += [bytes((control, select + 1, self.parameter >> 7)),
+                         bytes((control, select, self.parameter & 0x7F))]
+        if self.pressure is not None:
+            messages.append(bytes((0xD0 | channel, self.pressure)))
+        if self.pitch_bend != 0x2000:
+            messages.append(bytes((0xE0 | channel, self.pitch_bend & 0x7F, self.pitch_bend >> 7)))
+        for note, velocity in sorted(self.notes.items()) if notes else ():
+            messages.append(bytes((0x90 | channel, note, velocity)))
+        return messages
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Converts the state to a JSON serialisable dict
+
+        Returns:
+            Dict[str, Any]: State
+        """
+        return {
+            "program": self.program,
+            "controllers": sorted([controller, value] for controller, value in self.controllers.items()),
+            "registered": self.registered,
+            "parameter": self.parameter,
+            "parameters": sorted([registered, parameter, value]
+                                 for (registered, parameter), value in self.parameters.items()),
+            "pitch_bend": self.pitch_bend,
+            "pressure": self.pressure,
+            "notes": sorted([note, velocity] for note, velocity in self.notes.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChannelState':
+        """Restores a state converted by :func:`as_dict`
+
+        Args:
+            data (Dict[str, Any]): State
+
+        Returns:
+            ChannelState: Restored state
+        """
+        state = cls()
+        state.program = data["program"]
+        state.controllers = {controller: value for controller, value in data["controllers"]}
+        state.registered = data["registered"]
+        state.parameter = data["parameter"]
+        state.parameters = {(registered, parameter): value for registered, parameter, value in data["parameters"]}
+        state.pitch_bend = data["pitch_bend"]
+        state.pressure = data["pressure"]
+        state.notes = {note: velocity for note, velocity in data["notes"]}
+        return state
+
+
+TrackPosition = NamedTuple("TrackPosition", [
+    ('offset', int),
+    ('tick', int),
+    ('running_status', Optional[int])
+])  # type: Union[Callable, NamedTuple]
+TrackPosition.__doc__ = """Position reached in a track
+
+Attributes:
+    offset (int): Offset of the next event's delta time in the file. This is the end of the track chunk once the
+        track has ended
+    tick (int): Absolute time of the last event played from the track, which the next event's delta time is relative
+        to
+    running_status (Optional[int]): Running status in effect, or None
+"""
+
+PlaybackState = NamedTuple("PlaybackState", [
+    ('tick', int),
+    ('seconds', Optional[float]),
+    ('tempo', int),
+    ('time_signature', Optional[Tuple[int, int, int, int]]),
+    ('tracks', Tuple[TrackPosition, ...]),
+    ('channels', Tuple[ChannelState, ...])
+])  # type: Union[Callable, NamedTuple]
+PlaybackState.__doc__ = """State of playback at a tick, after every event before the tick has been played and before
+any event at the tick has been
+
+Attributes:
+    tick (int): Absolute time, in ticks
+    seconds (Optional[float]): Time in seconds, or None for files timed in SMPTE frames
+    tempo (int): Microseconds per quarter note
+    time_signature (Optional[Tuple[int, int, int, int]]): Data bytes of the last Time Signature event, or None
+    tracks (Tuple[TrackPosition, ...]): Position in each track
+    channels (Tuple[ChannelState, ...]): State of each of the 16 channels
+"""
+
+
+def _state_as_dict(state: PlaybackState) -> Dict[str, Any]:
+    return {
+        "tick": state.tick,
+        "seconds": state.seconds,
+        "tempo": state.tempo,
+        "time_signature": None if state.time_signature is None else list(state.time_signature),
+        "tracks": [list(position) for position in state.tracks],
+        "channels": [channel.as_dict() for channel in state.channels]
+    }
+
+
+def _state_from_dict(data: Dict[str, Any]) -> PlaybackState:
+    return PlaybackState(data["tick"], data["seconds"], data["tempo"],
+                         None if data["time_signature"] is None else tuple(data["time_signature"]),
+                         tuple(TrackPosition(*position) for position in data["tracks"]),
+                         tuple(ChannelState.from_dict(channel) for channel in data["channels"]))
+
+
+class _Playback:
+    # Plays the tracks of a file in time order from a state, one event at a time, keeping the state up to date
+    def __init__(self, buffer: Any, chunks: Sequence[Tuple[int, int]], tpqn: int, state: PlaybackState) -> None:
+        self.buffer = buffer
+        self.chunks = chunks
+        # Files timed in SMPTE frames have the top bit of the division set, and no tempo based time
+        self.tpqn = tpqn if tpqn < 0x8000 else None
+        self.tick = state.tick
+        self.seconds = state.seconds
+        self.tempo = state.tempo
+        self.time_signature = state.time_signature
+        self.positions = [list(position) for position in state.tracks]
+        self.channels = [channel.copy() for channel in state.channels]
+        self.pending = []  # type: List[Tuple[int, int, RawEvent]]
+        for track_index in range(len(chunks)):
+            self._read_next(track_index)
+        heapq.heapify(self.pending)
+
+    def _read_next(self, track_index: int) -> None:
+        offset, tick, running_status = self.positions[track_index]
+        if offset < self.chunks[track_index][1]:
+            event = read_event(self.buffer, offset, running_status)
+            heapq.heappush(self.pending, (tick + event.delta, track_index, event))
+
+    def peek_tick(self) -> Optional[int]:
+        return self.pending[0][0] if self.pending else None
+
+    def step(self) -> Tuple[int, int, RawEvent]:
+        tick, track_index, event = heapq.heappop(self.pending)
+        if self.tpqn is not None:
+            self.seconds += (tick - self.tick) * self.tempo / (self.tpqn * 1000000.0)
+        self.tick = tick
+        position = self.positions[track_index]
+        position[0] = event.end
+        position[1] = tick
+        status = event.status
+        # System Exclusive and meta events cancel running status
+        position[2] = status if status < 0xF0 else None
+        if status < 0xF0:
+            self.channels[status & 0x0F].apply(status, event.data1, event.data2)
+        elif status == 0xFF:
+            payload = self.buffer[event.payload_offset:event.payload_offset + event.payload_length]
+            if event.data1 == 0x51 and event.payload_length == 3:
+                self.tempo = int.from_bytes(payload, "big")
+            elif event.data1 == 0x58 and event.payload_length == 4:
+                self.time_signature = tuple(payload)
+            elif event.data1 == 0x2F:
+                # Anything after End of Track isn't played
+                position[0] = self.chunks[track_index][1]
+        self._read_next(track_index)
+        return tick, track_index, event
+
+    def snapshot(self, tick: int) -> PlaybackState:
+        seconds = self.seconds
+        if self.tpqn is not None:
+            seconds += (tick - self.tick) * self.tempo / (self.tpqn * 1000000.0)
+        return PlaybackState(tick, seconds, self.tempo, self.time_signature,
+                             tuple(TrackPosition(*position) for position in self.positions),
+                             tuple(channel.copy() for channel in self.channels))
+
+
+class SeekIndex:
+    """
+    Playback checkpoints through a file. A checkpoint records the state of playback every :attr:`interval` ticks,
+    and :func:`seek` restores the nearest checkpoint before a tick and plays forward from it, so seeking only reads
+    the events between the checkpoint and the tick
+
+    The index holds offsets rather than data, so it's used with the file it was built from. Convert it with
+    :func:`as_dict` to store it alongside the file.
+
+    Attributes:
+        tpqn (int): Ticks per quarter note of the file
+        interval (int): Ticks between checkpoints
+        chunks (List[Tuple[int, int]]): Start and end offset of each track's data
+        checkpoints (List[PlaybackState]): Checkpoints, in tick order. The first is at tick 0
+    """
+    tpqn = None  # type: int
+    interval = None  # type: int
+    chunks = None  # type: List[Tuple[int, int]]
+    checkpoints = None  # type: List[PlaybackState]
+
+    def __init__(self, tpqn: int, interval: int, chunks: Sequence[Tuple[int, int]],
+                 checkpoints: Sequence[PlaybackState]) -> None:
+        self.tpqn = tpqn
+        self.interval = interval
+        self.chunks = [tuple(chunk) for chunk in chunks]
+        self.checkpoints = list(checkpoints)
+        self._ticks = [checkpoint.tick for checkpoint in self.checkpoints]
+
+    @classmethod
+    def build(cls, source: Any, interval: int = None) -> 'SeekIndex':
+        """Plays through a file, recording checkpoints
+
+        Args:
+            source (Any): File, as any input accepted by :class:`midisnake.parser.Parser`
+            interval (int): Ticks between checkpoints, defaults to 16 quarter notes
+
+        Returns:
+            SeekIndex: Index of the file
+
+        Raises:
+            ValueError: If the file's header or an event is invalid
+        """
+        buffer = read_all(source)
+        tpqn = Header(ByteSource(buffer)).tpqn
+        if interval is None:
+            interval = 16 * (tpqn if tpqn < 0x8000 else 96)
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1 tick")
+        chunks = track_chunks(buffer)
+
+        playback = _Playback(buffer, chunks, tpqn, cls._initial_state(tpqn, chunks))
+        checkpoints = [playback.snapshot(0)]
+        while True:
+            tick = playback.peek_tick()
+            if tick is None:
+                break
+            boundary = tick - tick % interval
+            if boundary > checkpoints[-1].tick:
+                checkpoints.append(playback.snapshot(boundary))
+            playback.step()
+        return cls(tpqn, interval, chunks, checkpoints)
+
+    @staticmethod
+    def _initial_state(tpqn: int, chunks: Sequence[Tuple[int, int]]) -> PlaybackState:
+        return PlaybackState(0, 0.0 if tpqn < 0x8000 else None, DEFAULT_TEMPO, None,
+                             tuple(TrackPosition(start, 0, None) for start, _ in chunks),
+                             tuple(ChannelState() for _ in range(16)))
+
+    def checkpoint(self, tick: int) -> PlaybackState:
+        """Returns the last checkpoint at or before a tick
+
+        Args:
+            tick (int): Absolute time, in ticks
+
+        Returns:
+            PlaybackState: Checkpoint
+        """
+        return self.checkpoints[max(bisect_right(self._ticks, tick) - 1, 0)]
+
+    def seek(self, source: Any, tick: int) -> PlaybackState:
+        """Finds the state of playback at a tick, playing forward from the nearest checkpoint
+
+        Args:
+            source (Any): The file the index was built from
+            tick (int): Absolute time, in ticks
+
+        Returns:
+            PlaybackState: State at the tick, see :func:`play` to continue from it and :func:`ChannelState.messages`
+            to bring a device to it
+        """
+        playback = _Playback(read_all(source), self.chunks, self.tpqn, self.checkpoint(tick))
+        while True:
+            next_tick = playback.peek_tick()
+            if next_tick is None or next_tick >= tick:
+                break
+            playback.step()
+        return playback.snapshot(tick)
+
+    def play(self, source: Any, state: PlaybackState) -> Iterator[Tuple[int, int, RawEvent]]:
+        """Plays the file from a state, usually one returned by :func:`seek`
+
+        Args:
+            source (Any): The file the index was built from
+            state (PlaybackState): State to play from
+
+        Yields:
+            Tuple[int, int, RawEvent]: Absolute tick, track index and each event, in time order
+        """
+        playback = _Playback(read_all(source), self.chunks, self.tpqn, state)
+        while playback.pending:
+            yield playback.step()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Converts the index to a JSON serialisable dict
+
+        Returns:
+            Dict[str, Any]: Index
+        """
+        return {
+            "tpqn": self.tpqn,
+            "interval": self.interval,
+            "chunks": [list(chunk) for chunk in self.chunks],
+            "checkpoints": [_state_as_dict(checkpoint) for checkpoint in self.checkpoints]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SeekIndex':
+        """Restores an index converted by :func:`as_dict`
+
+        Args:
+            data (Dict[str, Any]): Index
+
+        Returns:
+            SeekIndex: Restored index
+        """
+        return cls(data["tpqn"], data["interval"], data["chunks"],
+                   [_state_from_dict(checkpoint) for checkpoint in data["checkpoints"]])
@@ -0,0 +1,185 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Walks the events of track chunks in place, without decoding them into event objects. Used where byte offsets matter,
+or where events are copied rather than interpreted
+"""
+import heapq
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from midisnake.encode import CHANNEL_DATA_LENGTHS
+from midisnake.structure import iter_chunks
+
+__all__ = ["RawEvent", "read_event", "scan_track", "track_chunks", "merge_tracks"]
+
+RawEvent = NamedTuple("RawEvent", [
+    ('offset', int),
+    ('delta', int),
+    ('body', int),
+    ('end', int),
+    ('status', int),
+    ('data1', int),
+    ('data2', int),
+    ('payload_offset', int),
+    ('payload_length', int)
+])  # type: Union[Callable, NamedTuple]
+RawEvent.__doc__ = """Location and content of an event in a buffer
+
+Attributes:
+    offset (int): Offset of the event's delta time
+    delta (int): Delta time, in ticks
+    body (int): Offset of the event after its delta time. This is the first data byte when running status is used
+    end (int): Offset after the event
+    status (int): Status byte, taken from the running status when the event omits it
+    data1 (int): First data byte of channel events, or the type of meta events
+    data2 (int): Second data byte of channel events with two
+    payload_offset (int): Offset of the data of meta and System Exclusive events
+    payload_length (int): Length of the data of meta and System Exclusive events, 0 for channel events
+"""
+
+
+def read_event(buffer: Any, position: int, running_status: Optional[int]) -> RawEvent:
+    """Reads the event starting at ``position``
+
+    Args:
+        buffer (Any): Buffer holding the event, e.g. bytes or a memoryview
+        position (int): Offset of the event's delta time
+        running_status (Optional[int]): Status of the previous channel event, or None if there isn't one
+
+    Returns:
+        RawEvent: Event read
+
+    Raises:
+        ValueError: If the status byte is invalid
+        IndexError: If the event runs past the end of the buffer
+    """
+    offset = position
+    byte = buffer[position]
+    position += 1
+    delta = byte & 0x7F
+    while byte & 0x80:
+        byte = buffer[position]
+        position += 1
+        delta = (delta << 7) | (byte & 0x7F)
+    body = position
+    status = buffer[position]
+    if status < 0x80:
+        if running_status is None:
+            raise ValueError("Data byte 0x{:X} found without a running status".format(status))
+        status = running_status
+    else:
+        position += 1
+
+    if status < 0xF0:
+        data1 = buffer[position]
+        if CHANNEL_DATA_LENGTHS[status >> 4] == 2:
+            data2 = buffer[position + 1]
+            position += 2
+        else:
+            data2 = 0
+            position += 1
+        return RawEvent(offset, delta, body, position, status, data1, data2, position, 0)
+
+    if status == 0xFF:
+        data1 = buffer[position]
+        position += 1
+    elif status in (0xF0, 0xF7):
+        data1 = 0
+    else:
+        raise ValueError("Unsupported event with status byte 0x{:X}".format(status))
+    byte = buffer[position]
+    position += 1
+    length = byte & 0x7F
+    while byte & 0x80:
+        byte = buffer[position]
+        position += 1
+        length = (length << 7) | (byte & 0x7F)
+    if position + length > len(buffer):
+        raise IndexError("Event at offset {} runs past the end of the data".format(offset))
+    return RawEvent(offset, delta, body, position + length, status, data1, 0, position, length)
+
+
+def scan_track(buffer: Any, start: int, end: int, running_status: Optional[int] = None) -> Iterator[RawEvent]:
+    """Iterates over the events between two offsets, usually the data of a track chunk
+
+    Args:
+        buffer (Any): Buffer holding the events
+        start (int): Offset of the first event
+        end (int): Offset after the last event
+        running_status (Optional[int]): Running status in effect at ``start``
+
+    Yields:
+        RawEvent: Each event
+    """
+    position = start
+    while position < end:
+        event = read_event(buffer, position, running_status)
+        # System Exclusive and meta events cancel running status
+        running_status = event.status if event.status < 0xF0 else None
+        position = event.end
+        yield event
+
+
+def track_chunks(buffer: Any) -> List[Tuple[int, int]]:
+    """Finds the track chunks of a file
+
+    Args:
+        buffer (Any): File contents
+
+    Returns:
+        List[Tuple[int, int]]: Offsets of the start and end of each track chunk's data, in file order
+
+    Raises:
+        ValueError: If a chunk runs past the end of the buffer
+    """
+    return [(chunk.offset + 8, chunk.offset + 8 + chunk.length) for chunk in iter_chunks(buffer)
+            if chunk.chunk_type == b'MTrk']
+
+
+def merge_tracks(buffer: Any, chunks: Sequence[Tuple[int, int]]) -> Iterator[Tuple[int, int, RawEvent]]:
+    """Iterates over the events of several tracks in time order, reading one event ahead per track
+
+    Events at the same tick are ordered by track, then by their order in the track.
+
+    Args:
+        buffer (Any): File contents
+        chunks (Sequence[Tuple[int, int]]): Start and end offset of each track, see :func:`track_chunks`
+
+    Yields:
+        Tuple[int, int, RawEvent]: Absolute tick, track index and each event
+    """
+    iterators = [scan_track(buffer, start, end) for start, end in chunks]
+    pending = []
+    for track_index, events in enumerate(iterators):
+        event = next(events, None)
+        if event is not None:
+            pending.append((event.delta, track_index, event))
+    heapq.heapify(pending)
+    while pending:
+        tick, track_index, event = pending[0]
+        yield tick, track_index, event
+        following = next(iterators[track_index], None)
+        if following is None:
+            heapq.heappop(pending)
+        else:
+            heapq.heapreplace(pending, (tick + following.delta, track_index, following))
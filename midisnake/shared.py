@@ -0,0 +1,201 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, List, NamedTuple, Sequence, Tuple, Union
+
+from midisnake.columnar import COLUMNS, ColumnarTrack
+
+__all__ = ["SharedHandle", "SharedTracks", "export_tracks", "attach", "release"]
+
+# Offset alignment of each column and heap in a block, so every column can be cast in place
+_ALIGNMENT = 8
+
+SharedHandle = NamedTuple("SharedHandle", [
+    ('name', str),
+    ('size', int),
+    ('tracks', Tuple[Tuple[int, int, int], ...])
+])  # type: Union[Callable, NamedTuple]
+SharedHandle.__doc__ = """Describes a block created by :func:`export_tracks`. It is small and picklable, so can be
+passed between processes in place of the tracks
+
+Attributes:
+    name (str): Name of the shared memory block
+    size (int): Size of the block's contents, in bytes
+    tracks (Tuple[Tuple[int, int, int], ...]): Track number, event count and heap size of each track
+"""
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _layout(tracks: Sequence[Tuple[int, int, int]]) -> Tuple[List[List[Tuple[int, int]]], int]:
+    # Offset and byte size of each column then the heap, for each track, and the total size
+    layout = []
+    offset = 0
+    for _, count, heap_size in tracks:
+        regions = []
+        for _, typecode in COLUMNS:
+            size = count * array(typecode).itemsize
+            regions.append((offset, size))
+            offset = _align(offset + size)
+        regions.append((offset, heap_size))
+        offset = _align(offset + heap_size)
+        layout.append(regions)
+    return layout, offset
+
+
+def _untrack(block: shared_memory.SharedMemory) -> None:
+    # Stops this process's resource tracker unlinking the block when the process exits
+    resource_tracker.unregister(block._name, "shared_memory")
+
+
+class SharedTracks:
+    """
+    Columnar tracks stored in a shared memory block. Each column is a memoryview into the block, so attaching to a
+    block copies nothing
+
+    The block exists until it is unlinked, by :func:`unlink` or :func:`release`. Closing only unmaps it from this
+    process. Views taken from the tracks, including NumPy arrays from :func:`ColumnarTrack.as_numpy`, must be
+    released before closing.
+
+    Attributes:
+        handle (SharedHandle): Handle to pass to other processes
+        tracks (List[ColumnarTrack]): Tracks, backed by the block
+    """
+    handle = None  # type: SharedHandle
+    tracks = None  # type: List[ColumnarTrack]
+
+    def __init__(self, block: shared_memory.SharedMemory, handle: SharedHandle) -> None:
+        self._block = block
+        self._views = []  # type: List[memoryview]
+        self.handle = handle
+        self.tracks = []
+
+        layout, _ = _layout(handle.tracks)
+        buffer = block.buf
+        for (track_number, _, _), regions in zip(handle.tracks, layout):
+            columns = {}
+            for (name, typecode), (offset, size) in zip(COLUMNS, regions):
+                view = buffer[offset:offset + size]
+                columns[name] = view.cast(typecode)
+                self._views += [view, columns[name]]
+            heap_offset, heap_size = regions[-1]
+            heap = buffer[heap_offset:heap_offset + heap_size]
+            self._views.append(heap)
+            self.tracks.append(ColumnarTrack(track_number, columns, heap))
+
+    def __enter__(self) -> 'SharedTracks':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the tracks and unmaps the block from this process, leaving it available to others
+
+        Raises:
+            BufferError: If views taken from the tracks are still in use
+        """
+        if self._block is None:
+            return
+        self.tracks = []
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._block.close()
+        self._block = None
+
+    def unlink(self) -> None:
+        """Closes the block, see :func:`close`, and destroys it. Processes still attached keep their mapping until they
+        close it
+        """
+        self.close()
+        release(self.handle)
+
+
+def export_tracks(tracks: Sequence[ColumnarTrack], track: bool = True) -> SharedTracks:
+    """Copies columnar tracks into a new shared memory block
+
+    Args:
+        tracks (Sequence[ColumnarTrack]): Tracks to copy, e.g. from :func:`ColumnarTrack.from_tracks`
+        track (bool): Whether this process's resource tracker should destroy the block when the process exits. Pass
+            False when the block is handed to another process, e.g. when exporting from a worker, which then becomes
+            responsible for unlinking it
+
+    Returns:
+        SharedTracks: Tracks in the new block
+    """
+    layout_tracks = tuple((columnar.track_number, len(columnar), len(columnar.heap)) for columnar in tracks)
+    layout, size = _layout(layout_tracks)
+    # Blocks can't be empty
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    if not track:
+        _untrack(block)
+
+    buffer = block.buf
+    for columnar, regions in zip(tracks, layout):
+        for (name, _), (offset, column_size) in zip(COLUMNS, regions):
+            buffer[offset:offset + column_size] = memoryview(getattr(columnar, name)).cast('B')
+        heap_offset, heap_size = regions[-1]
+        buffer[heap_offset:heap_offset + heap_size] = columnar.heap
+    return SharedTracks(block, SharedHandle(block.name, size, layout_tracks))
+
+
+def attach(handle: SharedHandle, track: bool = True) -> SharedTracks:
+    """Maps a block created by :func:`export_tracks`, possibly in another process
+
+    Args:
+        handle (SharedHandle): Handle of the block
+        track (bool): Whether this process's resource tracker should destroy the block when the process exits
+
+    Returns:
+        SharedTracks: Tracks in the block
+
+    Raises:
+        FileNotFoundError: If the block doesn't exist, e.g. because it was already unlinked
+    """
+    block = shared_memory.SharedMemory(name=handle.name)
+    if not track:
+        _untrack(block)
+    return SharedTracks(block, handle)
+
+
+def release(handle: SharedHandle) -> bool:
+    """Destroys a block by its handle, without mapping its tracks. Use this to clean up blocks whose exporting process
+    has failed before they were attached
+
+    Args:
+        handle (SharedHandle): Handle of the block
+
+    Returns:
+        bool: Whether the block existed
+    """
+    try:
+        block = shared_memory.SharedMemory(name=handle.name)
+    except FileNotFoundError:
+        return False
+    block.close()
+    block.unlink()
+    return True
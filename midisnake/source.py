@@ -0,0 +1,221 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Byte sources used internally by the parser
+"""
+
+import io
+import mmap
+import os
+from typing import Any, Union
+
+__all__ = ["ByteSource", "read_all"]
+
+
+class ByteSource:
+    """
+    File-like reader over a contiguous buffer. :class:`midisnake.structure.Track` parses directly from
+    :attr:`buffer` with index arithmetic, and decoders use the file-like methods.
+
+    Attributes:
+        buffer (Union[bytes, bytearray, memoryview]): Data being read
+        position (int): Index in :attr:`buffer` of the next byte to read
+        base (int): Offset of the start of :attr:`buffer` in the file, added to positions by :func:`tell`
+    """
+    __slots__ = ("buffer", "position", "base", "_view")
+
+    def __init__(self, buffer: Any, base: int = 0) -> None:
+        """
+        Args:
+            buffer (Any): Data to read, any object supporting the buffer protocol
+            base (int): Offset of the start of the buffer in the file
+        """
+        if not isinstance(buffer, (bytes, bytearray)):
+            buffer = memoryview(buffer).cast('B')
+        self.buffer = buffer
+        self.position = 0
+        self.base = base
+        self._view = None  # type: memoryview
+
+    @classmethod
+    def open(cls, source: Any) -> 'ByteSource':
+        """Creates a source for any supported input
+
+        Args:
+            source (Any): bytes, bytearray, memoryview or mmap, a path, or a binary file object. Seekable files are
+                read from their current position in one go, unseekable streams are read through a read-ahead window
+
+        Returns:
+            ByteSource: Source positioned at the start of the data
+        """
+        if isinstance(source, ByteSource):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            return cls(source)
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as midi_file:
+                return cls(midi_file.read())
+        if getattr(source, "seekable", lambda: False)():
+            base = source.tell()
+            return cls(source.read(), base)
+        return _StreamSource(source)
+
+    def read(self, size: int = -1) -> bytes:
+        start = self.position
+        end = len(self.buffer)
+        if 0 <= size < end - start:
+            end = start + size
+        if end < start:
+            return b''
+        self.position = end
+        return bytes(self.buffer[start:end])
+
+    def read_byte(self) -> int:
+        """Reads a single byte
+
+        Returns:
+            int: Value of the byte
+
+        Raises:
+            IndexError: At the end of the data
+        """
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def view(self, size: int) -> memoryview:
+        """Reads bytes as a view of the buffer, without copying them
+
+        Args:
+            size (int): Number of bytes to read
+
+        Returns:
+            memoryview: View of the bytes, shorter than size at the end of the data
+        """
+        if self._view is None:
+            self._view = memoryview(self.buffer)
+        start = self.position
+        self.position = start + size
+        return self._view[start:start + size]
+
+    def tell(self) -> int:
+        return self.base + self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset - self.base
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = len(self.buffer) + offset
+        else:
+            raise ValueError("Invalid whence ({}, should be 0, 1 or 2)".format(whence))
+        if position < 0:
+            raise ValueError("Negative seek position {}".format(position + self.base))
+        self.position = position
+        return self.base + position
+
+    def seekable(self) -> bool:
+        return True
+
+
+class _StreamSource(ByteSource):
+    """
+    Reads from an unseekable stream through a read-ahead window. Seeking forward reads and discards data, seeking
+    backward is only possible within the last :attr:`retain` bytes read before the window was last refilled
+    """
+    __slots__ = ("stream", "window_size", "retain")
+
+    def __init__(self, stream: Any, window_size: int = 1 << 16, retain: int = 1 << 16) -> None:
+        super().__init__(bytearray())
+        self.stream = stream
+        self.window_size = window_size
+        self.retain = retain
+
+    def _fill(self, needed: int) -> None:
+        # Ensure the window holds `needed` bytes from the current position, unless the stream ends first
+        if self.position + needed <= len(self.buffer):
+            return
+        discard = min(self.position - self.retain, len(self.buffer))
+        if discard > 0:
+            del self.buffer[:discard]
+            self.base += discard
+            self.position -= discard
+        while len(self.buffer) < self.position + needed:
+            data = self.stream.read(max(self.position + needed - len(self.buffer), self.window_size))
+            if not data:
+                break
+            self.buffer += data
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            data = self.read(self.window_size)
+            while True:
+                more = self.read(self.window_size)
+                if not more:
+                    return data
+                data += more
+        self._fill(size)
+        start = self.position
+        data = bytes(self.buffer[start:start + size])
+        self.position = start + len(data)
+        return data
+
+    def read_byte(self) -> int:
+        self._fill(1)
+        return super().read_byte()
+
+    def view(self, size: int) -> memoryview:
+        # The window is resized as it's refilled, so views must be of a copy
+        return memoryview(self.read(size))
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            raise io.UnsupportedOperation("Can't seek relative to the end of a stream")
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+            whence = io.SEEK_SET
+        if offset < self.base:
+            raise io.UnsupportedOperation("Can't seek back to offset {}, data before offset {} has been "
+                                          "discarded".format(offset, self.base))
+        return super().seek(offset, whence)
+
+
+def read_all(source: Any) -> Union[bytes, bytearray, memoryview, mmap.mmap]:
+    """Returns the whole of a source as one buffer, for code that needs random access to a file
+
+    Args:
+        source (Any): Any input accepted by :func:`ByteSource.open`
+
+    Returns:
+        Union[bytes, bytearray, memoryview, mmap.mmap]: Contents, from the current position for file objects.
+        Buffers are returned as they are
+    """
+    source = ByteSource.open(source)
+    if type(source) is not ByteSource:
+        return source.read()
+    if source.position:
+        return memoryview(source.buffer)[source.position:]
+    return source.buffer
+
@@ -0,0 +1,140 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Opt-in instrumentation of the parser
+"""
+
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+__all__ = ["ParseStats"]
+
+
+class ParseStats:
+    """
+    Collects statistics while parsing. Pass an instance to :class:`midisnake.parser.Parser` to enable collection,
+    the same instance can be given to several parsers to aggregate over many files.
+
+    Status classes are the high nibble of a channel event's status byte (``0x80``, ``0x90``...), or the full status
+    byte for ``0xFF`` meta events. Decode times are in seconds.
+
+    Attributes:
+        status_counts (Dict[int, int]): Number of events per status class
+        status_times (Dict[int, float]): Cumulative decode time per status class
+        meta_counts (Dict[int, int]): Number of meta events per meta type
+        meta_times (Dict[int, float]): Cumulative decode time per meta type
+        track_bytes (List[int]): Bytes consumed by each parsed track
+        vlv_lengths (Dict[int, int]): Number of delta time variable length values by their length in bytes
+        exceptions (Dict[str, int]): Number of exceptions raised while parsing, by exception type name
+        hooks (List[Callable[[ParseStats], Any]]): Callbacks run by :func:`emit`
+    """
+    status_counts = None  # type: Dict[int, int]
+    status_times = None  # type: Dict[int, float]
+    meta_counts = None  # type: Dict[int, int]
+    meta_times = None  # type: Dict[int, float]
+    track_bytes = None  # type: List[int]
+    vlv_lengths = None  # type: Dict[int, int]
+    exceptions = None  # type: Dict[str, int]
+    hooks = None  # type: List[Callable[[ParseStats], Any]]
+
+    def __init__(self, *hooks: Callable[['ParseStats'], Any]) -> None:
+        """
+        Args:
+            *hooks (Callable[[ParseStats], Any]): Callbacks to run each time a parse finishes, typically exporting to
+                a metrics system
+        """
+        self.status_counts = defaultdict(int)
+        self.status_times = defaultdict(float)
+        self.meta_counts = defaultdict(int)
+        self.meta_times = defaultdict(float)
+        self.track_bytes = []
+        self.vlv_lengths = defaultdict(int)
+        self.exceptions = defaultdict(int)
+        self.hooks = list(hooks)
+
+    @property
+    def vlv_count(self) -> int:
+        """int: Total number of delta time variable length values read"""
+        return sum(self.vlv_lengths.values())
+
+    def add_hook(self, hook: Callable[['ParseStats'], Any]) -> None:
+        """Registers a callback to run each time a parse finishes
+
+        Args:
+            hook (Callable[[ParseStats], Any]): Callback, given this object
+        """
+        self.hooks.append(hook)
+
+    def record_event(self, status_class: int, meta_type: Any, vlv_length: int, started: float) -> float:
+        """Records a decoded event. Called by :class:`midisnake.structure.Track` once per event
+
+        Args:
+            status_class (int): Status class of the event
+            meta_type (Any): Meta type of the event, or None if it is not a meta event
+            vlv_length (int): Length of the event's delta time, in bytes
+            started (float): :func:`time.perf_counter` value when decoding of the event began
+
+        Returns:
+            float: Current :func:`time.perf_counter` value, used as the start time of the next event
+        """
+        now = perf_counter()
+        elapsed = now - started
+        self.status_counts[status_class] += 1
+        self.status_times[status_class] += elapsed
+        if meta_type is not None:
+            self.meta_counts[meta_type] += 1
+            self.meta_times[meta_type] += elapsed
+        self.vlv_lengths[vlv_length] += 1
+        return now
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Records an exception raised while parsing
+
+        Args:
+            exc (BaseException): Exception raised
+        """
+        self.exceptions[type(exc).__name__] += 1
+
+    def emit(self) -> None:
+        """Runs every registered hook"""
+        for hook in self.hooks:
+            hook(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Converts the statistics to a JSON serialisable dict, with status classes and meta types as hex strings
+
+        Returns:
+            Dict[str, Any]: Statistics
+        """
+        return {
+            "status": {"0x{:02X}".format(key): {"count": count, "time": self.status_times[key]}
+                       for key, count in self.status_counts.items()},
+            "meta": {"0x{:02X}".format(key): {"count": count, "time": self.meta_times[key]}
+                     for key, count in self.meta_counts.items()},
+            "track_bytes": list(self.track_bytes),
+            "vlv_count": self.vlv_count,
+            "vlv_lengths": dict(self.vlv_lengths),
+            "exceptions": dict(self.exceptions)
+        }
@@ -19,13 +19,64 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import re
+import struct
 from abc import ABCMeta, abstractmethod
+from time import perf_counter
 from io import BufferedReader, FileIO
-from typing import List, Union, Dict, Any
+from typing import List, Union, Dict, Any, NamedTuple, Optional, Callable, Iterator, Tuple
 
-from midisnake.errors import EventLengthError
+from midisnake.errors import EventLengthError, EventNullLengthError, EventTextError
 
-__all__ = ["Header", "Event"]
+__all__ = ["Header", "Event", "Track", "Diagnostic", "Chunk", "iter_chunks"]
+
+Diagnostic = NamedTuple("Diagnostic", [
+    ('offset', int),
+    ('track_number', Optional[int]),
+    ('error', str),
+    ('message', str),
+    ('resumed_at', Optional[int])
+])  # type: Union[Callable, NamedTuple]
+Diagnostic.__doc__ = """Problem found and recovered from when parsing with ``strict=False``
+
+Attributes:
+    offset (int): Offset in the file of the event or chunk that failed to parse
+    track_number (Optional[int]): Index of the affected track, None for problems outside of a track
+    error (str): Name of the exception raised
+    message (str): Description of the problem
+    resumed_at (Optional[int]): Offset parsing resumed at, None if the rest of the file was abandoned
+"""
+
+Chunk = NamedTuple("Chunk", [
+    ('chunk_type', bytes),
+    ('offset', int),
+    ('length', int),
+    ('data', memoryview)
+])  # type: Union[Callable, NamedTuple]
+Chunk.__doc__ = """Chunk found by :func:`iter_chunks`
+
+Attributes:
+    chunk_type (bytes): Four byte chunk type, such as ``b'MThd'`` or ``b'MTrk'``
+    offset (int): Offset of the chunk header in the buffer
+    length (int): Length of the chunk's data, as declared in its header
+    data (memoryview): Chunk data, not including the chunk header
+"""
+
+# MThd chunk: type, length, format, number of tracks and division
+HEADER_STRUCT = struct.Struct(">4sLHHH")
+# Header of every other chunk: type and length
+CHUNK_HEADER_STRUCT = struct.Struct(">4sL")
+
+# Errors that a corrupt event can raise, and that tolerant parsing recovers from
+RECOVERABLE_ERRORS = (EventLengthError, EventNullLengthError, EventTextError, ValueError, KeyError, IndexError)
+
+
+# Meta event types recorded in Track.meta_data, and the keys they're recorded under
+_META_DATA_KEYS = {
+    0x00: "seq_number",
+    0x02: "copyright",
+    0x03: "chunk_name"
+}
 
 
 class ParsedMIDI:
@@ -33,6 +84,34 @@ class ParsedMIDI:
         pass
 
 
+def iter_chunks(buffer: Union[bytes, bytearray, memoryview]) -> Iterator[Chunk]:
+    """Iterates over the chunks of a MIDI file held in a buffer, without parsing them. Every chunk is yielded,
+    including the header chunk and any non-standard chunk types
+
+    Args:
+        buffer (Union[bytes, bytearray, memoryview]): File contents, or any object supporting the buffer protocol
+
+    Yields:
+        Chunk: Each chunk, in file order
+
+    Raises:
+        ValueError: If a chunk header or chunk data runs past the end of the buffer
+    """
+    view = memoryview(buffer).cast('B')
+    size = len(view)
+    position = 0
+    unpack_from = CHUNK_HEADER_STRUCT.unpack_from
+    while position < size:
+        if position + 8 > size:
+            raise ValueError("Chunk header at offset {} runs past the end of the data".format(position))
+        chunk_type, length = unpack_from(view, position)
+        data_start = position + 8
+        if data_start + length > size:
+            raise ValueError("{!r} chunk at offset {} runs past the end of the data".format(chunk_type, position))
+        yield Chunk(chunk_type, position, length, view[data_start:data_start + length])
+        position = data_start + length
+
+
 class Header:
     """
     Represents a MIDI file header
@@ -50,26 +129,35 @@ class Header:
     tpqn = None  # type: float
 
     def __init__(self, data: Union[FileIO, BufferedReader]) -> None:
-        chunk_type = data.read(4)
-        if chunk_type != b'MThd':
+        header = data.read(HEADER_STRUCT.size)
+        if header[:4] != b'MThd':
             raise ValueError("File had invalid header chunk type")
+        if len(header) != HEADER_STRUCT.size:
+            raise ValueError("File is too short to contain a header")
+        _, header_length, format, ntrks, tpqn = HEADER_STRUCT.unpack(header)
 
-        header_length = int.from_bytes(data.read(4), 'big')
         if header_length != 6:
             raise ValueError("File has unsupported header length")
         self.length = header_length
 
-        format = int.from_bytes(data.read(2), 'big')
-        if format not in [0, 1, 2]:
+        if format not in (0, 1, 2):
             raise ValueError("File has unsupported format")
         self.format = format
 
-        ntrks = int.from_bytes(data.read(2), 'big')
-        if ntrks > 0 and format == 0:
+        if ntrks > 1 and format == 0:
             raise ValueError("Multiple tracks in single track format")
         self.ntrks = ntrks
 
-        self.tpqn = int.from_bytes(data.read(2), 'big')
+        self.tpqn = tpqn
+
+    def __reduce__(self):
+        # Pickled as the 14 byte header chunk
+        return _restore_header, (HEADER_STRUCT.pack(b'MThd', self.length, self.format, self.ntrks, self.tpqn),)
+
+
+def _restore_header(data: bytes) -> Header:
+    from midisnake.source import ByteSource
+    return Header(ByteSource(data))
 
 
 class Event(metaclass=ABCMeta):  # pragma: no cover
@@ -87,7 +175,8 @@ class Event(metaclass=ABCMeta):  # pragma: no cover
 
     def __init__(self, data: int) -> None:
         self.raw_data = data
-        if len(hex(data)[2:]) != 6:
+        # Equivalent to the data having 6 hex digits
+        if not 0x100000 <= data <= 0xFFFFFF:
             err_msg = "Length of given data is incorrect. The length is {} and it should be 6".format(
                 len(hex(data)[2:]))
             raise EventLengthError(err_msg)
@@ -100,6 +189,10 @@ class Event(metaclass=ABCMeta):  # pragma: no cover
     def __repr__(self) -> str:
         return "<MIDIEvent: {}>".format(self.event_name)
 
+    def __reduce__(self):
+        # The status byte identifies the type, so the raw data alone is enough to rebuild the event
+        return type(self), (self.raw_data,)
+
     def __str__(self) -> str:
         return "MIDIEvent: {}".format(self.event_name)
 
@@ -113,7 +206,7 @@ class Event(metaclass=ABCMeta):  # pragma: no cover
         Returns:
             bool: Whether the event matches or not
         """
-        return (cls.indicator_byte == (bytearray.fromhex(hex(data)[2:])[0] & 0xF0))
+        return cls.indicator_byte == (data >> 16) & 0xF0
 
     @abstractmethod
     def _process(self, data: int) -> None:
@@ -136,26 +229,278 @@ class Track:
         track_number (int): Track index. Must be 0 or more
         length (int): Length of the track in bytes
         events (List[Event]): List of events present in the track
+        delta_times (List[int]): Delta time, in ticks, preceding each entry of :attr:`events`
+        diagnostics (List[Diagnostic]): Problems recovered from when parsing with ``strict=False``
+        meta_data (Dict[str, Any]): First sequence number ("seq_number"), copyright notice ("copyright") and track
+            name ("chunk_name") meta events in the track, or None for those that are absent
+
+    Tracks pickle as their encoded events, which are only decoded again when :attr:`events`, :attr:`delta_times` or
+    :attr:`meta_data` is first accessed after unpickling.
     """
     track_number = None  # type: int
     length = None  # type: int
-    events = None  # type: List[Event]
-    meta_data = {
-        "seq_number": None,
-        "copyright": None,
-        "chunk_name": None
-    }  # type: Dict[str, Any]
+    diagnostics = None  # type: List[Diagnostic]
 
-    def __init__(self, data: Union[FileIO, BufferedReader]) -> None:
-        chunk_name = data.read(4)
-        if chunk_name != b'MTrk':
+    _events = None  # type: List[Event]
+    _delta_times = None  # type: List[int]
+    _meta_data = None  # type: Dict[str, Any]
+    # Encoded events of an unpickled track, until they're decoded
+    _pending = None  # type: bytes
+
+    def __init__(self, data: Union[FileIO, BufferedReader], track_number: int = 0, stats: Any = None,
+                 strict: bool = True, intern_table: Any = None) -> None:
+        """
+        Args:
+            data (BufferedReader): File positioned at the start of the track chunk
+            track_number (int): Track index
+            stats (Optional[ParseStats]): :class:`midisnake.stats.ParseStats` to record into, or None to disable
+                collection
+            strict (bool): If False, errors in events are recorded in :attr:`diagnostics` and parsing resumes at the
+                next plausible event, and the track ends at its End of Track event
+            intern_table (Optional[InternTable]): :class:`midisnake.events.InternTable` to share channel events
+                through, or None to decode each event separately
+        """
+        chunk_header = data.read(CHUNK_HEADER_STRUCT.size)
+        if chunk_header[:4] != b'MTrk' or len(chunk_header) != CHUNK_HEADER_STRUCT.size:
             raise ValueError("Track Chunk header invalid")
 
-        self.length = int.from_bytes(data.read(4), 'big')
+        self.length = CHUNK_HEADER_STRUCT.unpack(chunk_header)[1]
+        self.track_number = track_number
+        self._events = []
+        self._delta_times = []
+        self.diagnostics = []
+        self._parse(data, stats, strict, intern_table=intern_table)
 
-    def _parse(self, data: Union[FileIO, BufferedReader]):
-        delta_time = VariableLengthValue(data)
+    @property
+    def events(self) -> List[Event]:
+        """List[Event]: Events in the track"""
+        if self._pending is not None:
+            self._load()
+        return self._events
+
+    @events.setter
+    def events(self, events: List[Event]) -> None:
+        if self._pending is not None:
+            self._load()
+        self._events = events
+        self._meta_data = None
+
+    @property
+    def delta_times(self) -> List[int]:
+        """List[int]: Delta time preceding each event"""
+        if self._pending is not None:
+            self._load()
+        return self._delta_times
+
+    @delta_times.setter
+    def delta_times(self, delta_times: List[int]) -> None:
+        if self._pending is not None:
+            self._load()
+        self._delta_times = delta_times
+
+    @property
+    def meta_data(self) -> Dict[str, Any]:
+        """Dict[str, Any]: Metadata events, see the class attributes"""
+        if self._meta_data is None:
+            meta_data = dict.fromkeys(_META_DATA_KEYS.values())
+            for event in self.events:
+                key = _META_DATA_KEYS.get(getattr(event, "variant_number", None))
+                if key is not None and meta_data[key] is None:
+                    meta_data[key] = event
+            self._meta_data = meta_data
+        return self._meta_data
+
+    @meta_data.setter
+    def meta_data(self, meta_data: Dict[str, Any]) -> None:
+        self._meta_data = meta_data
+
+    def __reduce__(self):
+        from midisnake.encode import encode_events
+        if self._pending is not None:
+            return _restore_track, (self.track_number, self.length, self.diagnostics, self._pending)
+        try:
+            data = encode_events(self._delta_times, self._events)
+        except ValueError:
+            # Events without an encoding, e.g. System Exclusive handler results, are pickled as they are
+            return _restore_track, (self.track_number, self.length, self.diagnostics,
+                                    (self._delta_times, self._events))
+        return _restore_track, (self.track_number, self.length, self.diagnostics, data)
+
+    def _load(self) -> None:
+        from midisnake.source import ByteSource
+        data = self._pending
+        self._pending = None
+        self._parse(ByteSource(data), length=len(data))
+
+    def _parse(self, data: Union[FileIO, BufferedReader], stats: Any = None, strict: bool = True,
+               length: int = None, intern_table: Any = None) -> None:
+        # Imported here as these modules depend on this one
+        from midisnake.events import MetaFactory, event_types
+        from midisnake.source import ByteSource
+        from midisnake.sysex import read_vendor_payload, sysex_handlers
+
+        if type(data) is ByteSource:
+            source = data
+        else:
+            # Read the whole chunk, so it can be parsed from a contiguous buffer
+            base = data.tell()
+            source = ByteSource(data.read(self.length), base)
+        buffer = source.buffer
+        base = source.base
+        position = source.position
+        end = position + (self.length if length is None else length)
+        events = self._events
+        delta_times = self._delta_times
+        if intern_table is not None:
+            interned = intern_table.events
+        else:
+            interned = None
+        running_status = None
+        skipped_delta = 0
+        started = perf_counter() if stats is not None else 0.0
+        while position < end:
+            event_start = position
+            try:
+                byte = buffer[position]
+                position += 1
+                delta_time = byte & 0x7F
+                while byte & 0x80:
+                    byte = buffer[position]
+                    position += 1
+                    delta_time = (delta_time << 7) | (byte & 0x7F)
+                delta_time += skipped_delta
+                status = buffer[position]
+                position += 1
+                if status == 0xFF:
+                    meta_type = buffer[position]
+                    source.position = position + 1
+                    event = MetaFactory(source, meta_type)
+                    position = source.position
+                    # System Exclusive and meta events cancel running status
+                    running_status = None
+                    if meta_type == 0x2F and not strict:
+                        delta_times.append(delta_time)
+                        events.append(event)
+                        break
+                elif status >= 0xF0:
+                    source.position = position
+                    if status == 0xF0:
+                        event = read_vendor_payload(source, sysex_handlers, status)
+                    elif status == 0xF7:
+                        # Escaped or continued System Exclusive data carries no manufacturer ID, so is never handled
+                        event = read_vendor_payload(source, {}, status)
+                    else:
+                        raise ValueError("Unsupported event with status byte 0x{:X}".format(status))
+                    position = source.position
+                    running_status = None
+                    meta_type = None
+                else:
+                    if status < 0x80:
+                        # Running status, the byte read is the first data byte
+                        if running_status is None:
+                            raise ValueError("Data byte 0x{:X} found without a running status".format(status))
+                        position -= 1
+                        status = running_status
+                    else:
+                        running_status = status
+                    event_type = event_types[status >> 4]
+                    if event_type is None:
+                        raise ValueError("Unsupported event with status byte 0x{:X}".format(status))
+                    if status & 0xE0 == 0xC0:
+                        # Program Change and Channel Pressure have a single data byte
+                        packed = (status << 16) | (buffer[position] << 8)
+                        position -= 1
+                    else:
+                        packed = (status << 16) | (buffer[position] << 8) | buffer[position + 1]
+                    if interned is None:
+                        event = event_type(packed)
+                    else:
+                        event = interned.get(packed)
+                        if event is None:
+                            event = intern_table.get(packed)
+                    position += 2
+                    meta_type = None
+            except RECOVERABLE_ERRORS as exc:
+                if strict:
+                    raise
+                if stats is not None:
+                    stats.record_exception(exc)
+                position = _resynchronise(buffer, event_start, end)
+                self.diagnostics.append(Diagnostic(base + event_start, self.track_number, type(exc).__name__,
+                                                   _describe(exc), base + position))
+                running_status = None
+                skipped_delta = 0
+                continue
+            if event is None:
+                # Ignored events still carry time, so fold it into the next delta
+                skipped_delta = delta_time
+                continue
+            skipped_delta = 0
+            delta_times.append(delta_time)
+            events.append(event)
+            if stats is not None:
+                vlv_length = 1
+                while buffer[event_start + vlv_length - 1] & 0x80:
+                    vlv_length += 1
+                started = stats.record_event(status if meta_type is not None else status & 0xF0, meta_type,
+                                             vlv_length, started)
+
+        if source is data:
+            source.position = position
+        elif position < end:
+            # Stopped early, so hand back the rest of the chunk
+            data.seek(base + position)
+
+
+def _restore_track(track_number: int, length: int, diagnostics: List[Diagnostic],
+                   data: Union[bytes, Tuple[List[int], List[Any]]]) -> Track:
+    track = Track.__new__(Track)
+    track.track_number = track_number
+    track.length = length
+    track.diagnostics = diagnostics
+    if isinstance(data, tuple):
+        track._delta_times, track._events = data
+    else:
+        track._delta_times = []
+        track._events = []
+        track._pending = data
+    return track
+
+
+# Matches a one byte delta time followed by a channel status byte, or by a meta event marker and type
+_RESYNC_PATTERN = re.compile(b'[\x00-\x7F](?=[\x80-\xEF]|\xFF[\x00-\x7F])')
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, IndexError):
+        return "Unexpected end of data"
+    return str(exc)
+
+
+def _resynchronise(buffer: Any, position: int, end: int) -> int:
+    """Finds where to resume after a corrupt event starting at index ``position`` of ``buffer``
+
+    Meta events declare their length, so a meta event that fails to decode is skipped whole. Otherwise the rest of the
+    track is scanned for the next plausible delta time and status byte pair, giving up at the end of the track.
+    """
+    index = position
+    try:
+        while buffer[index] & 0x80:
+            index += 1
+        if buffer[index + 1] == 0xFF:
+            index += 3
+            length = buffer[index] & 0x7F
+            while buffer[index] & 0x80:
+                index += 1
+                length = (length << 7) | (buffer[index] & 0x7F)
+            resume = index + 1 + length
+            if resume <= end:
+                return resume
+    except IndexError:
+        pass
 
+    match = _RESYNC_PATTERN.search(buffer, position + 1, min(end, len(buffer)))
+    return match.start() if match is not None else end
 
 
 class VariableLengthValue:
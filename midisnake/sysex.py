@@ -0,0 +1,161 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Handling of System Exclusive (``F0``/``F7``) and Sequencer Specific (``FF 7F``) events
+
+Both carry vendor defined payloads that start with a manufacturer ID, and which can be very large. Payloads are kept
+undecoded as a :class:`VendorEvent` unless a handler is registered for their manufacturer, in which case the handler
+is given the payload as a :class:`memoryview`. Whatever the handler returns is added to the track as the event,
+unless it is None, in which case the event is dropped.
+
+Manufacturer IDs are one byte (``b'\\x41'``), or three bytes starting with 0 for extended IDs (``b'\\x00\\x20\\x29'``).
+"""
+
+from io import BufferedReader, FileIO
+from typing import Any, Callable, Dict, Union
+
+from midisnake.errors import EventLengthError
+from midisnake.structure import VariableLengthValue
+
+__all__ = ["VendorEvent", "sysex_handlers", "sequencer_handlers", "register_sysex_handler",
+           "register_sequencer_handler", "read_vendor_payload"]
+
+# Handlers for F0 System Exclusive events, keyed by manufacturer ID
+sysex_handlers = {}  # type: Dict[bytes, Callable[[memoryview], Any]]
+# Handlers for FF 7F Sequencer Specific meta events, keyed by manufacturer ID
+sequencer_handlers = {}  # type: Dict[bytes, Callable[[memoryview], Any]]
+
+
+class VendorEvent:
+    """
+    System Exclusive or Sequencer Specific event that no handler decoded, kept so that it's written back out unchanged
+
+    Attributes:
+        status (int): 0xF0 or 0xF7 for System Exclusive events, 0xFF for Sequencer Specific meta events
+        offset (int): Offset of the payload in the file
+        payload (memoryview): Payload as stored after its length, viewing the parsed data rather than copying it
+    """
+    status = None  # type: int
+    offset = None  # type: int
+    payload = None  # type: memoryview
+
+    def __init__(self, status: int, offset: int, payload: Union[bytes, memoryview]) -> None:
+        """
+        Args:
+            status (int): 0xF0, 0xF7 or 0xFF
+            offset (int): Offset of the payload in the file
+            payload (Union[bytes, memoryview]): Payload, from the manufacturer ID on
+        """
+        self.status = status
+        self.offset = offset
+        self.payload = memoryview(payload)
+
+    def __repr__(self) -> str:
+        return "<VendorEvent: 0x{:02X}, {} bytes>".format(self.status, len(self.payload))
+
+    def __reduce__(self):
+        return VendorEvent, (self.status, self.offset, bytes(self.payload))
+
+    @property
+    def length(self) -> int:
+        """int: Length of the payload"""
+        return len(self.payload)
+
+    @property
+    def manufacturer_id(self) -> bytes:
+        """bytes: Manufacturer ID, empty if the payload is too short to hold one, or is continued System Exclusive
+        data"""
+        if self.status == 0xF7 or not self.payload:
+            return b''
+        if self.payload[0] == 0:
+            return bytes(self.payload[:3]) if len(self.payload) >= 3 else b''
+        return bytes(self.payload[:1])
+
+
+def _manufacturer_id(manufacturer_id: Union[int, bytes]) -> bytes:
+    if isinstance(manufacturer_id, int):
+        manufacturer_id = bytes((manufacturer_id,))
+    if len(manufacturer_id) == 1 and manufacturer_id[0] != 0 or len(manufacturer_id) == 3 and manufacturer_id[0] == 0:
+        return bytes(manufacturer_id)
+    raise ValueError("Invalid manufacturer ID {!r}. IDs are one non-zero byte, or three bytes starting with "
+                     "0".format(manufacturer_id))
+
+
+def register_sysex_handler(manufacturer_id: Union[int, bytes], handler: Callable[[memoryview], Any]) -> None:
+    """Registers a handler for System Exclusive events from a manufacturer
+
+    Args:
+        manufacturer_id (Union[int, bytes]): Manufacturer ID, either a one byte ID as an int, or the ID's bytes
+        handler (Callable[[memoryview], Any]): Called with the event's payload, from the manufacturer ID up to and
+            including the terminating ``F7``
+
+    Raises:
+        ValueError: If the manufacturer ID is invalid
+    """
+    sysex_handlers[_manufacturer_id(manufacturer_id)] = handler
+
+
+def register_sequencer_handler(manufacturer_id: Union[int, bytes], handler: Callable[[memoryview], Any]) -> None:
+    """Registers a handler for Sequencer Specific meta events from a manufacturer
+
+    Args:
+        manufacturer_id (Union[int, bytes]): Manufacturer ID, either a one byte ID as an int, or the ID's bytes
+        handler (Callable[[memoryview], Any]): Called with the event's payload, starting with the manufacturer ID
+
+    Raises:
+        ValueError: If the manufacturer ID is invalid
+    """
+    sequencer_handlers[_manufacturer_id(manufacturer_id)] = handler
+
+
+def read_vendor_payload(data: Union[FileIO, BufferedReader], handlers: Dict[bytes, Callable[[memoryview], Any]],
+                        status: int = 0xF0) -> Any:
+    """Reads the length and payload of a vendor event, passing it to the handler registered for its manufacturer
+
+    Args:
+        data (BufferedReader): File positioned at the event's length
+        handlers (Dict[bytes, Callable[[memoryview], Any]]): Handlers to look the manufacturer up in
+        status (int): 0xF0 or 0xF7 for System Exclusive events, 0xFF for Sequencer Specific meta events
+
+    Returns:
+        Any: Handler's return value, or a :class:`VendorEvent` holding the payload if no handler was registered or the
+        payload is too short for its manufacturer ID
+
+    Raises:
+        EventLengthError: If the data ends before the payload does
+    """
+    length = VariableLengthValue(data).value
+    offset = data.tell()
+    view = getattr(data, "view", None)
+    payload = view(length) if view is not None else memoryview(data.read(length))
+    if len(payload) < length:
+        raise EventLengthError("Vendor event payload of {} bytes truncated to {}".format(length, len(payload)))
+
+    # Extended manufacturer IDs are three bytes, so shorter payloads starting with 0 are malformed and kept as they are
+    handler = None
+    if handlers and length and (payload[0] != 0 or length >= 3):
+        handler = handlers.get(bytes(payload[:3 if payload[0] == 0 else 1]))
+    if handler is None:
+        return VendorEvent(status, offset, payload)
+    return handler(payload)
@@ -0,0 +1,338 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Retimes and transforms columnar files a whole column at a time, using NumPy when it is installed
+"""
+from array import array
+from fractions import Fraction
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Union
+
+from midisnake.columnar import COLUMNS, ColumnarFile, ColumnarTrack
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ["ROUNDING", "resample", "quantise", "Transform"]
+
+# Integer division of a value by a positive divisor with each rounding, working on ints and NumPy arrays alike
+ROUNDING = {
+    "nearest": lambda value, divisor: (2 * value + divisor) // (2 * divisor),
+    "floor": lambda value, divisor: value // divisor,
+    "ceil": lambda value, divisor: -(-value // divisor)
+}  # type: Dict[str, Callable[[Any, int], Any]]
+
+
+def _rescale(track: ColumnarTrack, numerator: int, denominator: int, rounding: str) -> Any:
+    # Multiplies every tick by a fraction
+    divide = ROUNDING[rounding]
+    if numpy is not None:
+        return divide(numpy.frombuffer(track.tick, dtype="q") * numerator, denominator)
+    return [divide(tick * numerator, denominator) for tick in track.tick]
+
+
+def _snap(track: ColumnarTrack, grid: int, swing: float) -> Any:
+    # Moves every tick to the nearest grid point, with every other grid point delayed by the swing. Grid points are
+    # found within periods of two steps, holding points at 0, the swung offset and the start of the next period
+    period = 2 * grid
+    offset = grid + int(round(grid * swing))
+    if numpy is not None:
+        ticks = numpy.frombuffer(track.tick, dtype="q")
+        start = ticks // period * period
+        twice = 2 * (ticks - start)
+        return start + numpy.where(twice < offset, 0, numpy.where(twice < offset + period, offset, period))
+    snapped = []
+    for tick in track.tick:
+        start = tick // period * period
+        twice = 2 * (tick - start)
+        snapped.append(start + (0 if twice < offset else offset if twice < offset + period else period))
+    return snapped
+
+
+def _retime(track: ColumnarTrack, ticks: Any) -> ColumnarTrack:
+    # Builds a track with new ticks. Notes that had a duration but would now end where they start are lengthened to
+    # one tick, End of Track is kept last, and events moved past others are reordered, keeping the order of events
+    # at the same tick
+    on_indices, off_indices = track.note_pairs()
+    if numpy is not None:
+        ticks = numpy.array(ticks, dtype="q")
+        original = numpy.frombuffer(track.tick, dtype="q")
+        on_indices = numpy.frombuffer(on_indices, dtype="q")
+        off_indices = numpy.frombuffer(off_indices, dtype="q")
+        released = off_indices >= 0
+        on_indices, off_indices = on_indices[released], off_indices[released]
+        sounding = original[off_indices] > original[on_indices]
+        on_indices, off_indices = on_indices[sounding], off_indices[sounding]
+        ticks[off_indices] = numpy.maximum(ticks[off_indices], ticks[on_indices] + 1)
+        if len(ticks):
+            ends = (numpy.frombuffer(track.status, dtype="B") == 0xFF) & \
+                   (numpy.frombuffer(track.data1, dtype="B") == 0x2F)
+            ticks[ends] = ticks.max()
+        order = numpy.argsort(ticks, kind="stable")
+        columns = {name: array(typecode, numpy.frombuffer(getattr(track, name), dtype=typecode)[order].tobytes())
+                   for name, typecode in COLUMNS[1:]}
+        columns["tick"] = array("q", ticks[order].tobytes())
+        return ColumnarTrack(track.track_number, columns, track.heap)
+
+    ticks = list(ticks)
+    original = track.tick
+    for on_index, off_index in zip(on_indices, off_indices):
+        if off_index >= 0 and original[off_index] > original[on_index] and ticks[off_index] <= ticks[on_index]:
+            ticks[off_index] = ticks[on_index] + 1
+    end = max(ticks, default=0)
+    for index, (status, data1) in enumerate(zip(track.status, track.data1)):
+        if status == 0xFF and data1 == 0x2F:
+            ticks[index] = end
+    order = sorted(range(len(ticks)), key=ticks.__getitem__)
+    columns = {name: array(typecode, [getattr(track, name)[index] for index in order])
+               for name, typecode in COLUMNS[1:]}
+    columns["tick"] = array("q", [ticks[index] for index in order])
+    return ColumnarTrack(track.track_number, columns, track.heap)
+
+
+def resample(parsed: ColumnarFile, new_tpqn: int, rounding: str = "nearest") -> ColumnarFile:
+    """Changes the number of ticks per quarter note of a file, rescaling the time of every event
+
+    Ticks are rescaled with integer arithmetic, a column at a time with NumPy when it is installed. Notes that had a
+    duration are kept at least one tick long, rather than ending where they start, and delta times follow from the
+    new ticks when the file is written.
+
+    Args:
+        parsed (ColumnarFile): File to resample
+        new_tpqn (int): New ticks per quarter note
+        rounding (str): How rescaled ticks are rounded, a key of :data:`ROUNDING`
+
+    Returns:
+        ColumnarFile: Resampled file, with new tracks sharing the meta event payloads of the original
+
+    Raises:
+        ValueError: If the file is timed in SMPTE frames, new_tpqn is out of range, or the rounding is unknown
+    """
+    if not 0 < parsed.tpqn < 0x8000:
+        raise ValueError("Files timed in SMPTE frames can't be resampled")
+    if not 0 < new_tpqn < 0x8000:
+        raise ValueError("Invalid ticks per quarter note {}".format(new_tpqn))
+    if rounding not in ROUNDING:
+        raise ValueError("Unknown rounding {}".format(rounding))
+    return ColumnarFile(parsed.format, new_tpqn, [_retime(track, _rescale(track, new_tpqn, parsed.tpqn, rounding))
+                                                  for track in parsed.tracks])
+
+
+def quantise(parsed: ColumnarFile, grid: int, swing: float = 0.0) -> ColumnarFile:
+    """Moves every event of a file to the nearest point of a grid
+
+    With swing, every other grid point is delayed by a fraction of a grid step, e.g. 1/3 of an eighth note grid for
+    triplet swing. Notes that had a duration are kept at least one tick long.
+
+    Args:
+        parsed (ColumnarFile): File to quantise
+        grid (int): Grid step, in ticks, e.g. ``parsed.tpqn // 4`` for sixteenth notes
+        swing (float): Delay of odd grid points, as a fraction of a step from 0 up to 1
+
+    Returns:
+        ColumnarFile: Quantised file, with new tracks sharing the meta event payloads of the original
+
+    Raises:
+        ValueError: If the grid or swing is out of range
+    """
+    if grid <= 0:
+        raise ValueError("Invalid grid {}".format(grid))
+    if not 0 <= swing < 1:
+        raise ValueError("Invalid swing {}".format(swing))
+    return ColumnarFile(parsed.format, parsed.tpqn, [_retime(track, _snap(track, grid, swing))
+                                                     for track in parsed.tracks])
+
+
+class Transform:
+    """
+    A chain of transforms applied to every event of a columnar file in one pass
+
+    Each method returns a new transform with another step added, so transforms can be chained and reused, e.g.
+    ``Transform().transpose(-12).velocity_curve(curve).apply(parsed).write(stream)``. Steps on the same values are
+    composed into one lookup table, and stretches into one ratio, when they are added.
+
+    Attributes:
+        notes (List[List[int]]): New note number for each note number, for each channel of the input
+        velocities (List[int]): New velocity for each Note On velocity
+        channels (List[int]): New channel for each channel
+        ratio (fractions.Fraction): Factor applied to every tick
+        rounding (str): How stretched ticks are rounded, a key of :data:`ROUNDING`
+    """
+    notes = None  # type: List[List[int]]
+    velocities = None  # type: List[int]
+    channels = None  # type: List[int]
+    ratio = None  # type: Fraction
+    rounding = None  # type: str
+
+    def __init__(self) -> None:
+        self.notes = [list(range(128)) for _ in range(16)]
+        self.velocities = list(range(128))
+        self.channels = list(range(16))
+        self.ratio = Fraction(1)
+        self.rounding = "nearest"
+
+    def __repr__(self) -> str:
+        return "<Transform stretch {}>".format(self.ratio)
+
+    def _with(self, **changes: Any) -> 'Transform':
+        transform = Transform()
+        transform.__dict__.update(self.__dict__)
+        transform.__dict__.update(changes)
+        return transform
+
+    def transpose(self, semitones: int, channels: Iterable[int] = None) -> 'Transform':
+        """Adds a transposition of notes, Note Offs and Polyphonic Aftertouch. Notes moved out of range are clamped
+        to 0 or 127
+
+        Args:
+            semitones (int): Semitones to transpose by, down when negative
+            channels (Iterable[int]): Channels to transpose, as they are after any channel remapping added before.
+                By default every channel but channel 10 (9 counting from 0), as notes there pick percussion sounds
+                rather than pitches
+
+        Returns:
+            Transform: New transform
+
+        Raises:
+            ValueError: If a channel is out of range
+        """
+        channels = set(range(16)) - {9} if channels is None else set(channels)
+        if any(not 0 <= channel <= 15 for channel in channels):
+            raise ValueError("Channels must be from 0 to 15")
+        return self._with(notes=[[min(max(note + semitones, 0), 127) for note in notes]
+                                 if self.channels[channel] in channels else notes
+                                 for channel, notes in enumerate(self.notes)])
+
+    def velocity_curve(self, curve: Sequence[int]) -> 'Transform':
+        """Adds a remapping of the velocity of Note On events. Notes are kept at a velocity of at least 1, so they
+        don't turn into Note Offs
+
+        Args:
+            curve (Sequence[int]): New velocity for each velocity, 128 values from 0 to 127
+
+        Returns:
+            Transform: New transform
+
+        Raises:
+            ValueError: If the curve has the wrong length or values out of range
+        """
+        if len(curve) != 128 or any(not 0 <= value <= 127 for value in curve):
+            raise ValueError("Velocity curves need 128 values from 0 to 127")
+        return self._with(velocities=[curve[velocity] for velocity in self.velocities])
+
+    def remap_channels(self, mapping: Union[Mapping[int, int], Sequence[int]]) -> 'Transform':
+        """Adds a remapping of the channel of channel events
+
+        Args:
+            mapping (Union[Mapping[int, int], Sequence[int]]): New channel for each channel, as a mapping of the
+                channels that change or a sequence of 16 channels
+
+        Returns:
+            Transform: New transform
+
+        Raises:
+            ValueError: If a channel is out of range
+        """
+        if not isinstance(mapping, Mapping):
+            mapping = dict(enumerate(mapping))
+        if any(not 0 <= channel <= 15 for channel in list(mapping) + list(mapping.values())):
+            raise ValueError("Channels must be from 0 to 15")
+        return self._with(channels=[mapping.get(channel, channel) for channel in self.channels])
+
+    def stretch(self, ratio: Union[int, float, Fraction], rounding: str = None) -> 'Transform':
+        """Adds a time stretch, multiplying every tick. Notes that had a duration are kept at least one tick long
+
+        Args:
+            ratio (Union[int, float, fractions.Fraction]): Factor to multiply ticks by, above 0. Floats are
+                approximated by a fraction with a denominator of at most 65535
+            rounding (str): How stretched ticks are rounded, a key of :data:`ROUNDING`, or None to keep the current
+                rounding
+
+        Returns:
+            Transform: New transform
+
+        Raises:
+            ValueError: If the ratio isn't positive, or the rounding is unknown
+        """
+        ratio = Fraction(ratio).limit_denominator(0xFFFF)
+        if ratio <= 0:
+            raise ValueError("Invalid ratio {}".format(ratio))
+        if rounding is not None and rounding not in ROUNDING:
+            raise ValueError("Unknown rounding {}".format(rounding))
+        return self._with(ratio=self.ratio * ratio, rounding=rounding or self.rounding)
+
+    def _tables(self) -> Any:
+        # Lookup tables for the status byte, the first data byte of note events and the velocity of Note On events
+        statuses = list(range(256))
+        for status in range(0x80, 0xF0):
+            statuses[status] = status & 0xF0 | self.channels[status & 0x0F]
+        velocities = [0] + [max(velocity, 1) for velocity in self.velocities[1:]]
+        return statuses, self.notes, velocities
+
+    def apply_track(self, track: ColumnarTrack) -> ColumnarTrack:
+        """Applies the transform to a track
+
+        Args:
+            track (ColumnarTrack): Track to transform
+
+        Returns:
+            ColumnarTrack: New track, sharing the meta event payloads of the original
+        """
+        statuses, notes, velocities = self._tables()
+        if numpy is not None:
+            status = numpy.frombuffer(track.status, dtype="B")
+            data1 = numpy.frombuffer(track.data1, dtype="B")
+            data2 = numpy.frombuffer(track.data2, dtype="B")
+            status_class = status & 0xF0
+            columns = {
+                "status": numpy.asarray(statuses, dtype="B")[status],
+                "data1": numpy.where((status_class >= 0x80) & (status_class <= 0xA0),
+                                     numpy.asarray(notes, dtype="B")[status & 0x0F, data1], data1),
+                "data2": numpy.where(status_class == 0x90, numpy.asarray(velocities, dtype="B")[data2], data2)
+            }
+            columns = {name: array("B", column.astype("B").tobytes()) for name, column in columns.items()}
+        else:
+            columns = {"status": array("B"), "data1": array("B"), "data2": array("B")}
+            for status, data1, data2 in zip(track.status, track.data1, track.data2):
+                status_class = status & 0xF0
+                columns["status"].append(statuses[status])
+                columns["data1"].append(notes[status & 0x0F][data1] if 0x80 <= status_class <= 0xA0 else data1)
+                columns["data2"].append(velocities[data2] if status_class == 0x90 else data2)
+        for name, typecode in (("tick", "q"), ("payload_offset", "I"), ("payload_length", "I")):
+            columns[name] = array(typecode, bytes(getattr(track, name)))
+        transformed = ColumnarTrack(track.track_number, columns, track.heap)
+        if self.ratio == 1:
+            return transformed
+        return _retime(transformed, _rescale(track, self.ratio.numerator, self.ratio.denominator, self.rounding))
+
+    def apply(self, parsed: ColumnarFile) -> ColumnarFile:
+        """Applies the transform to every track of a file
+
+        Args:
+            parsed (ColumnarFile): File to transform
+
+        Returns:
+            ColumnarFile: New file, which can be written with :meth:`ColumnarFile.write`
+        """
+        return ColumnarFile(parsed.format, parsed.tpqn, [self.apply_track(track) for track in parsed.tracks])
@@ -0,0 +1,128 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Structural validation of Standard MIDI Files, without decoding any events
+"""
+
+import mmap
+import os
+from typing import Callable, List, NamedTuple, Union
+
+from midisnake.structure import HEADER_STRUCT, CHUNK_HEADER_STRUCT
+
+__all__ = ["ValidationIssue", "validate_structure", "validate_buffer", "HEADER_TRUNCATED", "HEADER_TYPE",
+           "HEADER_LENGTH", "HEADER_FORMAT", "HEADER_TRACK_COUNT", "CHUNK_TRUNCATED", "CHUNK_TYPE",
+           "TRACK_COUNT", "MISSING_END_OF_TRACK", "TRAILING_DATA"]
+
+# ---- Error codes ---- #
+HEADER_TRUNCATED = "header_truncated"  # File is shorter than the 14 byte header
+HEADER_TYPE = "header_type"  # File doesn't start with MThd
+HEADER_LENGTH = "header_length"  # Header length isn't 6
+HEADER_FORMAT = "header_format"  # Format isn't 0, 1 or 2
+HEADER_TRACK_COUNT = "header_track_count"  # Format 0 file declaring more than one track
+CHUNK_TRUNCATED = "chunk_truncated"  # Chunk header or data runs past the end of the file
+CHUNK_TYPE = "chunk_type"  # Chunk type isn't four ASCII characters
+TRACK_COUNT = "track_count"  # Number of track chunks differs from the header
+MISSING_END_OF_TRACK = "missing_end_of_track"  # Track chunk doesn't end with an End of Track event
+TRAILING_DATA = "trailing_data"  # Bytes after the last chunk too short to be a chunk
+
+ValidationIssue = NamedTuple("ValidationIssue", [
+    ('code', str),
+    ('offset', int),
+    ('message', str)
+])  # type: Union[Callable, NamedTuple]
+
+_END_OF_TRACK = b'\xFF\x2F\x00'
+
+
+def validate_structure(path: Union[str, bytes, os.PathLike]) -> List[ValidationIssue]:
+    """Checks the chunk structure of a MIDI file on disk. The file is memory mapped, and only the header, chunk
+    headers and last three bytes of each track are read, so the cost is independent of the amount of event data
+
+    Args:
+        path (PathLike): Path of the file
+
+    Returns:
+        List[ValidationIssue]: Problems found, in file order. Empty if the file is structurally valid
+    """
+    with open(path, 'rb') as midi_file:
+        if os.fstat(midi_file.fileno()).st_size == 0:
+            return validate_buffer(b'')
+        with mmap.mmap(midi_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return validate_buffer(buffer)
+
+
+def validate_buffer(buffer: Union[bytes, bytearray, memoryview, mmap.mmap]) -> List[ValidationIssue]:
+    """Checks the chunk structure of a MIDI file held in a buffer. See :func:`validate_structure`
+
+    Args:
+        buffer (Union[bytes, bytearray, memoryview, mmap.mmap]): File contents
+
+    Returns:
+        List[ValidationIssue]: Problems found, in file order. Empty if the buffer is structurally valid
+    """
+    issues = []  # type: List[ValidationIssue]
+    size = len(buffer)
+    if size < HEADER_STRUCT.size:
+        issues.append(ValidationIssue(HEADER_TRUNCATED, 0, "File is {} bytes, too short for a header".format(size)))
+        return issues
+
+    chunk_type, header_length, file_format, ntrks, _ = HEADER_STRUCT.unpack_from(buffer, 0)
+    if chunk_type != b'MThd':
+        issues.append(ValidationIssue(HEADER_TYPE, 0, "File had invalid header chunk type"))
+        return issues
+    if header_length != 6:
+        issues.append(ValidationIssue(HEADER_LENGTH, 4, "File has unsupported header length"))
+    if file_format not in (0, 1, 2):
+        issues.append(ValidationIssue(HEADER_FORMAT, 8, "File has unsupported format"))
+    if ntrks > 1 and file_format == 0:
+        issues.append(ValidationIssue(HEADER_TRACK_COUNT, 10, "Multiple tracks in single track format"))
+
+    track_count = 0
+    position = 8 + header_length
+    while position + CHUNK_HEADER_STRUCT.size <= size:
+        chunk_type, length = CHUNK_HEADER_STRUCT.unpack_from(buffer, position)
+        data_start = position + CHUNK_HEADER_STRUCT.size
+        chunk_end = data_start + length
+        if not chunk_type.isalpha():
+            issues.append(ValidationIssue(CHUNK_TYPE, position, "Invalid chunk type {!r}".format(chunk_type)))
+            return issues
+        if chunk_end > size:
+            issues.append(ValidationIssue(CHUNK_TRUNCATED, position, "Chunk of length {} runs {} bytes past the end "
+                                                                     "of the file".format(length, chunk_end - size)))
+            return issues
+        if chunk_type == b'MTrk':
+            track_count += 1
+            if length < 3 or buffer[chunk_end - 3:chunk_end] != _END_OF_TRACK:
+                issues.append(ValidationIssue(MISSING_END_OF_TRACK, position,
+                                              "Track {} doesn't end with End of Track".format(track_count - 1)))
+        position = chunk_end
+
+    if position < size:
+        issues.append(ValidationIssue(TRAILING_DATA, position, "{} trailing bytes after the last chunk".format(
+            size - position)))
+    if track_count != ntrks:
+        issues.append(ValidationIssue(TRACK_COUNT, 10, "Header declares {} tracks, file contains {}".format(
+            ntrks, track_count)))
+    return issues
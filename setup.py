@@ -9,7 +9,7 @@ setup(
 
     license="MIT",
     keywords="midisnake file parser library",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "typing"
     ],
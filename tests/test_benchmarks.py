@@ -0,0 +1,64 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from unittest import TestCase
+
+from benchmarks.harness import median, mad
+from benchmarks.regress import compare, format_report
+
+logger = logging.getLogger(__name__)
+
+
+def _result(rate: float, rate_mad: float, memory: int) -> dict:
+    return {"scenarios": {"text_heavy": {"events_per_s": {"median": rate, "mad": rate_mad},
+                                         "peak_memory": memory}}}
+
+
+class TestStatistics(TestCase):
+    def test_median(self):
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertEqual(median([4, 1, 2, 3]), 2.5)
+
+    def test_mad(self):
+        self.assertEqual(mad([1, 2, 3, 4, 100]), 1)
+
+
+class TestCompare(TestCase):
+    def test_no_regression(self):
+        findings = compare(_result(1000, 10, 100), _result(950, 10, 110))
+        self.assertFalse(any(finding.regressed for finding in findings))
+
+    def test_throughput_regression(self):
+        findings = compare(_result(1000, 10, 100), _result(500, 10, 100))
+        regressed = [finding.metric for finding in findings if finding.regressed]
+        self.assertEqual(regressed, ["events/s"])
+        self.assertIn("REGRESSED", format_report(findings))
+
+    def test_noisy_throughput_is_not_a_regression(self):
+        findings = compare(_result(1000, 200, 100), _result(700, 200, 100))
+        self.assertFalse(any(finding.regressed for finding in findings))
+
+    def test_memory_regression(self):
+        findings = compare(_result(1000, 10, 100), _result(1000, 10, 200))
+        regressed = [finding.metric for finding in findings if finding.regressed]
+        self.assertEqual(regressed, ["peak memory"])
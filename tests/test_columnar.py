@@ -0,0 +1,107 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from io import BytesIO
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from midisnake import columnar as columnar_module
+from midisnake.columnar import ColumnarFile, ColumnarTrack, numpy
+from midisnake.events import note_names_octave
+from midisnake.parser import Parser
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = (b'\x00\xFF\x03\x04Lead\x00\xFF\x51\x03\x07\xA1\x20\x00\x91\x3C\x64\x60\x3C\x00\x10\xE1\x00\x40'
+         b'\x00\xFF\x2F\x00')
+
+
+class TestColumnarTrack(TestCase):
+    def test_from_track(self):
+        logger.info("Starting columnar conversion test")
+        track = Parser(build_file(0, TRACK).getvalue()).tracks[0]
+        columnar = ColumnarTrack.from_track(track)
+        self.assertEqual(len(columnar), 6)
+        self.assertEqual(list(columnar.tick), [0, 0, 0, 0x60, 0x70, 0x70])
+        self.assertEqual(list(columnar.status), [0xFF, 0xFF, 0x91, 0x91, 0xE1, 0xFF])
+        self.assertEqual(list(columnar.data1), [0x03, 0x51, 0x3C, 0x3C, 0x00, 0x2F])
+        self.assertEqual(list(columnar.data2), [0, 0, 0x64, 0x00, 0x40, 0])
+        self.assertEqual(bytes(columnar.payload(0)), b'Lead')
+        self.assertEqual(bytes(columnar.payload(1)), b'\x07\xA1\x20')
+        self.assertEqual(bytes(columnar.payload(2)), b'')
+        self.assertEqual(bytes(columnar.payload(5)), b'')
+        self.assertEqual(columnar.heap, b'Lead\x07\xA1\x20')
+
+    def test_columns(self):
+        columnar = ColumnarTrack(3)
+        self.assertEqual(len(columnar), 0)
+        self.assertEqual(list(columnar.columns()), ["tick", "status", "data1", "data2", "payload_offset",
+                                                    "payload_length"])
+        columns = columnar.columns()
+        del columns["heap" if "heap" in columns else "data2"]
+        with self.assertRaises(ValueError):
+            ColumnarTrack(0, columns)
+        columns = ColumnarTrack.from_track(Parser(build_file(0, TRACK).getvalue()).tracks[0]).columns()
+        columns["tick"] = columns["tick"][:2]
+        with self.assertRaises(ValueError):
+            ColumnarTrack(0, columns)
+
+    def test_lookup(self):
+        columnar = ColumnarTrack.from_track(Parser(build_file(0, TRACK).getvalue()).tracks[0])
+        self.assertEqual(columnar.lookup(note_names_octave)[2:4], ["C4", "C4"])
+        self.assertEqual(len(columnar.lookup(note_names_octave, "data2")), len(columnar))
+
+    @skipIf(numpy is None, "NumPy isn't installed")
+    def test_lookup_numpy(self):  # pragma: no cover
+        columnar = ColumnarTrack.from_track(Parser(build_file(0, TRACK).getvalue()).tracks[0])
+        self.assertEqual(list(columnar.lookup(note_names_octave, use_numpy=True)),
+                         columnar.lookup(note_names_octave))
+
+
+    def test_note_pairs(self):
+        # A note ended by a Note Off after a second note of the same pitch starts, notes on another channel and
+        # never released, and a stray Note Off ahead of a note
+        data = build_file(0, b'\x00\x90\x3C\x40\x00\x3C\x50\x10\x80\x3C\x00\x00\x91\x3C\x40\x10\x90\x3C\x00'
+                             b'\x00\x3C\x00\x00\x90\x3E\x40\x00\xFF\x2F\x00').getvalue()
+        stray = build_file(0, b'\x00\x80\x3C\x00\x00\x90\x3C\x40\x10\x80\x3C\x00\x00\xFF\x2F\x00').getvalue()
+        for module in (None,) if numpy is None else (numpy, None):
+            with self.subTest(numpy=module is not None), patch.object(columnar_module, "numpy", module):
+                on_indices, off_indices = ColumnarTrack.from_track(Parser(data).tracks[0]).note_pairs()
+                self.assertEqual(list(on_indices), [0, 1, 3, 6])
+                self.assertEqual(list(off_indices), [2, 4, -1, -1])
+                on_indices, off_indices = ColumnarTrack.from_track(Parser(stray).tracks[0]).note_pairs()
+                self.assertEqual((list(on_indices), list(off_indices)), ([1], [2]))
+                on_indices, off_indices = ColumnarTrack().note_pairs()
+                self.assertEqual((list(on_indices), list(off_indices)), ([], []))
+
+
+class TestColumnarFile(TestCase):
+    def test_write(self):
+        logger.info("Starting columnar file write test")
+        data = build_file(1, TRACK, TRACK).getvalue()
+        columnar = ColumnarFile.from_parser(Parser(data))
+        self.assertEqual((columnar.format, columnar.tpqn, len(columnar.tracks)), (1, 96, 2))
+        output = BytesIO()
+        self.assertEqual(columnar.write(output), len(data))
+        self.assertEqual(output.getvalue(), data)
@@ -0,0 +1,93 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from midisnake.events import NoteOn
+from midisnake.meta_events import MetaTextEvent
+from midisnake.parser import Parser
+from midisnake.stats import ParseStats
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+
+def build_track(index: int) -> bytes:
+    name = "Track {}".format(index).encode()
+    data = b'\x00\xFF\x00\x02' + index.to_bytes(2, 'big') + b'\x00\xFF\x03' + bytes((len(name),)) + name
+    for note in range(64):
+        data += bytes((0x00, 0x90 | (index & 0x0F), (note + index) & 0x7F, 0x40, 0x10, (note + index) & 0x7F, 0x00))
+    return data + b'\x00\xFF\x2F\x00'
+
+
+def summarise(parser: Parser) -> tuple:
+    return tuple(
+        (track.meta_data["seq_number"].sequence_number, track.meta_data["chunk_name"].text, tuple(track.delta_times),
+         tuple(event.note_number for event in track.events if isinstance(event, NoteOn)))
+        for track in parser.tracks)
+
+
+class TestInstanceState(TestCase):
+    def test_parsers_share_nothing(self):
+        logger.info("Starting per instance state test")
+        first = Parser(build_file(1, build_track(1), build_track(2)).getvalue())
+        second = Parser(build_file(0, build_track(3)).getvalue())
+        self.assertEqual(len(first.tracks), 2)
+        self.assertEqual(len(second.tracks), 1)
+        self.assertEqual(first.chunk_positions, [14, 14 + 8 + len(build_track(1))])
+        self.assertEqual(second.chunk_positions, [14])
+        self.assertIsNot(first.diagnostics, second.diagnostics)
+        self.assertEqual(Parser.tracks, None)
+
+    def test_meta_data(self):
+        parser = Parser(build_file(1, build_track(1), build_track(2) + b'\x00\xFF\x03\x01X').getvalue())
+        self.assertEqual(parser.tracks[0].meta_data["chunk_name"].text, "Track 1")
+        self.assertEqual(parser.tracks[1].meta_data["chunk_name"].text, "Track 2")
+        self.assertEqual(parser.tracks[1].meta_data["seq_number"].sequence_number, 2)
+        self.assertIsNone(parser.tracks[0].meta_data["copyright"])
+        self.assertIsInstance(parser.tracks[0].meta_data["chunk_name"], MetaTextEvent)
+
+
+class TestConcurrentParsing(TestCase):
+    def test_thread_pool(self):
+        logger.info("Starting concurrent parsing test")
+        files = [build_file(1, *(build_track(index * 4 + track) for track in range(4))).getvalue()
+                 for index in range(16)]
+        expected = [summarise(Parser(data)) for data in files]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # Decode text lazily inside the workers too, so cached decoding runs concurrently
+            results = list(executor.map(lambda data: summarise(Parser(data)), files * 4))
+        self.assertEqual(results, expected * 4)
+
+    def test_thread_pool_stats(self):
+        files = [build_file(0, build_track(index)).getvalue() for index in range(8)]
+
+        def parse(data):
+            stats = ParseStats()
+            Parser(data, stats=stats)
+            return stats.status_counts[0x90]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(executor.map(parse, files)), [128] * 8)
@@ -0,0 +1,125 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import pickle
+from unittest import TestCase
+
+from midisnake.controllers import ControllerState, ControllerValue, ParameterValue, resolve_controllers
+from midisnake.encode import encode_events
+from midisnake.events import ChannelPressure, ControlChange, ProgramChange
+from midisnake.parser import Parser
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+# Program change with running status, channel pressure, then pitch bend range RPN set to 12 semitones
+TRACK = (b'\x00\xC2\x05\x10\x06\x00\xD2\x40\x00\xB2\x07\x64\x00\x27\x10\x00\x0A\x00'
+         b'\x00\x65\x00\x00\x64\x00\x00\x06\x0C\x00\x26\x00\x00\x60\x00\x00\x65\x7F\x00\x64\x7F\x00\x06\x01'
+         b'\x00\xFF\x2F\x00')
+
+
+def control_change(channel: int, controller: int, value: int) -> ControlChange:
+    return ControlChange(0xB00000 | (channel << 16) | (controller << 8) | value)
+
+
+class TestChannelEvents(TestCase):
+    def test_constructors(self):
+        logger.info("Starting channel voice event tests")
+        self.assertEqual(vars(ControlChange(0xB10A20)), {
+            'channel_number': 1,
+            'controller_number': 0x0A,
+            'controller_name': "Pan",
+            'controller_value': 0x20,
+            'raw_data': 0xB10A20
+        })
+        self.assertEqual(ControlChange(0xB10A20).decoded_value, "left")
+        self.assertEqual(ControlChange(0xB10740).decoded_value, 0x40)
+        self.assertEqual(vars(ProgramChange(0xC31300)), {'channel_number': 3, 'program_number': 0x13,
+                                                         'raw_data': 0xC31300})
+        self.assertEqual(vars(ChannelPressure(0xD47F00)), {'channel_number': 4, 'pressure': 0x7F,
+                                                           'raw_data': 0xD47F00})
+        with self.assertRaises(ValueError):
+            ControlChange(0xB08000)
+        with self.assertRaises(ValueError):
+            ProgramChange(0xB00000)
+
+    def test_parse(self):
+        logger.info("Starting channel voice parsing test")
+        track = Parser(build_file(0, TRACK).getvalue()).tracks[0]
+        self.assertEqual([type(event) for event in track.events[:4]],
+                         [ProgramChange, ProgramChange, ChannelPressure, ControlChange])
+        self.assertEqual([event.program_number for event in track.events[:2]], [5, 6])
+        self.assertEqual(track.delta_times[:3], [0, 0x10, 0])
+        self.assertEqual(track.events[2].pressure, 0x40)
+        self.assertEqual([event.controller_number for event in track.events[3:6]], [0x07, 0x27, 0x0A])
+        self.assertEqual(encode_events(track.delta_times, track.events), TRACK)
+        restored = pickle.loads(pickle.dumps(track))
+        self.assertEqual(encode_events(restored.delta_times, restored.events), TRACK)
+        interned = Parser(build_file(0, TRACK).getvalue(), intern=True).tracks[0]
+        self.assertEqual(encode_events(interned.delta_times, interned.events), TRACK)
+
+
+class TestControllerState(TestCase):
+    def test_track(self):
+        logger.info("Starting controller state machine test")
+        track = Parser(build_file(0, TRACK).getvalue()).tracks[0]
+        self.assertEqual(list(resolve_controllers(track.events)), [
+            (3, ControllerValue(2, 0x07, 0x64, False)),
+            (4, ControllerValue(2, 0x07, (0x64 << 7) | 0x10, True)),
+            (5, ControllerValue(2, 0x0A, 0, False)),
+            (8, ParameterValue(2, True, 0, 12 << 7)),
+            (9, ParameterValue(2, True, 0, 12 << 7)),
+            (10, ParameterValue(2, True, 0, (12 << 7) + 1))
+        ])
+
+    def test_state(self):
+        state = ControllerState()
+        self.assertIsNone(state.update(control_change(0, 0x06, 1)))
+        self.assertEqual(state.update(control_change(0, 0x40, 0x7F)), ControllerValue(0, 0x40, 0x7F, False))
+        self.assertEqual(state.update(control_change(1, 0x27, 5)), ControllerValue(1, 0x07, 5, True))
+        self.assertIsNone(state.update(control_change(1, 0x63, 0x01)))
+        self.assertIsNone(state.update(control_change(1, 0x62, 0x08)))
+        self.assertEqual(state.update(control_change(1, 0x06, 0x40)), ParameterValue(1, False, 0x88, 0x2000))
+        self.assertEqual(state.update(control_change(1, 0x61, 0)), ParameterValue(1, False, 0x88, 0x1FFF))
+        # Channels are independent
+        self.assertIsNone(state.update(control_change(2, 0x06, 0x40)))
+        self.assertEqual(state.update(control_change(1, 0x79, 0)), ControllerValue(1, 0x79, 0, False))
+        self.assertIsNone(state.update(control_change(1, 0x06, 0x40)))
+        state.update(control_change(3, 0x07, 0x10))
+        state.reset(3)
+        self.assertFalse(any(state.channels[3].fine))
+        self.assertEqual(state.update(control_change(3, 0x27, 1)), ControllerValue(3, 0x07, 1, True))
+        state.reset()
+        self.assertEqual(state.channels[1].parameter_msb, 0x7F)
+
+    def test_resolution(self):
+        state = ControllerState()
+        # Coarse only controllers stay 7 bit
+        self.assertEqual(state.update(control_change(0, 0x07, 0x64)), ControllerValue(0, 0x07, 0x64, False))
+        self.assertEqual(state.update(control_change(0, 0x07, 0x7F)), ControllerValue(0, 0x07, 0x7F, False))
+        # Once the least significant byte is seen, both halves are combined
+        self.assertEqual(state.update(control_change(0, 0x27, 0x01)), ControllerValue(0, 0x07, 0x3F81, True))
+        self.assertEqual(state.update(control_change(0, 0x07, 0x10)), ControllerValue(0, 0x07, 0x10 << 7, True))
+        # Per controller and channel
+        self.assertEqual(state.update(control_change(1, 0x07, 0x10)), ControllerValue(1, 0x07, 0x10, False))
+        self.assertEqual(state.update(control_change(0, 0x01, 0x10)), ControllerValue(0, 0x01, 0x10, False))
@@ -0,0 +1,91 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.convert import to_format_0, to_format_1
+from midisnake.parser import Parser
+from tests.test_edit import RUNNING, timed_events
+from tests.test_parser import build_file
+from tests.test_playback import DATA
+
+logger = logging.getLogger(__name__)
+
+
+class UnseekableStream(BytesIO):
+    def seekable(self):
+        return False
+
+
+def convert(function, data):
+    output = BytesIO()
+    written = function(BytesIO(data), output)
+    unseekable = UnseekableStream()
+    function(BytesIO(data), unseekable)
+    assert unseekable.getvalue() == output.getvalue() and written == len(output.getvalue())
+    return output.getvalue()
+
+
+def merged_events(parser):
+    events = []
+    for track in parser.tracks:
+        events += timed_events(track)
+    return sorted(events, key=lambda event: event[0])
+
+
+class TestConvert(TestCase):
+    def test_format_0(self):
+        logger.info("Starting format 0 conversion test")
+        parser = Parser(BytesIO(convert(to_format_0, DATA)))
+        original = Parser(BytesIO(DATA))
+        self.assertEqual((parser.header.format, parser.header.tpqn, len(parser.tracks)), (0, 96, 1))
+        self.assertEqual(timed_events(parser.tracks[0]), merged_events(original))
+        self.assertEqual(sum(parser.tracks[0].delta_times), max(sum(track.delta_times) for track in original.tracks))
+
+    def test_format_1(self):
+        logger.info("Starting format 1 conversion test")
+        parser = Parser(BytesIO(convert(to_format_1, convert(to_format_0, DATA))))
+        original = Parser(BytesIO(DATA))
+        self.assertEqual((parser.header.format, parser.header.tpqn, len(parser.tracks)), (1, 96, 3))
+        for track, original_track in zip(parser.tracks, original.tracks):
+            self.assertEqual(timed_events(track), timed_events(original_track))
+        self.assertEqual(convert(to_format_1, DATA), convert(to_format_1, convert(to_format_0, DATA)))
+
+    def test_running_status(self):
+        logger.info("Starting conversion running status test")
+        data = build_file(1, b'\x00\xFF\x03\x01a\x60\xFF\x01\x01b\x00\xFF\x2F\x00',
+                          b'\x00\x90\x3C\x40\x60\x3C\x00\x00\x3E\x40\x00\xFF\x2F\x00').getvalue()
+        # The status byte is repeated after the meta event
+        self.assertEqual(convert(to_format_0, data)[22:],
+                         b'\x00\xFF\x03\x01a\x00\x90\x3C\x40\x60\xFF\x01\x01b\x00\x90\x3C\x00\x00\x3E\x40'
+                         b'\x00\xFF\x2F\x00')
+        self.assertEqual(convert(to_format_1, RUNNING), convert(to_format_1, convert(to_format_0, RUNNING)))
+
+    def test_format_2(self):
+        logger.info("Starting format 2 conversion test")
+        data = build_file(2, b'\x00\xFF\x2F\x00').getvalue()
+        for function in (to_format_0, to_format_1):
+            with self.assertRaises(ValueError):
+                function(BytesIO(data), BytesIO())
@@ -0,0 +1,121 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import logging
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from midisnake.corpus import PERCUSSION, CorpusStats, corpus_stats, file_stats
+from tests.test_parser import build_file
+from tests.test_playback import DATA
+
+logger = logging.getLogger(__name__)
+
+# Notes of a quarter and an eighth note on channel 1, with a program change between them, a drum hit, and an
+# unsupported meta event
+SONG = build_file(1, b'\x00\xFF\x51\x03\x07\xA1\x20\x00\xFF\x58\x04\x06\x03\x18\x08\x00\xFF\x7F\x01\x00'
+                     b'\x00\xFF\x2F\x00',
+                  b'\x00\x90\x3C\x64\x60\x80\x3C\x00\x00\xC0\x18\x00\x90\x3E\x50\x30\x3E\x00\x00\x99\x24\x7F'
+                  b'\x00\xFF\x2F\x00').getvalue()
+BROKEN = SONG[:30]
+
+
+class TestCorpusStats(TestCase):
+    def test_file(self):
+        logger.info("Starting file statistics test")
+        stats = file_stats(SONG)
+        self.assertEqual((stats.files, stats.failed), (1, 0))
+        self.assertEqual(stats.pitches, {0x3C: 1, 0x3E: 1, 0x24: 1})
+        self.assertEqual(stats.velocities, {0x64: 1, 0x50: 1, 0x7F: 1})
+        self.assertEqual(stats.durations, {24: 1, 12: 1})
+        self.assertEqual(stats.programs, {0: 1, 0x18: 1, PERCUSSION: 1})
+        self.assertEqual(stats.tempos, {120: 1})
+        self.assertEqual(stats.time_signatures, {"6/8": 1})
+        self.assertEqual(stats.meta_types, {0x51: 1, 0x58: 1, 0x2F: 2})
+        self.assertEqual(stats.unknown_meta, 1)
+
+        # Meta types past the end of the decoder table are unknown too
+        stats = file_stats(build_file(0, b'\x00\xFF\x80\x00\x00\xFF\xFE\x01\x00\x00\xFF\x2F\x00').getvalue())
+        self.assertEqual((stats.failed, stats.unknown_meta), (0, 2))
+        self.assertEqual(stats.meta_types, {0x2F: 1})
+
+        stats = file_stats(BROKEN)
+        self.assertEqual((stats.files, stats.failed, stats.errors), (1, 1, {"ValueError": 1}))
+        self.assertEqual(stats.pitches, {})
+
+    def test_merge(self):
+        logger.info("Starting statistics merge test")
+        parts = [file_stats(data) for data in (SONG, DATA, BROKEN, SONG)]
+        left = CorpusStats()
+        for part in parts:
+            left.merge(part)
+        right = CorpusStats().merge(parts[3]).merge(parts[2].merge(parts[1])).merge(parts[0])
+        self.assertEqual(left, right)
+        self.assertEqual((left.files, left.failed), (4, 1))
+        # Once in each copy of SONG, and once in each part of DATA
+        self.assertEqual(left.pitches[0x3C], 4)
+        self.assertEqual(CorpusStats.from_dict(json.loads(json.dumps(left.as_dict()))), left)
+
+
+class TestCorpus(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.paths = []
+        for index, data in enumerate([SONG, DATA, BROKEN] * 5):
+            path = os.path.join(self.directory.name, "{}.mid".format(index))
+            with open(path, "wb") as midi_file:
+                midi_file.write(data)
+            self.paths.append(path)
+        self.expected = CorpusStats()
+        for path in self.paths:
+            self.expected.merge(file_stats(path))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_workers(self):
+        logger.info("Starting corpus statistics test")
+        self.assertEqual(corpus_stats(self.paths, batch_size=2), self.expected)
+        self.assertEqual(corpus_stats(iter(self.paths), workers=2, batch_size=2), self.expected)
+        self.assertEqual(self.expected.files, 15)
+
+    def test_resume(self):
+        logger.info("Starting corpus statistics resume test")
+        checkpoint = os.path.join(self.directory.name, "checkpoint.json")
+
+        def interrupted():
+            yield from self.paths[:7]
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            corpus_stats(interrupted(), batch_size=2, checkpoint=checkpoint, checkpoint_every=1)
+        with open(checkpoint) as checkpoint_file:
+            saved = json.load(checkpoint_file)
+        self.assertEqual((saved["prefix"], saved["stats"]["files"]), (3, 6))
+
+        self.assertEqual(corpus_stats(self.paths, workers=2, batch_size=2, checkpoint=checkpoint), self.expected)
+        self.assertEqual(corpus_stats(self.paths, batch_size=2, checkpoint=checkpoint), self.expected)
+        with self.assertRaises(ValueError):
+            corpus_stats(self.paths, batch_size=3, checkpoint=checkpoint)
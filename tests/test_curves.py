@@ -0,0 +1,136 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+from array import array
+import logging
+from unittest import TestCase
+
+from midisnake.columnar import ColumnarTrack
+from midisnake.curves import PITCH_BEND, Curve, CHANNEL_PRESSURE, extract_curves, thin_rdp, thin_redundant, thin_track
+from midisnake.encode import write_file
+from midisnake.parser import Parser
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+
+def build_track(*events: bytes) -> ColumnarTrack:
+    return ColumnarTrack.from_track(Parser(build_file(0, b''.join(events) + b'\x00\xFF\x2F\x00').getvalue()).tracks[0])
+
+
+# Volume ramp on channel 0 with a repeated value, modulation on channel 1, pitch bend and channel pressure
+RAMP = [b'\x00\xB0\x07\x00'] + [b'\x10\x07' + bytes((value,)) for value in (10, 20, 30, 40, 40, 50, 60, 60, 5)]
+OTHERS = [b'\x00\xB1\x01\x10', b'\x00\xB1\x01\x10', b'\x00\xE0\x00\x40', b'\x08\xE0\x00\x40', b'\x00\xD0\x20']
+
+
+class TestCurves(TestCase):
+    def test_extract(self):
+        logger.info("Starting curve extraction test")
+        curves = extract_curves(build_track(*RAMP + OTHERS))
+        self.assertEqual(sorted(curves), [(0, 0x07), (0, PITCH_BEND), (0, CHANNEL_PRESSURE), (1, 0x01)])
+        volume = curves[(0, 0x07)]
+        self.assertEqual(list(volume.ticks), [0, 16, 32, 48, 64, 80, 96, 112, 128, 144])
+        self.assertEqual(list(volume.values), [0, 10, 20, 30, 40, 40, 50, 60, 60, 5])
+        self.assertEqual(list(volume.indices), list(range(10)))
+        self.assertEqual(list(curves[(0, PITCH_BEND)].values), [0x2000, 0x2000])
+        self.assertEqual(list(curves[(0, PITCH_BEND)].ticks), [144, 152])
+        self.assertEqual(list(curves[(0, CHANNEL_PRESSURE)].values), [0x20])
+
+    def test_redundant(self):
+        volume = thin_redundant(extract_curves(build_track(*RAMP))[(0, 0x07)])
+        self.assertEqual(list(volume.values), [0, 10, 20, 30, 40, 50, 60, 5])
+        self.assertEqual(list(volume.indices), [0, 1, 2, 3, 4, 6, 7, 9])
+
+    def test_rdp(self):
+        logger.info("Starting RDP thinning test")
+        volume = extract_curves(build_track(*RAMP))[(0, 0x07)]
+        # Controllers hold their value, so steps larger than the tolerance are kept even along a straight ramp
+        self.assertEqual(list(thin_rdp(thin_redundant(volume), 1).values), [0, 10, 20, 30, 40, 50, 60, 5])
+        thinned = thin_rdp(thin_redundant(volume), 10)
+        self.assertEqual(list(thinned.values), [0, 20, 40, 60, 5])
+        self.assertEqual(list(thin_rdp(volume, 100).values), [0, 5])
+        self.assertEqual(thin_rdp(thinned._replace(values=thinned.values[:2], ticks=thinned.ticks[:2]), 1).values,
+                         thinned.values[:2])
+
+    def test_thin_track(self):
+        logger.info("Starting track thinning test")
+        track = build_track(*RAMP + OTHERS)
+        thinned = thin_track(track)
+        self.assertEqual(len(thinned), len(track) - 4)
+        # Time carried by removed events moves to the next kept event
+        self.assertEqual(list(thinned.tick), [tick for index, tick in enumerate(track.tick)
+                                              if index not in (5, 8, 11, 13)])
+
+        output = io.BytesIO()
+        write_file(output, 0, 96, [thinned.encode()])
+        reparsed = ColumnarTrack.from_track(Parser(output.getvalue()).tracks[0])
+        for name, column in thinned.columns().items():
+            self.assertEqual(list(getattr(reparsed, name)), list(column), name)
+        self.assertEqual(len(thin_track(track, tolerance=1)), len(thinned))
+        self.assertEqual(len(thin_track(track, tolerance=10)), len(thinned) - 3)
+        self.assertEqual(len(thin_track(track, controllers=[(1, 0x01)])), len(track) - 1)
+
+    def test_step_error(self):
+        logger.info("Starting thinned step error test")
+        # A modulation ramp from 0 to 127, one step every 10 ticks
+        track = build_track(b'\x00\xB0\x01\x00', *(b'\x0A\x01' + bytes((value,)) for value in range(1, 128)))
+        thinned = thin_track(track, tolerance=2)
+        self.assertLess(len(thinned), len(track))
+        # Replayed as steps, every original value is within the tolerance of the value held at its tick
+        kept = [(tick, value) for tick, status, value in zip(thinned.tick, thinned.status, thinned.data2)
+                if status == 0xB0]
+        held = 0
+        for tick, status, value in zip(track.tick, track.status, track.data2):
+            if status != 0xB0:
+                continue
+            held = [kept_value for kept_tick, kept_value in kept if kept_tick <= tick][-1]
+            self.assertLessEqual(abs(value - held), 2, tick)
+        self.assertEqual(held, 127)
+
+    def test_long_ramp(self):
+        logger.info("Starting long ramp thinning test")
+        # A pitch bend ramp over the whole range, one step at a time
+        values = array("i", range(0x4000))
+        ramp = Curve(0, PITCH_BEND, array("q", range(0, 0x40000, 0x10)), values, array("q", range(0x4000)))
+        thinned = thin_rdp(ramp, 64)
+        # One value kept per 65 steps, plus the last
+        self.assertEqual(len(thinned.values), 0x4000 // 65 + 2)
+        self.assertEqual(list(thinned.values[:3]), [0, 65, 130])
+        self.assertEqual(thinned.values[-1], 0x3FFF)
+
+    def test_protected_controllers(self):
+        # A repeated MSB resets the LSB, so it isn't redundant while the LSB controller is in use
+        track = build_track(b'\x00\xB0\x07\x10', b'\x00\xB0\x27\x05', b'\x00\xB0\x07\x10', b'\x00\xB0\x06\x01',
+                            b'\x00\xB0\x06\x01')
+        self.assertIs(thin_track(track), track)
+        self.assertEqual(len(thin_track(track, controllers=[(0, 0x07)])), len(track) - 1)
+        # High Resolution Velocity Prefix applies to the next note, so repeats of it aren't redundant
+        track = build_track(b'\x00\xB0\x58\x10', b'\x00\x90\x3C\x40', b'\x00\xB0\x58\x10', b'\x00\x90\x3E\x40')
+        self.assertIs(thin_track(track, tolerance=8), track)
+
+    def test_encode(self):
+        track = build_track(b'\x00\xC0\x05', b'\x00\xC0\x06', b'\x00\xFF\x03\x02ab', b'\x00\x90\x3C\x40')
+        self.assertEqual(track.encode(), b'\x00\xC0\x05\x00\x06\x00\xFF\x03\x02ab\x00\x90\x3C\x40\x00\xFF\x2F\x00')
+        self.assertEqual(track.encode(running_status=False)[:6], b'\x00\xC0\x05\x00\xC0\x06')
+        with self.assertRaises(ValueError):
+            build_track(*RAMP).take([3, 0]).encode()
@@ -0,0 +1,96 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.edit import crop
+from midisnake.encode import encode_event
+from midisnake.parser import Parser
+from midisnake.playback import SeekIndex
+from tests.test_parser import build_file
+from tests.test_playback import DATA
+
+logger = logging.getLogger(__name__)
+
+RUNNING = build_file(0, b'\x00\x90\x3C\x40\x60\x3C\x00\x00\x3E\x40\x60\x3E\x00\x00\xFF\x2F\x00').getvalue()
+
+
+def timed_events(track, start=0, end=None):
+    tick = 0
+    events = []
+    for delta, event in zip(track.delta_times, track.events):
+        tick += delta
+        if tick >= start and (end is None or tick < end) and getattr(event, "variant_number", None) != 0x2F:
+            events.append((tick - start, encode_event(event)))
+    return events
+
+
+class TestCrop(TestCase):
+    def test_events(self):
+        logger.info("Starting crop events test")
+        cropped = crop(BytesIO(DATA), 0x320, 0x920)
+        original = Parser(BytesIO(DATA))
+        parser = Parser(BytesIO(cropped))
+        self.assertEqual((parser.header.format, parser.header.tpqn, len(parser.tracks)), (1, 96, 3))
+        for track, original_track in zip(parser.tracks, original.tracks):
+            events = timed_events(track)
+            self.assertEqual([event for event in events if 0 < event[0] < 0x600],
+                             timed_events(original_track, 0x320, 0x920))
+            self.assertEqual(sum(track.delta_times), 0x600)
+        # The notes held at the end are released there
+        self.assertEqual(timed_events(parser.tracks[1])[-1], (0x600, b'\x80\x48\x00'))
+        self.assertEqual(timed_events(parser.tracks[0]),
+                         [(0, b'\xFF\x51\x03\x0F\x42\x40'), (0, b'\xFF\x58\x04\x03\x02\x18\x08')])
+
+    def test_state(self):
+        logger.info("Starting crop state test")
+        cropped = crop(BytesIO(DATA), 0x320, 0x920)
+        for tick in (0x10, 0x300, 0x5FF):
+            state = SeekIndex.build(BytesIO(cropped)).seek(BytesIO(cropped), tick)
+            expected = SeekIndex.build(BytesIO(DATA)).seek(BytesIO(DATA), tick + 0x320)
+            self.assertEqual((state.tempo, state.time_signature), (expected.tempo, expected.time_signature))
+            for channel, expected_channel in zip(state.channels, expected.channels):
+                channel.notes = expected_channel.notes = {}
+                self.assertEqual(channel, expected_channel)
+
+    def test_index(self):
+        logger.info("Starting crop with index test")
+        index = SeekIndex.build(BytesIO(DATA), 0x100)
+        self.assertEqual(crop(BytesIO(DATA), 0x320, 0x920, index), crop(BytesIO(DATA), 0x320, 0x920))
+
+    def test_running_status(self):
+        logger.info("Starting crop running status test")
+        cropped = crop(RUNNING, 0x30, 0x100)
+        self.assertEqual(cropped[22:], b'\x30\x90\x3C\x00\x00\x3E\x40\x60\x3E\x00\x40\xFF\x2F\x00')
+
+    def test_held_notes(self):
+        logger.info("Starting crop held notes test")
+        self.assertEqual(crop(RUNNING, 0, 0x30)[22:], b'\x00\x90\x3C\x40\x30\x80\x3C\x00\x00\xFF\x2F\x00')
+
+    def test_invalid(self):
+        logger.info("Starting crop invalid range test")
+        for start, end in ((-1, 10), (10, 10), (10, 5)):
+            with self.assertRaises(ValueError):
+                crop(RUNNING, start, end)
@@ -20,10 +20,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import logging
-from unittest import TestCase, TestSuite
-from unittest.mock import MagicMock, call
+from unittest import TestCase
 
-from midisnake.events import NoteOff, NoteOn, PolyphonicAftertouch, PitchBend, get_note_name, _decode_leftright
+from midisnake.events import NoteOff, NoteOn, PolyphonicAftertouch, PitchBend, get_note_name, _decode_leftright, \
+    _decode_switch, note_names, note_names_octave, controller_names, controller_decoders, controller_values, \
+    midi_controls
 from midisnake.errors import EventLengthError
 
 logger = logging.getLogger(__name__)
@@ -542,4 +543,55 @@ class TestHelpers(TestCase):
         )
 
 
+class TestLookupTables(TestCase):
+    def test_note_names(self):
+        logger.info("Testing note name tables")
+        self.assertEqual(len(note_names), 128)
+        self.assertEqual(note_names[61], "C#")
+        self.assertEqual(note_names_octave[0], "C-1")
+        self.assertEqual(note_names_octave[60], "C4")
+        self.assertEqual(note_names_octave[127], "G9")
+        self.assertEqual(get_note_name(69, octave=True), "A4")
+        with self.assertRaises(ValueError):
+            get_note_name(128, octave=True)
+
+    def test_controllers(self):
+        logger.info("Testing controller tables")
+        self.assertEqual(len(controller_names), 128)
+        self.assertEqual(controller_names[0x07], "Channel Volume")
+        self.assertEqual(controller_names[0x27], "Channel Volume LSB")
+        self.assertEqual(controller_names[0x40], "Sustain Pedal")
+        self.assertEqual(controller_names[0x65], "Registered Parameter Number MSB")
+        self.assertEqual(controller_names[0x7F], "Poly Mode On")
+        self.assertEqual(controller_names[0x66], "undefined")
+        self.assertIs(controller_decoders[0x0A], _decode_leftright)
+        self.assertIs(controller_decoders[0x40], _decode_switch)
+        self.assertIsNone(controller_decoders[0x07])
+        for controller in range(128):
+            decoder = controller_decoders[controller]
+            table = controller_values[controller]
+            self.assertEqual(table is None, decoder is None)
+            if decoder is not None:
+                self.assertEqual(tuple(decoder(value) for value in range(128)), table)
+            self.assertEqual(midi_controls[controller]["name"], controller_names[controller])
+        self.assertEqual(_decode_switch(63), "off")
+        self.assertEqual(_decode_switch(64), "on")
+        with self.assertRaises(ValueError):
+            _decode_switch(128)
+
+    def test_events_use_tables(self):
+        for data in range(0x900000, 0x908000, 0x81):
+            event = NoteOn(data)
+            self.assertEqual(event.note_name, note_names[(data >> 8) & 0x7F])
+        with self.assertRaises(ValueError):
+            NoteOff(0x89FF00)
+        self.assertEqual(PitchBend(0xE37F7F).bend_amount, 0x3FFF)
+        self.assertEqual(PitchBend(0xE30040).channel_number, 3)
+        self.assertEqual(vars(PolyphonicAftertouch(0xA23C10)), {
+            'channel_number': 2,
+            'note_name': 'C',
+            'note_number': 0x3C,
+            'pressure': 0x10,
+            'raw_data': 0xA23C10
+        })
 
@@ -0,0 +1,67 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.structure import Header, iter_chunks
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = b'\x00\x90\x3C\x64\x00\xFF\x2F\x00'
+
+
+class TestHeader(TestCase):
+    def test_fields(self):
+        header = Header(build_file(1, TRACK, TRACK, tpqn=480))
+        self.assertEqual((header.length, header.format, header.ntrks, header.tpqn), (6, 1, 2, 480))
+
+    def test_invalid(self):
+        logger.info("Starting Header exception tests")
+        data = build_file(1, TRACK).getvalue()
+        for invalid in [b'MThd\x00\x00', b'RIFF' + data[4:], data[:7] + b'\x07' + data[8:],
+                        data[:9] + b'\x03' + data[10:]]:
+            with self.assertRaises(ValueError):
+                Header(BytesIO(invalid))
+        with self.assertRaises(ValueError):
+            Header(build_file(0, TRACK, TRACK))
+
+
+class TestIterChunks(TestCase):
+    def test_chunks(self):
+        logger.info("Starting iter_chunks test")
+        data = build_file(1, TRACK).getvalue() + b'XFIH\x00\x00\x00\x02ab'
+        chunks = list(iter_chunks(data))
+        self.assertEqual([chunk.chunk_type for chunk in chunks], [b'MThd', b'MTrk', b'XFIH'])
+        self.assertEqual([chunk.offset for chunk in chunks], [0, 14, 30])
+        self.assertEqual([chunk.length for chunk in chunks], [6, 8, 2])
+        self.assertEqual(bytes(chunks[1].data), TRACK)
+        self.assertEqual(bytes(chunks[2].data), b'ab')
+
+    def test_truncated(self):
+        data = build_file(1, TRACK).getvalue()
+        with self.assertRaises(ValueError):
+            list(iter_chunks(data[:-1]))
+        with self.assertRaises(ValueError):
+            list(iter_chunks(data + b'MTrk'))
@@ -25,7 +25,7 @@ import logging
 from unittest import TestCase
 from unittest.mock import patch
 
-from midisnake.integers import IntBuilder, LengthException
+from midisnake.integers import IntBuilder, LengthException, build_array, numpy
 
 logger = logging.getLogger(__name__)
 
@@ -448,3 +448,40 @@ class TestIntBuilder(TestCase):
             'original_data': bytearray(
                 b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\r\xe0\xb6\xb3\xa7c\xff\xff')
         })
+
+
+class TestBuildArray(TestCase):
+    data = bytes(range(1, 13))
+
+    def test_widths(self):
+        logger.info("Starting build_array tests")
+        for width in (1, 2, 3, 4):
+            for byteorder in ("big", "little"):
+                expected = [int.from_bytes(self.data[index:index + width], byteorder)
+                            for index in range(0, len(self.data), width)]
+                result = build_array(self.data, width, byteorder)
+                self.assertEqual(list(result), expected,
+                                 msg="build_array gave incorrect uint{} {} endian values".format(width * 8, byteorder))
+                self.assertEqual(result.itemsize, 4 if width == 3 else width)
+
+    def test_memoryview(self):
+        self.assertEqual(list(build_array(memoryview(self.data)[2:6], 2)), [0x0304, 0x0506])
+
+    def test_exceptions(self):
+        with self.assertRaises(LengthException):
+            build_array(self.data[:5], 2)
+        with self.assertRaises(ValueError):
+            build_array(self.data, 8)
+        with self.assertRaises(ValueError):
+            build_array(self.data, 2, "middle")
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy(self):  # pragma: no cover
+        for width in (1, 2, 3, 4):
+            for byteorder in ("big", "little"):
+                self.assertEqual(build_array(self.data, width, byteorder, use_numpy=True).tolist(),
+                                 list(build_array(self.data, width, byteorder)))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            IntBuilder(bytearray(b'\x2A')).extra = 1
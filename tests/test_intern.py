@@ -0,0 +1,91 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import pickle
+from unittest import TestCase
+
+from midisnake.events import InternTable, NoteOn
+from midisnake.parser import Parser
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = b'\x00\x90\x3C\x64\x10\x3C\x00\x20\x90\x3C\x64\x10\x80\x3C\x00\x30\x3E\x00\x00\xFF\x2F\x00'
+
+
+class TestInternTable(TestCase):
+    def test_parser(self):
+        logger.info("Starting interning test")
+        parser = Parser(build_file(0, TRACK).getvalue(), intern=True)
+        track = parser.tracks[0]
+        self.assertEqual(track.delta_times, [0, 0x10, 0x20, 0x10, 0x30, 0])
+        self.assertIs(track.events[0], track.events[2])
+        self.assertIs(track.events[1], parser.intern_table.get(0x903C00))
+        self.assertIsNot(track.events[3], track.events[4])
+        self.assertEqual(len(parser.intern_table), 4)
+
+        plain = Parser(build_file(0, TRACK).getvalue())
+        self.assertIsNone(plain.intern_table)
+        self.assertIsNot(plain.tracks[0].events[0], plain.tracks[0].events[2])
+        self.assertEqual([event.raw_data for event in plain.tracks[0].events[:5]],
+                         [event.raw_data for event in track.events[:5]])
+
+    def test_shared_table(self):
+        table = InternTable()
+        first = Parser(build_file(0, TRACK).getvalue(), intern=table)
+        second = Parser(build_file(0, TRACK).getvalue(), intern=table)
+        self.assertIs(first.tracks[0].events[0], second.tracks[0].events[0])
+        table.clear()
+        self.assertEqual(len(table), 0)
+
+    def test_bounded(self):
+        table = InternTable(max_size=2)
+        track = Parser(build_file(0, TRACK).getvalue(), intern=table).tracks[0]
+        self.assertEqual(len(table), 2)
+        self.assertIs(track.events[0], track.events[2])
+        self.assertEqual(track.events[4].note_number, 0x3E)
+        event = table.get(0x914000)
+        self.assertIsInstance(event, NoteOn)
+        self.assertIsNot(table.get(0x914000), event)
+        with self.assertRaises(ValueError):
+            table.get(0xF00000)
+
+    def test_read_only(self):
+        logger.info("Starting interned event mutation test")
+        table = InternTable(max_size=1)
+        event = Parser(build_file(0, TRACK).getvalue(), intern=table).tracks[0].events[0]
+        self.assertIsInstance(event, NoteOn)
+        with self.assertRaises(AttributeError):
+            event.note_velocity = 0
+        with self.assertRaises(AttributeError):
+            del event.note_number
+        self.assertEqual(event.note_velocity, 0x64)
+        self.assertIs(type(pickle.loads(pickle.dumps(event))), NoteOn)
+        # Events that didn't fit in the table aren't shared, so can still be changed
+        unshared = table.get(0x914000)
+        unshared.note_velocity = 1
+        self.assertEqual(unshared.note_velocity, 1)
+
+    def test_pickled_track(self):
+        track = pickle.loads(pickle.dumps(Parser(build_file(0, TRACK).getvalue(), intern=True).tracks[0]))
+        self.assertEqual([event.raw_data for event in track.events[:2]], [0x903C64, 0x903C00])
@@ -0,0 +1,113 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.errors import EventTextError, EventLengthError
+from midisnake.events import MetaFactory
+from midisnake.meta_events import MetaTextEvent, MetaSetTempo, EndOfTrack, lyric, set_tempo, meta_events, \
+    register_meta_event
+
+logger = logging.getLogger(__name__)
+
+
+def _text_event(variant: int, payload: bytes) -> MetaTextEvent:
+    return MetaFactory(BytesIO(bytes((variant, len(payload))) + payload))
+
+
+class TestMetaTextEvent(TestCase):
+    def test_ascii(self):
+        event = _text_event(0x05, b'la ')
+        self.assertEqual(event.variant_number, 0x05)
+        self.assertEqual(event.length, 5)
+        self.assertEqual(event.text, "la ")
+        self.assertEqual(event.raw_content, bytearray(b'\xFF\x05la '))
+
+    def test_lazy_decoding(self):
+        event = _text_event(0x01, b'caf\xe9')
+        self.assertIsInstance(event.raw_text, memoryview)
+        self.assertIsNone(event._text)
+        self.assertEqual(event.text, "caf\xe9")
+        self.assertEqual(event._text, "caf\xe9")
+
+    def test_encoding_chain(self):
+        logger.info("Starting text encoding chain test")
+        payload = "さくら".encode("shift_jis")
+        event = _text_event(0x05, payload)
+        self.assertEqual(event.decode(["ascii", "shift_jis"]), "さくら")
+        # Shift-JIS lyrics decode once code page 932 is tried before Latin-1
+        karaoke = _text_event(0x05, payload)
+        karaoke.encodings = ("utf-8", "cp932", "latin-1")
+        self.assertEqual(karaoke.text, "さくら")
+        self.assertEqual(_text_event(0x05, "ｶﾗｵｹ".encode("shift_jis")).decode(["utf-8", "cp932"]), "ｶﾗｵｹ")
+        # Latin-1 text stays Latin-1 by default, though it is also valid code page 932
+        notice = "\xa9 1994 Sound Co.".encode("latin-1")
+        self.assertEqual(_text_event(0x02, notice).text, "\xa9 1994 Sound Co.")
+        self.assertEqual(_text_event(0x05, "さくら".encode("utf-8")).text, "さくら")
+
+        event.encodings = ("ascii",)
+        with self.assertRaises(EventTextError):
+            event.text
+
+    def test_truncated(self):
+        with self.assertRaises(EventLengthError):
+            lyric(BytesIO(b'\x05ab'))
+
+
+class TestMetaRegistry(TestCase):
+    def tearDown(self):
+        meta_events[0x60] = None
+
+    def test_table(self):
+        self.assertEqual(len(meta_events), 128)
+        self.assertIs(meta_events[0x51].object_type, MetaSetTempo)
+        self.assertIs(meta_events[0x51].function, set_tempo)
+        self.assertIsNone(meta_events[0x7F])
+
+    def test_spec_events(self):
+        self.assertEqual(MetaFactory(BytesIO(b'\x21\x01\x03')).port, 3)
+        self.assertEqual(MetaFactory(BytesIO(b'\x09\x03Gen')).text, "Gen")
+        self.assertEqual(MetaFactory(BytesIO(b'\x20\x01\x09')).prefix, 9)
+        self.assertIsInstance(MetaFactory(BytesIO(b'\x2F\x00')), EndOfTrack)
+        with self.assertRaises(KeyError):
+            MetaFactory(BytesIO(b'\x60\x00'))
+        with self.assertRaises(KeyError):
+            MetaFactory(BytesIO(b'\x90\x00'))
+
+    def test_registration(self):
+        logger.info("Starting meta event registration test")
+
+        def decoder(data):
+            length = data.read(1)[0]
+            raw = data.read(length)
+            return length, raw[::-1], raw
+
+        register_meta_event(0x60, decoder, lambda output: output[1])
+        self.assertEqual(MetaFactory(BytesIO(b'\x60\x03abc')), b'cba')
+        with self.assertRaises(ValueError):
+            register_meta_event(0x60, decoder, MetaTextEvent)
+        register_meta_event(0x60, decoder, MetaTextEvent, replace=True)
+        self.assertEqual(MetaFactory(BytesIO(b'\x60\x02hi')).variant_number, 0x60)
+        with self.assertRaises(ValueError):
+            register_meta_event(0x80, decoder, MetaTextEvent)
@@ -0,0 +1,130 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from midisnake.encode import encode_vlv
+from midisnake.ngram import Hit, NgramIndex, extract_melodies, interval_ngrams, rhythm_ngrams
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+# Ode to Joy, with its rhythm, and the opening of Frere Jacques
+ODE = [64, 64, 65, 67, 67, 65, 64, 62, 60, 60, 62, 64, 64, 62, 62]
+ODE_GAPS = [2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 3, 1, 4]
+JACQUES = [60, 62, 64, 60, 60, 62, 64, 60, 64, 65, 67, 64, 65, 67]
+
+
+def build_melody(pitches, gaps=None, channel=0, unit=48):
+    data = b''
+    for pitch, gap in zip(pitches, gaps or [2] * len(pitches)):
+        data += bytes((0x00, 0x90 | channel, pitch, 0x40)) + encode_vlv(gap * unit) + bytes((0x80 | channel, pitch, 0))
+    return data + b'\x00\xFF\x2F\x00'
+
+
+def build_song(*tracks):
+    return build_file(1, b'\x00\xFF\x2F\x00', *tracks).getvalue()
+
+
+class TestNgrams(TestCase):
+    def test_extract(self):
+        logger.info("Starting melody extraction test")
+        # A chord, a drum hit and a note, then a rest
+        track = (b'\x00\x90\x3C\x40\x00\x90\x43\x40\x00\x90\x40\x40\x00\x99\x24\x7F\x30\x90\x3E\x40\x30\x90\x3E\x00'
+                 b'\x30\x80\x3C\x00\x00\xFF\x2F\x00')
+        melodies = extract_melodies(build_song(track, build_melody(JACQUES)))
+        self.assertEqual([melody.track for melody in melodies], [0, 1, 2])
+        self.assertEqual(melodies[0].pitches, [])
+        self.assertEqual((melodies[1].ticks, melodies[1].pitches), ([0, 0x30], [0x43, 0x3E]))
+        self.assertEqual(melodies[2].pitches, JACQUES)
+        self.assertEqual(melodies[2].ticks, list(range(0, 96 * len(JACQUES), 96)))
+
+    def test_keys(self):
+        self.assertEqual(interval_ngrams([60, 62, 64, 60], 2), [0x0202, 0x02FC])
+        self.assertEqual(interval_ngrams([x + 7 for x in ODE], 4), interval_ngrams(ODE, 4))
+        self.assertEqual(len(interval_ngrams(ODE, 4)), len(ODE) - 4)
+        self.assertEqual(rhythm_ngrams([0, 2, 4, 8, 9], 2), [0x010004, 0x0104F8])
+        self.assertEqual(rhythm_ngrams([0, 20, 40, 80, 90], 2), rhythm_ngrams([0, 2, 4, 8, 9], 2))
+        self.assertEqual(interval_ngrams([60, 62], 2), [])
+        for ticks in ([0, 2, 2, 4], [0, 4, 2, 8]):
+            with self.assertRaisesRegex(ValueError, "Tick 2 at index 2"):
+                rhythm_ngrams(ticks, 1)
+
+
+class TestNgramIndex(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "index")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add_corpus(self, index):
+        index.add(build_song(build_melody(JACQUES), build_melody(ODE, ODE_GAPS)), "first")
+        index.add(build_song(build_melody(JACQUES * 2)), "second")
+        index.flush()
+        index.add(build_song(build_melody([48] * 3 + ODE + [50, 52], [2] * 3 + ODE_GAPS + [2, 2], unit=10)), "third")
+
+    def test_query(self):
+        logger.info("Starting n-gram index query test")
+        with NgramIndex(self.path) as index:
+            self.add_corpus(index)
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.query([pitch - 5 for pitch in ODE[4:12]], limit=2),
+                             [Hit("first", 2, 4, 4), Hit("third", 1, 7, 4)])
+            ticks = [sum(ODE_GAPS[:index]) * 7 for index in range(len(ODE_GAPS))]
+            self.assertEqual(index.query(ODE, ticks, limit=2), [Hit("first", 2, 0, 21), Hit("third", 1, 3, 21)])
+            hits = index.query(JACQUES[:6])
+            self.assertEqual(sorted(hit[:3] for hit in hits), [("first", 1, 0), ("second", 1, 0), ("second", 1, 14)])
+            self.assertEqual(index.query(JACQUES[:6], max_postings=2), [])
+            with self.assertRaises(ValueError):
+                index.query(ODE[:4])
+
+    def test_reopen(self):
+        logger.info("Starting n-gram index persistence test")
+        with NgramIndex(self.path, 3) as index:
+            self.add_corpus(index)
+            expected = index.query(ODE, limit=5)
+        with NgramIndex(self.path) as index:
+            self.assertEqual((index.n, index.files), (3, ["first", "second", "third"]))
+            self.assertEqual(len(os.listdir(self.path)), 3)
+            self.assertEqual(index.query(ODE, limit=5), expected)
+            index.compact()
+            self.assertEqual(sorted(os.listdir(self.path)), ["manifest.json", "segment-000002.bin"])
+            self.assertEqual(index.query(ODE, limit=5), expected)
+            index.add(build_song(build_melody(ODE)), "fourth")
+            self.assertEqual(index.query(ODE, limit=5)[2], Hit("fourth", 1, 0, 12))
+        with NgramIndex(self.path) as index:
+            self.assertEqual(index.query(ODE, limit=5)[2], Hit("fourth", 1, 0, 12))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            NgramIndex(self.path, 8)
+        with NgramIndex(self.path) as index:
+            with self.assertRaises(ValueError):
+                index.add(build_song(build_melody(ODE)))
+            with self.assertRaisesRegex(ValueError, "Tick 96 at index 3"):
+                index.query(ticks=[0, 48, 96, 96, 144, 192])
@@ -0,0 +1,85 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.events import NoteOn, NoteOff
+from midisnake.meta_events import MetaTextEvent, MetaSetTempo, EndOfTrack, MetaKeySignature
+from midisnake.parser import Parser
+
+logger = logging.getLogger(__name__)
+
+
+def build_file(file_format: int, *tracks: bytes, tpqn: int = 96) -> BytesIO:
+    header = b'MThd\x00\x00\x00\x06' + file_format.to_bytes(2, 'big') + len(tracks).to_bytes(2, 'big') + \
+             tpqn.to_bytes(2, 'big')
+    chunks = [b'MTrk' + len(body).to_bytes(4, 'big') + body for body in tracks]
+    return BytesIO(header + b''.join(chunks))
+
+
+class TestParser(TestCase):
+    def test_format_0(self):
+        logger.info("Starting format 0 parse test")
+        track = (b'\x00\xFF\x51\x03\x07\xA1\x20'
+                 b'\x00\xFF\x05\x03la '
+                 b'\x00\x90\x3C\x64'
+                 b'\x60\x3C\x00'  # running status
+                 b'\x81\x00\x80\x3C\x40'
+                 b'\x00\xFF\x2F\x00')
+        parser = Parser(build_file(0, track))
+        self.assertEqual(parser.header.format, 0)
+        self.assertEqual(parser.header.tpqn, 96)
+        self.assertEqual(len(parser.tracks), 1)
+
+        events = parser.tracks[0].events
+        self.assertEqual([type(event) for event in events],
+                         [MetaSetTempo, MetaTextEvent, NoteOn, NoteOn, NoteOff, EndOfTrack])
+        self.assertEqual(parser.tracks[0].delta_times, [0, 0, 0, 0x60, 0x80, 0])
+        self.assertEqual(events[0].tpqm, 500000)
+        self.assertEqual(events[1].text, "la ")
+        self.assertEqual(events[3].note_number, 0x3C)
+        self.assertEqual(events[3].note_velocity, 0)
+
+    def test_format_1(self):
+        logger.info("Starting format 1 parse test")
+        conductor = b'\x00\xFF\x59\x02\xFD\x01\x00\xFF\x2F\x00'
+        notes = b'\x00\x91\x40\x50\x10\x81\x40\x00\x00\xFF\x2F\x00'
+        parser = Parser(build_file(1, conductor, notes))
+        self.assertEqual(len(parser.tracks), 2)
+        self.assertEqual(parser.chunk_positions, [14, 32])
+        self.assertIsInstance(parser.tracks[0].events[0], MetaKeySignature)
+        self.assertEqual(parser.tracks[0].events[0].signature_name, "Eb")
+        self.assertEqual(parser.tracks[1].track_number, 1)
+        self.assertEqual(parser.tracks[1].events[0].channel_number, 1)
+
+    def test_instances_do_not_share_tracks(self):
+        notes = b'\x00\x90\x40\x50\x00\xFF\x2F\x00'
+        first = Parser(build_file(0, notes))
+        second = Parser(build_file(0, notes))
+        self.assertEqual(len(first.tracks), 1)
+        self.assertEqual(len(second.tracks), 1)
+
+    def test_unsupported_status(self):
+        with self.assertRaises(ValueError):
+            Parser(build_file(0, b'\x00\xF4\x00\xFF\x2F\x00'))
@@ -0,0 +1,113 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+from unittest import TestCase, skipIf
+
+from midisnake.columnar import ColumnarFile
+from midisnake.parser import Parser
+from midisnake.pianoroll import iter_piano_roll, numpy, scipy, to_piano_roll
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+# A note of four steps of 24 ticks, a note shorter than a step, and a note that is never released
+MELODY = (b'\x00\xFF\x51\x03\x07\xA1\x20\x00\x90\x3C\x64\x30\x90\x40\x50\x0C\x80\x40\x00\x24\x80\x3C\x00'
+          b'\x00\x90\x43\x46\x60\xFF\x2F\x00')
+BASS = b'\x00\x91\x30\x32\x81\x40\x81\x30\x00\x00\xFF\x2F\x00'
+# The same, with the tempo halved from the second beat
+SLOWER = MELODY[:23] + b'\x00\xFF\x51\x03\x0F\x42\x40' + MELODY[23:]
+
+
+def load(melody=MELODY):
+    return ColumnarFile.from_parser(Parser(build_file(1, melody, BASS).getvalue()))
+
+
+def expected_roll():
+    roll = numpy.zeros((128, 8), dtype="B")
+    roll[0x3C, 0:4] = 0x64
+    roll[0x40, 2] = 0x50
+    roll[0x43, 4:] = 0x46
+    roll[0x30, :] = 0x32
+    return roll
+
+
+@skipIf(numpy is None, "NumPy isn't installed")
+class TestPianoRoll(TestCase):  # pragma: no cover
+    def test_ticks(self):
+        logger.info("Starting piano roll test")
+        roll = to_piano_roll(load(), ticks_per_step=24)
+        self.assertEqual(roll.shape, (128, 8))
+        self.assertEqual(roll.dtype, numpy.uint8)
+        self.assertTrue((roll == expected_roll()).all())
+        self.assertTrue((to_piano_roll(load(), ticks_per_step=24, velocity=False) == (expected_roll() > 0)).all())
+        bass = numpy.zeros((128, 8), dtype="B")
+        bass[0x30] = expected_roll()[0x30]
+        self.assertTrue((to_piano_roll(load(), ticks_per_step=24, channels=[1]) == bass).all())
+        self.assertEqual(to_piano_roll(ColumnarFile(), ticks_per_step=24).shape, (128, 0))
+
+    def test_seconds(self):
+        logger.info("Starting timed piano roll test")
+        # Eight steps a second are 24 ticks a step at 120 beats a minute
+        self.assertTrue((to_piano_roll(load(), fs=8.0) == expected_roll()).all())
+        roll = to_piano_roll(load(SLOWER), fs=8.0)
+        self.assertEqual(roll.shape, (128, 12))
+        self.assertTrue((roll[:, :4] == expected_roll()[:, :4]).all())
+        self.assertEqual(list(roll[0x43]), [0] * 4 + [0x46] * 8)
+        self.assertEqual(list(roll[0x30]), [0x32] * 12)
+
+    def test_overlap(self):
+        logger.info("Starting overlapping piano roll test")
+        data = b'\x00\x90\x3C\x40\x18\x90\x3C\x60\x18\x80\x3C\x00\x18\x80\x3C\x00\x00\xFF\x2F\x00'
+        roll = to_piano_roll(ColumnarFile.from_parser(Parser(build_file(0, data).getvalue())), ticks_per_step=24)
+        self.assertEqual(list(roll[0x3C]), [0x40, 0x7F, 0x60])
+
+    def test_windows(self):
+        logger.info("Starting windowed piano roll test")
+        for width in (1, 3, 8, 10):
+            windows = list(iter_piano_roll(load(SLOWER), width, fs=8.0))
+            self.assertEqual(len(windows), -(-12 // width))
+            self.assertTrue(all(window.shape == (128, width) for window in windows))
+            joined = numpy.concatenate(windows, axis=1)
+            self.assertTrue((joined[:, :12] == to_piano_roll(load(SLOWER), fs=8.0)).all())
+            self.assertFalse(joined[:, 12:].any())
+
+    @skipIf(scipy is None, "SciPy isn't installed")
+    def test_sparse(self):
+        logger.info("Starting sparse piano roll test")
+        for melody in (MELODY, SLOWER):
+            for velocity in (True, False):
+                roll = to_piano_roll(load(melody), fs=8.0, velocity=velocity, sparse=True)
+                self.assertTrue((roll.toarray() == to_piano_roll(load(melody), fs=8.0, velocity=velocity)).all())
+
+    def test_invalid(self):
+        for arguments in ({"ticks_per_step": 0}, {"fs": 0.0}, {}, {"ticks_per_step": 24, "fs": 100},
+                          {"ticks_per_step": 2.5}):
+            with self.subTest(arguments=arguments), self.assertRaises(ValueError):
+                to_piano_roll(load(), **arguments)
+        with self.assertRaises(ValueError):
+            next(iter_piano_roll(load(), 0, ticks_per_step=24))
+
+    def test_integer_frame_rate(self):
+        # A whole number of steps a second is still a frame rate
+        self.assertTrue((to_piano_roll(load(), fs=8) == expected_roll()).all())
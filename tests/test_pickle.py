@@ -0,0 +1,148 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import pickle
+from unittest import TestCase
+
+from midisnake.encode import encode_event, encode_events, encode_vlv
+from midisnake.events import NoteOn, NoteOff, PitchBend, PolyphonicAftertouch
+from midisnake.meta_events import MetaTextEvent, MetaSetTempo
+from midisnake.parser import Parser
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = (b'\x00\xFF\x00\x02\x00\x07\x00\xFF\x02\x03(c)\x00\xFF\x03\x04Lead\x00\xFF\x20\x01\x02\x00\xFF\x21\x01\x01'
+         b'\x00\xFF\x51\x03\x07\xA1\x20\x00\xFF\x54\x05\x41\x02\x03\x04\x05\x00\xFF\x58\x04\x04\x02\x18\x08'
+         b'\x00\xFF\x59\x02\xFD\x01\x00\x91\x3C\x64\x60\x3C\x00\x00\x81\x3C\x40\x00\xA1\x3C\x20\x81\x00\xE1\x01\x40'
+         b'\x00\xFF\x2F\x00')
+
+
+def round_trip(value):
+    return pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class TestEncode(TestCase):
+    def test_vlv(self):
+        for value, encoded in [(0, b'\x00'), (0x7F, b'\x7F'), (0x80, b'\x81\x00'), (0x3FFF, b'\xFF\x7F'),
+                               (0x200000, b'\x81\x80\x80\x00'), (0x0FFFFFFF, b'\xFF\xFF\xFF\x7F')]:
+            self.assertEqual(encode_vlv(value), encoded)
+        with self.assertRaises(ValueError):
+            encode_vlv(0x10000000)
+        with self.assertRaises(ValueError):
+            encode_vlv(-1)
+
+    def test_round_trip(self):
+        logger.info("Starting event encoding test")
+        track = Parser(build_file(0, TRACK).getvalue()).tracks[0]
+        self.assertEqual(encode_events(track.delta_times, track.events), TRACK)
+        self.assertEqual(encode_event(track.events[-1]), b'\xFF\x2F\x00')
+        with self.assertRaises(ValueError):
+            encode_event(object())
+
+
+class TestPickle(TestCase):
+    def setUp(self):
+        self.parser = Parser(build_file(0, TRACK).getvalue())
+        self.track = self.parser.tracks[0]
+
+    def test_channel_events(self):
+        logger.info("Starting channel event pickling test")
+        for event_type, data in [(NoteOn, 0x913C64), (NoteOff, 0x813C40), (PolyphonicAftertouch, 0xA13C20),
+                                 (PitchBend, 0xE10140)]:
+            event = event_type(data)
+            restored = round_trip(event)
+            self.assertIs(type(restored), event_type)
+            self.assertEqual(restored.raw_data, data)
+            self.assertEqual(restored.__dict__, event.__dict__)
+
+    def test_meta_events(self):
+        for event in self.track.events:
+            if isinstance(event, (NoteOn, NoteOff, PolyphonicAftertouch, PitchBend)):
+                continue
+            restored = round_trip(event)
+            self.assertIs(type(restored), type(event))
+            self.assertEqual(encode_event(restored), encode_event(event))
+        restored = round_trip(self.track.events[2])
+        self.assertIsInstance(restored, MetaTextEvent)
+        self.assertEqual(restored.text, "Lead")
+        self.assertEqual(round_trip(self.track.events[5]).tpqm, 500000)
+
+    def test_compact(self):
+        self.assertLess(len(pickle.dumps(NoteOn(0x913C64), pickle.HIGHEST_PROTOCOL)), 60)
+        self.assertLess(len(pickle.dumps(MetaSetTempo((3, 500000, bytearray(b'\x07\xA1\x20'))),
+                                         pickle.HIGHEST_PROTOCOL)), 100)
+
+    def test_track(self):
+        logger.info("Starting track pickling test")
+        data = pickle.dumps(self.track, pickle.HIGHEST_PROTOCOL)
+        self.assertLess(len(data), len(TRACK) + 150)
+        restored = pickle.loads(data)
+        self.assertIsNotNone(restored._pending)
+        self.assertEqual(restored.track_number, 0)
+        self.assertEqual(restored.length, self.track.length)
+        # Pickling again before decoding reuses the encoded events
+        self.assertEqual(pickle.dumps(restored, pickle.HIGHEST_PROTOCOL), data)
+
+        self.assertEqual(restored.delta_times, self.track.delta_times)
+        self.assertIsNone(restored._pending)
+        self.assertEqual([encode_event(event) for event in restored.events],
+                         [encode_event(event) for event in self.track.events])
+        self.assertEqual(restored.meta_data["chunk_name"].text, "Lead")
+        self.assertEqual(restored.meta_data["copyright"].text, "(c)")
+        self.assertEqual(restored.meta_data["seq_number"].sequence_number, 7)
+
+    def test_track_unencodable_events(self):
+        self.track.events[1] = {"vendor": "payload"}
+        restored = round_trip(self.track)
+        self.assertIsNone(restored._pending)
+        self.assertEqual(restored.events[1], {"vendor": "payload"})
+        self.assertIsNone(restored.meta_data["copyright"])
+
+    def test_parser_parts(self):
+        header = round_trip(self.parser.header)
+        self.assertEqual((header.length, header.format, header.ntrks, header.tpqn), (6, 0, 1, 96))
+        tracks = round_trip(self.parser.tracks)
+        self.assertEqual(len(tracks[0].events), len(self.track.events))
+
+    def test_parser(self):
+        logger.info("Starting parser pickling test")
+        restored = round_trip(self.parser)
+        self.assertIsNone(restored.midi_file)
+        self.assertEqual(restored.chunk_positions, self.parser.chunk_positions)
+        self.assertEqual((restored.header.format, restored.header.ntrks, restored.header.tpqn),
+                         (self.parser.header.format, self.parser.header.ntrks, self.parser.header.tpqn))
+        self.assertEqual(len(restored.tracks), 1)
+        self.assertEqual(encode_events(restored.tracks[0].delta_times, restored.tracks[0].events), TRACK)
+        self.assertEqual(round_trip(restored).tracks[0].meta_data["chunk_name"].text, "Lead")
+
+    def test_assign_pending(self):
+        # Assigning one list of a track that hasn't been decoded yet keeps the other
+        restored = round_trip(self.track)
+        restored.events = restored_events = [NoteOn(0x913C64)]
+        self.assertIs(restored.events, restored_events)
+        self.assertEqual(restored.delta_times, self.track.delta_times)
+        restored = round_trip(self.track)
+        restored.delta_times = [0] * len(self.track.events)
+        self.assertEqual(restored.delta_times, [0] * len(self.track.events))
+        self.assertEqual(len(restored.events), len(self.track.events))
@@ -0,0 +1,136 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import logging
+from unittest import TestCase
+
+from midisnake.playback import ChannelState, SeekIndex
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+CONDUCTOR = (b'\x00\xFF\x58\x04\x04\x02\x18\x08\x00\xFF\x51\x03\x07\xA1\x20\x83\x00\xFF\x51\x03\x0F\x42\x40'
+             b'\x00\xFF\x58\x04\x03\x02\x18\x08\x00\xFF\x2F\x00')
+
+
+def build_part(channel: int, program: int) -> bytes:
+    data = bytes((0x00, 0xB0 | channel, 0x00, 0x01, 0x00, 0xC0 | channel, program))
+    # Pitch bend range of 12 semitones through RPN 0
+    data += bytes((0x00, 0xB0 | channel, 0x65, 0x00, 0x00, 0x64, 0x00, 0x00, 0x06, 0x0C))
+    for step in range(32):
+        note = 0x30 + step
+        data += bytes((0x00, 0x90 | channel, note, 0x40 + step))
+        data += bytes((0x00, 0xB0 | channel, 0x07, step * 4))
+        data += bytes((0x30, 0xE0 | channel, step, 0x40))
+        data += bytes((0x30, 0x80 | channel, note, 0x00))
+    return data + b'\x00\xFF\x2F\x00'
+
+
+DATA = build_file(1, CONDUCTOR, build_part(0, 5), build_part(3, 40)).getvalue()
+
+
+class TestChannelState(TestCase):
+    def test_apply(self):
+        state = ChannelState()
+        for event in [b'\x90\x3C\x40', b'\x90\x3E\x40', b'\x90\x3C\x00', b'\xB0\x07\x64', b'\xC0\x05', b'\xD0\x10',
+                      b'\xE0\x00\x50', b'\xB0\x65\x00', b'\xB0\x64\x00', b'\xB0\x06\x02', b'\xB0\x26\x01',
+                      b'\xB0\x60\x00']:
+            state.apply(event[0], event[1], event[2] if len(event) > 2 else 0)
+        self.assertEqual(state.notes, {0x3E: 0x40})
+        self.assertEqual(state.controllers, {0x07: 0x64})
+        self.assertEqual(state.parameters, {(True, 0): 0x102})
+        self.assertEqual((state.program, state.pressure, state.pitch_bend), (5, 0x10, 0x2800))
+        self.assertEqual(state.messages(2), [b'\xC2\x05', b'\xB2\x07\x64', b'\xB2\x65\x00', b'\xB2\x64\x00',
+                                             b'\xB2\x06\x02', b'\xB2\x26\x02', b'\xB2\x65\x00', b'\xB2\x64\x00',
+                                             b'\xD2\x10', b'\xE2\x00\x50', b'\x92\x3E\x40'])
+        self.assertEqual(ChannelState.from_dict(json.loads(json.dumps(state.as_dict()))), state)
+
+        state.apply(0xB0, 0x7B, 0)
+        self.assertEqual(state.notes, {})
+        state.apply(0xB0, 0x79, 0)
+        self.assertEqual((state.controllers, state.pitch_bend, state.parameter), ({0x07: 0x64}, 0x2000, 0x3FFF))
+        state.apply(0xB0, 0x06, 0x10)
+        self.assertEqual(state.parameters, {(True, 0): 0x102})
+
+
+class TestSeekIndex(TestCase):
+    def assertStatesEqual(self, state, expected):
+        self.assertEqual(state._replace(seconds=None), expected._replace(seconds=None))
+        self.assertAlmostEqual(state.seconds, expected.seconds)
+
+    def test_build(self):
+        logger.info("Starting seek index build test")
+        index = SeekIndex.build(DATA, interval=0x100)
+        self.assertEqual(index.tpqn, 96)
+        self.assertEqual(len(index.chunks), 3)
+        self.assertEqual([checkpoint.tick for checkpoint in index.checkpoints[:3]], [0, 0x100, 0x200])
+        first = index.checkpoints[0]
+        self.assertEqual(first.tempo, 500000)
+        self.assertEqual([position.offset for position in first.tracks], [start for start, _ in index.chunks])
+        self.assertEqual(index.checkpoint(0x1FF).tick, 0x100)
+        self.assertEqual(index.checkpoint(10 ** 9), index.checkpoints[-1])
+        # Every track has ended at the last checkpoint
+        final = SeekIndex(96, 1 << 30, index.chunks, index.checkpoints[:1]).seek(DATA, 10 ** 6)
+        self.assertEqual([position.offset for position in final.tracks], [end for _, end in index.chunks])
+
+    def test_seek(self):
+        logger.info("Starting seek test")
+        index = SeekIndex.build(DATA, interval=0x100)
+        reference = SeekIndex(index.tpqn, 1 << 30, index.chunks, index.checkpoints[:1])
+        for tick in (0, 0x50, 0x180, 0x183, 0x1000, 0x2000, 10 ** 6):
+            state = index.seek(DATA, tick)
+            self.assertStatesEqual(state, reference.seek(DATA, tick))
+        state = index.seek(DATA, 0x190)
+        self.assertEqual(state.tempo, 1000000)
+        self.assertEqual(state.time_signature, (3, 2, 0x18, 0x08))
+        # 384 ticks at 0.5 seconds per quarter note, then 16 ticks at 1 second
+        self.assertAlmostEqual(state.seconds, 2 + 16 / 96)
+        channel = state.channels[3]
+        self.assertEqual((channel.program, channel.controllers[0x00], channel.parameters),
+                         (40, 1, {(True, 0): 12 << 7}))
+        self.assertEqual(channel.notes, {0x30 + 4: 0x44})
+        self.assertEqual(channel.pitch_bend, (0x40 << 7) | 3)
+
+    def test_play(self):
+        index = SeekIndex.build(DATA, interval=0x100)
+        everything = list(index.play(DATA, index.checkpoints[0]))
+        self.assertEqual(len(everything), 5 + 2 * (2 + 3 + 32 * 4 + 1))
+        self.assertEqual([tick for tick, _, _ in everything], sorted(tick for tick, _, _ in everything))
+        state = index.seek(DATA, 0x183)
+        rest = list(index.play(DATA, state))
+        self.assertEqual(rest, [event for event in everything if event[0] >= 0x183])
+
+    def test_serialise(self):
+        logger.info("Starting seek index serialisation test")
+        index = SeekIndex.build(DATA, interval=0x80)
+        restored = SeekIndex.from_dict(json.loads(json.dumps(index.as_dict())))
+        self.assertEqual(restored.as_dict(), index.as_dict())
+        for tick in (0x90, 0x777):
+            self.assertStatesEqual(restored.seek(DATA, tick), index.seek(DATA, tick))
+
+    def test_smpte(self):
+        data = bytearray(build_file(0, build_part(0, 1)).getvalue())
+        data[12:14] = b'\xE7\x28'
+        state = SeekIndex.build(bytes(data)).seek(bytes(data), 0x40)
+        self.assertIsNone(state.seconds)
+        self.assertEqual(state.channels[0].program, 1)
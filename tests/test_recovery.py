@@ -0,0 +1,135 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+
+from midisnake.errors import EventLengthError
+from midisnake.events import NoteOn, NoteOff
+from midisnake.meta_events import EndOfTrack, MetaSetTempo
+from midisnake.parser import Parser
+from midisnake.stats import ParseStats
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+NOTES = b'\x00\x90\x3C\x64\x60\x80\x3C\x40'
+END = b'\x00\xFF\x2F\x00'
+
+
+class TestTolerantParsing(TestCase):
+    def test_strict_by_default(self):
+        with self.assertRaises(KeyError):
+            Parser(build_file(0, b'\x00\xFF\x60\x02ab' + NOTES + END))
+
+    def test_unknown_meta_type_is_skipped(self):
+        logger.info("Starting unknown meta type recovery test")
+        parser = Parser(build_file(0, b'\x00\xFF\x60\x02ab' + NOTES + END), strict=False)
+        self.assertEqual([type(event) for event in parser.tracks[0].events], [NoteOn, NoteOff, EndOfTrack])
+        self.assertEqual(len(parser.diagnostics), 1)
+        diagnostic = parser.diagnostics[0]
+        self.assertEqual(diagnostic.error, "KeyError")
+        self.assertEqual(diagnostic.track_number, 0)
+        self.assertEqual(diagnostic.offset, 22)
+        self.assertEqual(diagnostic.resumed_at, 28)
+
+    def test_bad_meta_length_is_skipped(self):
+        parser = Parser(build_file(0, b'\x00\xFF\x51\x02\x07\xA1' + NOTES + END), strict=False)
+        self.assertEqual(len(parser.tracks[0].events), 3)
+        self.assertEqual(parser.diagnostics[0].error, EventLengthError.__name__)
+
+    def test_garbage_resynchronises_at_status_byte(self):
+        logger.info("Starting garbage resynchronisation test")
+        parser = Parser(build_file(0, NOTES + b'\x00\xF4\x13\x37' + NOTES + END), strict=False)
+        self.assertEqual([type(event) for event in parser.tracks[0].events],
+                         [NoteOn, NoteOff, NoteOn, NoteOff, EndOfTrack])
+        self.assertEqual(parser.diagnostics[0].error, "ValueError")
+
+    def test_wrong_track_length(self):
+        logger.info("Starting bad track length test")
+        tempo = b'\x00\xFF\x51\x03\x07\xA1\x20'
+        data = build_file(1, tempo + END, NOTES + END).getvalue()
+        # Claim the first track is longer than it is, so it runs into the second track chunk
+        data = data[:18] + (len(tempo + END) + 20).to_bytes(4, 'big') + data[22:]
+        with self.assertRaises(Exception):
+            Parser(BytesIO(data))
+
+        parser = Parser(BytesIO(data), strict=False)
+        self.assertEqual(len(parser.tracks), 2)
+        self.assertEqual([type(event) for event in parser.tracks[0].events], [MetaSetTempo, EndOfTrack])
+        self.assertEqual([type(event) for event in parser.tracks[1].events], [NoteOn, NoteOff, EndOfTrack])
+        self.assertEqual(len(parser.diagnostics), 1)
+        self.assertEqual(parser.diagnostics[0].track_number, 0)
+        self.assertEqual(parser.diagnostics[0].resumed_at, parser.chunk_positions[1])
+
+    def test_junk_between_chunks(self):
+        data = build_file(1, NOTES + END, NOTES + END).getvalue()
+        first_end = 14 + 8 + len(NOTES + END)
+        data = data[:first_end] + b'JUNK\x00\x01' + data[first_end:]
+        parser = Parser(BytesIO(data), strict=False)
+        self.assertEqual(len(parser.tracks), 2)
+        self.assertEqual(parser.diagnostics[0].offset, first_end)
+        self.assertEqual(parser.diagnostics[0].resumed_at, first_end + 6)
+        self.assertEqual(parser.chunk_positions, [14, first_end + 6])
+
+    def test_truncated_file(self):
+        logger.info("Starting truncated file test")
+        data = build_file(1, NOTES + END, NOTES + END).getvalue()
+        stats = ParseStats()
+        parser = Parser(BytesIO(data[:-8]), stats, strict=False)
+        self.assertEqual(len(parser.tracks), 2)
+        self.assertEqual(len(parser.tracks[0].events), 3)
+        self.assertEqual([type(event) for event in parser.tracks[1].events], [NoteOn])
+        self.assertEqual(parser.diagnostics[0].message, "Unexpected end of data")
+        self.assertEqual(dict(stats.exceptions), {"IndexError": 1})
+
+    def test_missing_tracks(self):
+        data = build_file(1, NOTES + END).getvalue()
+        data = data[:10] + (3).to_bytes(2, 'big') + data[12:]
+        parser = Parser(BytesIO(data), strict=False)
+        self.assertEqual(len(parser.tracks), 1)
+        self.assertEqual(parser.diagnostics[0].message, "Expected 3 tracks, found 1")
+        self.assertIsNone(parser.diagnostics[0].resumed_at)
+
+    def test_truncated_chunk_header(self):
+        data = build_file(1, NOTES + END, NOTES + END).getvalue()
+        second = 14 + 8 + len(NOTES + END)
+        for cut in (4, 6):
+            with self.subTest(cut=cut):
+                parser = Parser(BytesIO(data[:second + cut]), strict=False)
+                self.assertEqual(len(parser.tracks), 1)
+                self.assertEqual(parser.diagnostics[-1].message, "Track Chunk header truncated")
+                self.assertEqual(parser.diagnostics[-1].offset, second)
+                self.assertIsNone(parser.diagnostics[-1].resumed_at)
+
+    def test_running_status_cancelled(self):
+        logger.info("Starting running status cancellation test")
+        # A data byte after a meta or System Exclusive event has no running status to use
+        for event in (b'\x00\xFF\x01\x01a', b'\x00\xF0\x02\x7D\xF7', b'\x00\xF7\x01\x7F'):
+            with self.subTest(event=event):
+                data = build_file(0, NOTES + event + b'\x00\x3C\x40' + NOTES + END).getvalue()
+                with self.assertRaises(ValueError):
+                    Parser(data)
+                parser = Parser(data, strict=False)
+                self.assertEqual(parser.diagnostics[0].message, "Data byte 0x3C found without a running status")
+                self.assertEqual(sum(isinstance(event, NoteOff) for event in parser.tracks[0].events), 2)
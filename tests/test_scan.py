@@ -0,0 +1,62 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from unittest import TestCase
+
+from midisnake.scan import RawEvent, merge_tracks, read_event, scan_track, track_chunks
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = b'\x00\x90\x3C\x40\x81\x00\x3C\x00\x00\xC1\x05\x10\xFF\x03\x02ab\x00\xF0\x02\x7E\xF7\x00\xFF\x2F\x00'
+
+
+class TestScan(TestCase):
+    def test_scan_track(self):
+        logger.info("Starting raw scan test")
+        events = list(scan_track(TRACK, 0, len(TRACK)))
+        self.assertEqual(events[0], RawEvent(0, 0, 1, 4, 0x90, 0x3C, 0x40, 4, 0))
+        # Running status, with a two byte delta time
+        self.assertEqual(events[1], RawEvent(4, 0x80, 6, 8, 0x90, 0x3C, 0x00, 8, 0))
+        self.assertEqual(events[2][4:7], (0xC1, 0x05, 0))
+        self.assertEqual(events[3], RawEvent(11, 0x10, 12, 17, 0xFF, 0x03, 0, 15, 2))
+        self.assertEqual(events[4][4:], (0xF0, 0, 0, 20, 2))
+        self.assertEqual(events[5].end, len(TRACK))
+        with self.assertRaises(ValueError):
+            read_event(b'\x00\x40\x00', 0, None)
+        with self.assertRaises(ValueError):
+            read_event(b'\x00\xF4', 0, None)
+        with self.assertRaises(IndexError):
+            read_event(b'\x00\xFF\x01\x05ab', 0, None)
+        # Meta events cancel running status
+        with self.assertRaises(ValueError):
+            list(scan_track(TRACK[:17] + b'\x00\x3C\x40', 0, 20))
+
+    def test_merge(self):
+        second = b'\x40\x91\x3E\x40\x00\xFF\x2F\x00'
+        data = build_file(1, TRACK, second).getvalue()
+        chunks = track_chunks(data)
+        self.assertEqual(chunks, [(22, 22 + len(TRACK)), (30 + len(TRACK), 30 + len(TRACK) + len(second))])
+        merged = [(tick, track, event.status) for tick, track, event in merge_tracks(data, chunks)]
+        self.assertEqual(merged, [(0, 0, 0x90), (0x40, 1, 0x91), (0x40, 1, 0xFF), (0x80, 0, 0x90), (0x80, 0, 0xC1),
+                                  (0x90, 0, 0xFF), (0x90, 0, 0xF0), (0x90, 0, 0xFF)])
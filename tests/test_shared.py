@@ -0,0 +1,99 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase
+
+from midisnake.columnar import ColumnarTrack
+from midisnake.parser import Parser
+from midisnake.shared import SharedHandle, attach, export_tracks, release
+from tests.test_columnar import TRACK
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+DATA = build_file(1, TRACK, b'\x00\xFF\x01\x03abc' + TRACK).getvalue()
+
+
+def export_in_worker(data: bytes) -> SharedHandle:
+    shared = export_tracks(ColumnarTrack.from_tracks(Parser(data).tracks), track=False)
+    handle = shared.handle
+    shared.close()
+    return handle
+
+
+class TestSharedTracks(TestCase):
+    def check(self, tracks):
+        expected = ColumnarTrack.from_tracks(Parser(DATA).tracks)
+        self.assertEqual(len(tracks), len(expected))
+        for track, original in zip(tracks, expected):
+            self.assertEqual(track.track_number, original.track_number)
+            for name, column in original.columns().items():
+                self.assertEqual(list(getattr(track, name)), list(column), name)
+            self.assertEqual(bytes(track.heap), original.heap)
+            self.assertEqual(bytes(track.payload(0)), bytes(original.payload(0)))
+
+    def test_round_trip(self):
+        logger.info("Starting shared memory round trip test")
+        shared = export_tracks(ColumnarTrack.from_tracks(Parser(DATA).tracks))
+        try:
+            self.check(shared.tracks)
+            with attach(shared.handle) as attached:
+                self.check(attached.tracks)
+                # Attached tracks are views of the same memory
+                self.assertIsInstance(attached.tracks[0].tick, memoryview)
+                shared.tracks[1].data2[2] = 0x7F
+                self.assertEqual(attached.tracks[1].data2[2], 0x7F)
+            self.assertEqual(attached.tracks, [])
+        finally:
+            shared.unlink()
+        self.assertFalse(release(shared.handle))
+        with self.assertRaises(FileNotFoundError):
+            attach(shared.handle)
+
+    def test_empty(self):
+        shared = export_tracks([ColumnarTrack()])
+        self.assertEqual(shared.handle.size, 0)
+        self.assertEqual(len(shared.tracks[0]), 0)
+        shared.unlink()
+
+    def test_close_with_exported_views(self):
+        shared = export_tracks(ColumnarTrack.from_tracks(Parser(DATA).tracks))
+        try:
+            view = shared.tracks[0].payload(0)
+            with self.assertRaises(BufferError):
+                shared.close()
+            view.release()
+        finally:
+            shared.unlink()
+
+    def test_worker_process(self):
+        logger.info("Starting shared memory worker test")
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            handles = list(executor.map(export_in_worker, [DATA] * 3))
+        for handle in handles:
+            shared = attach(handle)
+            try:
+                self.check(shared.tracks)
+            finally:
+                shared.unlink()
@@ -0,0 +1,138 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import logging
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from midisnake.parser import Parser
+from midisnake.source import ByteSource
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = b'\x00\xFF\x03\x04Lead\x00\x90\x3C\x64\x60\x3C\x00\x00\xFF\x2F\x00'
+
+
+class UnseekableStream(io.RawIOBase):
+    """Stream that returns at most a few bytes per read, like a pipe"""
+    def __init__(self, data: bytes, read_size: int = 5) -> None:
+        self.data = io.BytesIO(data)
+        self.read_size = read_size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        return self.data.read(min(size, self.read_size) if size >= 0 else self.read_size)
+
+
+class TestByteSource(TestCase):
+    data = bytes(range(32))
+
+    def test_buffer_reads(self):
+        for buffer in (self.data, bytearray(self.data), memoryview(self.data)):
+            source = ByteSource.open(buffer)
+            self.assertEqual(source.read(3), b'\x00\x01\x02')
+            self.assertIsInstance(source.read(1), bytes)
+            self.assertEqual(source.read_byte(), 4)
+            self.assertEqual(source.tell(), 5)
+            self.assertEqual(source.seek(2, io.SEEK_CUR), 7)
+            self.assertEqual(bytes(source.view(2)), b'\x07\x08')
+            source.seek(-2, io.SEEK_END)
+            self.assertEqual(source.read(), b'\x1E\x1F')
+            self.assertEqual(source.read(1), b'')
+
+    def test_view_is_zero_copy(self):
+        data = bytearray(self.data)
+        view = ByteSource(data).view(4)
+        data[0] = 0xFF
+        self.assertEqual(view[0], 0xFF)
+
+    def test_file_offset(self):
+        stream = io.BytesIO(self.data)
+        stream.seek(10)
+        source = ByteSource.open(stream)
+        self.assertEqual(source.tell(), 10)
+        self.assertEqual(source.read(1), b'\x0A')
+
+    def test_stream(self):
+        logger.info("Starting unseekable stream test")
+        source = ByteSource.open(UnseekableStream(self.data))
+        self.assertEqual(source.read(8), self.data[:8])
+        source.seek(4)
+        self.assertEqual(source.read_byte(), 4)
+        source.seek(20)
+        self.assertEqual(source.read(), self.data[20:])
+
+        source = ByteSource.open(UnseekableStream(self.data))
+        source.retain = 4
+        source.window_size = 8
+        source.read(16)
+        source.read(8)
+        with self.assertRaises(io.UnsupportedOperation):
+            source.seek(0)
+
+
+class TestParserInputs(TestCase):
+    def check(self, parser: Parser):
+        self.assertEqual(len(parser.tracks), 1)
+        self.assertEqual(parser.tracks[0].events[0].text, "Lead")
+        self.assertEqual(parser.tracks[0].events[2].note_velocity, 0)
+
+    def test_inputs(self):
+        logger.info("Starting Parser input type tests")
+        data = build_file(0, TRACK).getvalue()
+        self.check(Parser(data))
+        self.check(Parser(bytearray(data)))
+        self.check(Parser(memoryview(data)))
+        self.check(Parser(io.BytesIO(data)))
+        self.check(Parser(io.BufferedReader(io.BytesIO(data))))
+        self.check(Parser(UnseekableStream(data)))
+
+        handle, path = tempfile.mkstemp(suffix=".mid")
+        try:
+            with os.fdopen(handle, 'wb') as midi_file:
+                midi_file.write(data)
+            self.check(Parser(path))
+            self.check(Parser(pathlib.Path(path)))
+            with open(path, 'rb') as midi_file:
+                self.check(Parser(midi_file))
+        finally:
+            os.remove(path)
+
+    def test_text_is_a_view(self):
+        data = bytearray(build_file(0, TRACK).getvalue())
+        event = Parser(data).tracks[0].events[0]
+        self.assertIs(event.raw_text.obj, data)
+
+    def test_tolerant_stream(self):
+        data = build_file(1, TRACK, TRACK).getvalue()
+        parser = Parser(UnseekableStream(data[:18] + b'\x00\x00\x00\x40' + data[22:]), strict=False)
+        self.assertEqual(len(parser.tracks), 2)
+        self.assertEqual(len(parser.diagnostics), 1)
@@ -0,0 +1,75 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from unittest import TestCase
+
+from midisnake.parser import Parser
+from midisnake.stats import ParseStats
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = (b'\x00\xFF\x05\x02la'
+         b'\x00\x90\x3C\x64'
+         b'\x81\x00\x3C\x00'
+         b'\x00\xE0\x00\x40'
+         b'\x00\xFF\x2F\x00')
+
+
+class TestParseStats(TestCase):
+    def test_disabled_by_default(self):
+        self.assertIsNone(Parser(build_file(0, TRACK)).stats)
+
+    def test_collection(self):
+        logger.info("Starting ParseStats collection test")
+        stats = ParseStats()
+        Parser(build_file(0, TRACK), stats)
+        self.assertEqual(dict(stats.status_counts), {0xFF: 2, 0x90: 2, 0xE0: 1})
+        self.assertEqual(dict(stats.meta_counts), {0x05: 1, 0x2F: 1})
+        self.assertEqual(set(stats.status_times), {0xFF, 0x90, 0xE0})
+        self.assertTrue(all(time >= 0 for time in stats.status_times.values()))
+        self.assertEqual(stats.track_bytes, [len(TRACK) + 8])
+        self.assertEqual(dict(stats.vlv_lengths), {1: 4, 2: 1})
+        self.assertEqual(stats.vlv_count, 5)
+        self.assertEqual(dict(stats.exceptions), {})
+
+    def test_aggregates_across_files(self):
+        stats = ParseStats()
+        Parser(build_file(0, TRACK), stats)
+        Parser(build_file(1, TRACK, TRACK), stats)
+        self.assertEqual(stats.status_counts[0x90], 6)
+        self.assertEqual(len(stats.track_bytes), 3)
+
+    def test_exceptions_and_hooks(self):
+        exported = []
+        stats = ParseStats(lambda collected: exported.append(collected.as_dict()))
+        with self.assertRaises(ValueError):
+            Parser(build_file(0, b'\x00\xF4\x00\xFF\x2F\x00'), stats)
+        self.assertEqual(dict(stats.exceptions), {"ValueError": 1})
+        self.assertEqual(len(exported), 1)
+        self.assertEqual(exported[0]["exceptions"], {"ValueError": 1})
+
+        stats.add_hook(lambda collected: exported.append(collected.vlv_count))
+        Parser(build_file(0, TRACK), stats)
+        self.assertEqual(exported[1]["status"]["0x90"]["count"], 2)
+        self.assertEqual(exported[2], 5)
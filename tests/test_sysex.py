@@ -0,0 +1,123 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import pickle
+from unittest import TestCase
+
+from midisnake.columnar import ColumnarTrack
+from midisnake.curves import thin_track
+from midisnake.encode import encode_events
+from midisnake.errors import EventLengthError
+from midisnake.events import NoteOn
+from midisnake.meta_events import EndOfTrack
+from midisnake.parser import Parser
+from midisnake.sysex import VendorEvent, sysex_handlers, sequencer_handlers, register_sysex_handler, \
+    register_sequencer_handler
+from midisnake.transform import Transform
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+GS_RESET = b'\x41\x10\x42\x12\x40\x00\x7F\x00\x41\xF7'
+TRACK = (b'\x00\xF0\x0A' + GS_RESET +
+         b'\x10\xFF\x7F\x05\x00\x20\x29\x01\x02'
+         b'\x20\xF7\x02\x01\x02'
+         b'\x30\x90\x3C\x64'
+         b'\x00\xFF\x2F\x00')
+
+
+class TestVendorEvents(TestCase):
+    def tearDown(self):
+        sysex_handlers.clear()
+        sequencer_handlers.clear()
+
+    def test_kept_without_handlers(self):
+        logger.info("Starting undecoded SysEx test")
+        track = Parser(build_file(0, TRACK)).tracks[0]
+        self.assertEqual([type(event) for event in track.events],
+                         [VendorEvent, VendorEvent, VendorEvent, NoteOn, EndOfTrack])
+        self.assertEqual(track.delta_times, [0, 0x10, 0x20, 0x30, 0])
+        sysex, sequencer, continued = track.events[:3]
+        self.assertEqual((sysex.status, sysex.offset, bytes(sysex.payload)), (0xF0, 25, GS_RESET))
+        self.assertEqual((sysex.manufacturer_id, sequencer.manufacturer_id, continued.manufacturer_id),
+                         (b'\x41', b'\x00\x20\x29', b''))
+        self.assertEqual((sequencer.status, sequencer.length, continued.status), (0xFF, 5, 0xF7))
+        self.assertEqual(encode_events(track.delta_times, track.events), TRACK)
+        self.assertEqual(bytes(pickle.loads(pickle.dumps(sysex)).payload), GS_RESET)
+
+    def test_columnar_round_trip(self):
+        logger.info("Starting columnar SysEx round trip test")
+        columnar = ColumnarTrack.from_track(Parser(build_file(0, TRACK)).tracks[0])
+        self.assertEqual(list(columnar.status), [0xF0, 0xFF, 0xF7, 0x90, 0xFF])
+        self.assertEqual(bytes(columnar.payload(0)), GS_RESET)
+        self.assertEqual(columnar.encode(), TRACK)
+        # Transforms and thinning keep the events
+        transformed = Transform().transpose(2).apply_track(columnar)
+        self.assertEqual(thin_track(transformed, tolerance=4).encode(), TRACK.replace(b'\x90\x3C', b'\x90\x3E'))
+
+    def test_truncated(self):
+        data = build_file(0, b'\x00\x90\x3C\x64\x00\xF0\x10\x41\x10').getvalue()
+        with self.assertRaises(EventLengthError):
+            Parser(data)
+        parser = Parser(data, strict=False)
+        self.assertEqual(parser.diagnostics[0].error, "EventLengthError")
+        self.assertEqual(parser.diagnostics[0].offset, 26)
+        self.assertEqual([type(event) for event in parser.tracks[0].events], [NoteOn])
+
+    def test_handlers(self):
+        logger.info("Starting SysEx handler test")
+        received = []
+
+        def handler(payload):
+            self.assertIsInstance(payload, memoryview)
+            received.append(bytes(payload))
+            return "handled"
+
+        register_sysex_handler(0x41, handler)
+        register_sequencer_handler(b'\x00\x20\x29', handler)
+        register_sysex_handler(0x43, lambda payload: self.fail("Wrong manufacturer"))
+        track = Parser(build_file(0, TRACK)).tracks[0]
+        self.assertEqual(received, [GS_RESET, b'\x00\x20\x29\x01\x02'])
+        self.assertEqual(track.events[:2], ["handled", "handled"])
+        self.assertIsInstance(track.events[2], VendorEvent)
+        self.assertEqual(track.delta_times, [0, 0x10, 0x20, 0x30, 0])
+
+    def test_handler_returning_none_drops_event(self):
+        register_sysex_handler(0x41, lambda payload: None)
+        track = Parser(build_file(0, TRACK)).tracks[0]
+        self.assertEqual(len(track.events), 4)
+        self.assertEqual(track.delta_times, [0x10, 0x20, 0x30, 0])
+
+    def test_short_extended_id(self):
+        # The event ends after two bytes of an extended ID, so the next event's delta time isn't part of it
+        register_sequencer_handler(b'\x00\x20\x29', lambda payload: self.fail("Read past the event"))
+        track = Parser(build_file(0, b'\x00\xFF\x7F\x02\x00\x20\x29\x90\x3C\x64\x00\xFF\x2F\x00')).tracks[0]
+        self.assertEqual([type(event) for event in track.events], [VendorEvent, NoteOn, EndOfTrack])
+        self.assertEqual(bytes(track.events[0].payload), b'\x00\x20')
+        self.assertEqual(track.delta_times, [0, 0x29, 0])
+
+    def test_invalid_manufacturer(self):
+        with self.assertRaises(ValueError):
+            register_sysex_handler(0, print)
+        with self.assertRaises(ValueError):
+            register_sequencer_handler(b'\x41\x00', print)
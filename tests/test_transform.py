@@ -0,0 +1,182 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from midisnake import transform as transform_module
+from midisnake.columnar import ColumnarFile
+from midisnake.parser import Parser
+from midisnake.transform import Transform, quantise, resample
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+# A note one tick long, a note of 225 ticks, a controller and a note that is never released
+TRACK = (b'\x00\xFF\x51\x03\x07\xA1\x20\x00\x90\x3C\x40\x01\x80\x3C\x00\x0A\x90\x3E\x40\x0B\xB0\x07\x64'
+         b'\x81\x56\x80\x3E\x00\x00\x90\x40\x40\x05\xFF\x2F\x00')
+
+
+# NumPy and the pure Python fallback, or just the fallback when NumPy isn't installed
+PATHS = (None,) if transform_module.numpy is None else (transform_module.numpy, None)
+
+
+def load(data=TRACK, tpqn=96):
+    return ColumnarFile.from_parser(Parser(build_file(1, data, tpqn=tpqn).getvalue()))
+
+
+class TestResample(TestCase):
+    def test_resample(self):
+        logger.info("Starting resample test")
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                resampled = resample(load(), 24)
+                self.assertEqual(resampled.tpqn, 24)
+                track = resampled.tracks[0]
+                # The one tick note is kept one tick long
+                self.assertEqual(list(track.tick), [0, 0, 1, 3, 6, 59, 59, 60])
+                self.assertEqual(list(track.status), [0xFF, 0x90, 0x80, 0x90, 0xB0, 0x80, 0x90, 0xFF])
+                self.assertEqual(list(resample(load(), 24, "floor").tracks[0].tick), [0, 0, 1, 2, 5, 59, 59, 60])
+                self.assertEqual(list(resample(load(), 24, "ceil").tracks[0].tick), [0, 0, 1, 3, 6, 59, 59, 61])
+                self.assertEqual(list(resample(load(), 192).tracks[0].tick), [0, 0, 2, 22, 44, 472, 472, 482])
+
+    def test_reorder(self):
+        logger.info("Starting resample reorder test")
+        # The short note's Note Off is moved past the Note On at the same tick, and End of Track stays last
+        data = b'\x00\x90\x3C\x40\x01\x80\x3C\x00\x01\x90\x3E\x40\x00\xFF\x2F\x00'
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                track = resample(load(data), 8, "floor").tracks[0]
+                self.assertEqual(list(track.tick), [0, 0, 1, 1])
+                self.assertEqual(list(track.status), [0x90, 0x90, 0x80, 0xFF])
+                self.assertEqual(list(track.data1), [0x3C, 0x3E, 0x3C, 0x2F])
+
+    def test_write(self):
+        logger.info("Starting resample write test")
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                output = BytesIO()
+                resample(load(), 480).write(output)
+                parser = Parser(output.getvalue())
+                self.assertEqual(parser.header.tpqn, 480)
+                self.assertEqual(parser.tracks[0].delta_times, [0, 0, 5, 50, 55, 1070, 0, 25])
+                self.assertEqual(parser.tracks[0].events[0].tpqm, 500000)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            resample(load(), 0)
+        with self.assertRaises(ValueError):
+            resample(load(), 0x8000)
+        with self.assertRaises(ValueError):
+            resample(load(), 24, "up")
+        with self.assertRaises(ValueError):
+            resample(load(tpqn=0xE728), 24)
+
+
+class TestQuantise(TestCase):
+    def test_quantise(self):
+        logger.info("Starting quantise test")
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                track = quantise(load(), 24).tracks[0]
+                self.assertEqual(list(track.tick), [0, 0, 0, 1, 24, 240, 240, 240])
+                self.assertEqual(list(track.status), [0xFF, 0x90, 0x90, 0x80, 0xB0, 0x80, 0x90, 0xFF])
+
+    def test_swing(self):
+        logger.info("Starting swing test")
+        data = b''.join(bytes((delta, 0xB0, 0x07, 0x40)) for delta in (10, 10, 25, 20, 25)) + b'\x00\xFF\x2F\x00'
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                # Ticks 10, 20, 45, 65 and 90 on a grid of 24 ticks, with odd grid points delayed by 8 ticks
+                self.assertEqual(list(quantise(load(data), 24, 1 / 3).tracks[0].tick), [0, 32, 48, 80, 96, 96])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            quantise(load(), 0)
+        with self.assertRaises(ValueError):
+            quantise(load(), 24, 1)
+
+
+class TestTransform(TestCase):
+    def test_tables(self):
+        logger.info("Starting transform table test")
+        data = (b'\x00\x90\x7C\x40\x00\xA0\x7C\x10\x00\x91\x30\x7F\x10\x80\x7C\x40\x00\x91\x30\x00'
+                b'\x00\xB0\x07\x64\x00\xFF\x03\x01a\x00\xFF\x2F\x00')
+        # Velocities are halved, then any below 40 are silenced, though notes are kept sounding
+        curve = [velocity // 2 for velocity in range(128)]
+        transform = Transform().transpose(5).velocity_curve(curve).remap_channels({0: 9, 9: 0}).transpose(-2)
+        transform = transform.velocity_curve([0] * 40 + list(range(40, 128)))
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                track = transform.apply(load(data)).tracks[0]
+                self.assertEqual(list(track.status), [0x99, 0xA9, 0x91, 0x89, 0x91, 0xB9, 0xFF, 0xFF])
+                # Channel 0 is moved to the percussion channel before the second transposition, so skips it
+                self.assertEqual(list(track.data1), [0x7F, 0x7F, 0x33, 0x7F, 0x33, 0x07, 0x03, 0x2F])
+                self.assertEqual(list(track.data2), [0x01, 0x10, 0x3F, 0x40, 0x00, 0x64, 0x00, 0x00])
+                self.assertEqual(list(track.tick), [0, 0, 0, 0x10, 0x10, 0x10, 0x10, 0x10])
+                self.assertEqual(bytes(track.payload(6)), b'a')
+
+    def test_percussion(self):
+        logger.info("Starting percussion transposition test")
+        data = b'\x00\x99\x24\x7F\x00\x90\x3C\x40\x10\x89\x24\x00\x00\x80\x3C\x00\x00\xFF\x2F\x00'
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                self.assertEqual(list(Transform().transpose(2).apply(load(data)).tracks[0].data1[:4]),
+                                 [0x24, 0x3E, 0x24, 0x3E])
+                self.assertEqual(list(Transform().transpose(2, channels=[9]).apply(load(data)).tracks[0].data1[:4]),
+                                 [0x26, 0x3C, 0x26, 0x3C])
+
+    def test_stretch(self):
+        logger.info("Starting stretch test")
+        for module in PATHS:
+            with self.subTest(numpy=module is not None), patch.object(transform_module, "numpy", module):
+                track = Transform().stretch(0.5).stretch(0.5, "floor").apply(load()).tracks[0]
+                self.assertEqual(list(track.tick), list(resample(load(), 24, "floor").tracks[0].tick))
+                self.assertEqual(list(Transform().stretch(2).apply(load()).tracks[0].tick),
+                                 list(resample(load(), 192).tracks[0].tick))
+
+    def test_write(self):
+        logger.info("Starting transform write test")
+        output = BytesIO()
+        Transform().transpose(12).stretch(1.5).apply(load()).write(output)
+        parser = Parser(output.getvalue())
+        self.assertEqual(parser.header.tpqn, 96)
+        self.assertEqual([event.raw_data >> 8 & 0xFF for event in parser.tracks[0].events[1:-1]],
+                         [0x48, 0x48, 0x4A, 0x07, 0x4A, 0x4C])
+        self.assertEqual(sum(parser.tracks[0].delta_times), 362)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Transform().velocity_curve(range(127))
+        with self.assertRaises(ValueError):
+            Transform().velocity_curve([128] * 128)
+        with self.assertRaises(ValueError):
+            Transform().remap_channels({0: 16})
+        with self.assertRaises(ValueError):
+            Transform().transpose(1, channels=[16])
+        with self.assertRaises(ValueError):
+            Transform().stretch(0)
+        with self.assertRaises(ValueError):
+            Transform().stretch(2, "up")
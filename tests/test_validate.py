@@ -0,0 +1,81 @@
+#                       MIT License
+# 
+# Copyright (c) 2016 Ennis Massey
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+import os
+import tempfile
+from unittest import TestCase
+
+from midisnake import validate
+from midisnake.validate import validate_structure, validate_buffer
+from tests.test_parser import build_file
+
+logger = logging.getLogger(__name__)
+
+TRACK = b'\x00\x90\x3C\x64\x60\x80\x3C\x40\x00\xFF\x2F\x00'
+
+
+def _codes(data: bytes) -> list:
+    return [issue.code for issue in validate_buffer(data)]
+
+
+class TestValidateStructure(TestCase):
+    def test_valid_file(self):
+        logger.info("Starting validate_structure file test")
+        handle, path = tempfile.mkstemp(suffix=".mid")
+        try:
+            with os.fdopen(handle, 'wb') as midi_file:
+                midi_file.write(build_file(1, TRACK, TRACK).getvalue())
+            self.assertEqual(validate_structure(path), [])
+        finally:
+            os.remove(path)
+
+    def test_empty_file(self):
+        handle, path = tempfile.mkstemp(suffix=".mid")
+        os.close(handle)
+        try:
+            self.assertEqual([issue.code for issue in validate_structure(path)], [validate.HEADER_TRUNCATED])
+        finally:
+            os.remove(path)
+
+    def test_header_fields(self):
+        data = build_file(0, TRACK).getvalue()
+        self.assertEqual(_codes(b'RIFF' + data[4:]), [validate.HEADER_TYPE])
+        self.assertEqual(_codes(data[:8] + b'\x00\x03' + data[10:]), [validate.HEADER_FORMAT])
+        self.assertEqual(_codes(data[:10] + b'\x00\x02' + data[12:]),
+                         [validate.HEADER_TRACK_COUNT, validate.TRACK_COUNT])
+
+    def test_chunk_lengths(self):
+        data = build_file(1, TRACK, TRACK).getvalue()
+        self.assertEqual(_codes(data[:-1]), [validate.CHUNK_TRUNCATED])
+        self.assertEqual(_codes(data + b'\x00\x00'), [validate.TRAILING_DATA])
+        issues = validate_buffer(data[:18] + (len(TRACK) - 4).to_bytes(4, 'big') + data[22:])
+        self.assertEqual(issues[0].code, validate.MISSING_END_OF_TRACK)
+        self.assertEqual(issues[0].offset, 14)
+
+    def test_unknown_chunks(self):
+        data = build_file(1, TRACK).getvalue() + b'XFIH\x00\x00\x00\x02ab'
+        self.assertEqual(_codes(data), [])
+        self.assertEqual(_codes(data[:-10] + b'\x01\x02\x03\x04\x00\x00\x00\x02ab'), [validate.CHUNK_TYPE])
+
+    def test_missing_end_of_track(self):
+        self.assertEqual(_codes(build_file(0, TRACK[:-4]).getvalue()), [validate.MISSING_END_OF_TRACK])